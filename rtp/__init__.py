@@ -17,5 +17,70 @@ from .payloadType import PayloadType
 from .csrcList import CSRCList
 from .extension import Extension
 from .errors import LengthError
+from .packetRing import PacketRing
+from .shardedReceiver import ShardedReceiver, ShardDispatcher, shardForSSRC
+from .packetPool import PacketPool
+from .decoder import (
+    DecodeStatus, DecodeCounters, checkPacket, tryDecode, decodeBatch)
+from .peek import (
+    PeekedHeader, peekHeader, peekMarker, peekPayloadType,
+    peekSequenceNumber, peekTimestamp, peekSSRC, peekPayloadOffset)
+from .instrumentation import Histogram, OperationStats, Registry
+from .unwrap import Unwrapper
+from .recording import Recorder, RecordingReader, IndexRecord
+from .retransmission import RetransmissionCache, RTXPacketizer, nackSequences
+from .rtcpFeedback import (
+    NackGenerator, nackEntries, genericNack, pictureLossIndication,
+    fullIntraRequest, emptyReceiverReport)
+from .rewrite import HeaderRewriter, rewriteHeader
+from .seamlessMerger import SeamlessMerger, LegStats
+from .clockDrift import (
+    DriftEstimator, DriftTracker, DriftEstimate, estimateDrift)
+from .impairment import Impairment, GilbertElliott, ImpairmentRelay
+from .capture import (
+    PcapWriter, RtpdumpWriter, PcapReader, RtpdumpReader, openCapture)
+from .columns import PacketColumns, decodeColumns
+from .rohc import (
+    ROHCCompressor, ROHCDecompressor, ROHCDecompressorState, ROHCPacketType)
+from .red import REDEncoder, REDDecoder, REDBlock, REDFrame, parseRED
+from .reusePortReceiver import (
+    ReusePortReceiver, openReusePortSocket, ssrcSteeringProgram,
+    attachSteering)
+from .timestamping import (
+    TimestampedReader, enableTimestamps, timestampFromAncillary)
+from .gso import GSOSender, encodeBatch, gsoSupported
+from .frameAssembler import FrameAssembler, Frame
+from .pipeline import Pipeline, Stage, StageStats
+from .tcpFraming import (
+    RFC4571Parser, InterleavedParser, InterleavedPacket, encodeRFC4571,
+    encodeInterleaved)
+from .rtcpMux import (
+    MuxDemultiplexer, PacketClass, classify, classifyBatch, isRTCP)
+from .extensionRegistry import (
+    ExtensionRegistry, ExtensionCodec, AudioLevel, VideoOrientation)
 
-__all__ = ["RTP", "PayloadType", "CSRCList", "Extension", "LengthError"]
+__all__ = [
+    "RTP", "PayloadType", "CSRCList", "Extension", "LengthError",
+    "PacketRing", "ShardedReceiver", "ShardDispatcher", "shardForSSRC",
+    "PacketPool", "DecodeStatus", "DecodeCounters", "checkPacket",
+    "tryDecode", "decodeBatch", "PeekedHeader", "peekHeader", "peekMarker",
+    "peekPayloadType", "peekSequenceNumber", "peekTimestamp", "peekSSRC",
+    "peekPayloadOffset", "Histogram", "OperationStats", "Registry",
+    "Unwrapper", "Recorder", "RecordingReader", "IndexRecord",
+    "RetransmissionCache", "RTXPacketizer", "nackSequences", "NackGenerator",
+    "nackEntries", "genericNack", "pictureLossIndication", "fullIntraRequest",
+    "emptyReceiverReport", "HeaderRewriter", "rewriteHeader",
+    "SeamlessMerger", "LegStats", "DriftEstimator", "DriftTracker",
+    "DriftEstimate", "estimateDrift", "Impairment", "GilbertElliott",
+    "ImpairmentRelay", "PcapWriter", "RtpdumpWriter", "PcapReader",
+    "RtpdumpReader", "openCapture", "PacketColumns", "decodeColumns",
+    "ROHCCompressor", "ROHCDecompressor", "ROHCDecompressorState",
+    "ROHCPacketType", "REDEncoder",
+    "REDDecoder", "REDBlock", "REDFrame", "parseRED", "ReusePortReceiver",
+    "openReusePortSocket", "ssrcSteeringProgram", "attachSteering",
+    "TimestampedReader", "enableTimestamps", "timestampFromAncillary",
+    "GSOSender", "encodeBatch", "gsoSupported", "FrameAssembler", "Frame",
+    "Pipeline", "Stage", "StageStats", "RFC4571Parser", "InterleavedParser",
+    "InterleavedPacket", "encodeRFC4571", "encodeInterleaved",
+    "MuxDemultiplexer", "PacketClass", "classify", "classifyBatch", "isRTCP",
+    "ExtensionRegistry", "ExtensionCodec", "AudioLevel", "VideoOrientation"]
@@ -0,0 +1,415 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mmap
+import socket
+import time
+from struct import Struct
+from typing import Any, Iterator, Optional, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+Address = Tuple[str, int]
+
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_MAGIC_NS = 0xa1b23c4d
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW_ALT = 12
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+RTPDUMP_MAGIC = b'#!rtpplay1.0 '
+
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_IPV6 = 0x86dd
+_ETHERTYPE_VLAN = (0x8100, 0x88a8)
+_IPPROTO_UDP = 17
+
+_pcapHeader = Struct('<IHHiIII')
+_pcapRecord = Struct('<IIII')
+_ethernet = Struct('!6s6sH')
+_ipv4 = Struct('!BBHHHBBH4s4s')
+_udp = Struct('!HHHH')
+_rtpdumpHeader = Struct('!IIIHH')
+_rtpdumpRecord = Struct('!HHI')
+_uint16 = Struct('!H')
+
+
+def _ipv4Checksum(header: Buffer) -> int:
+    total = 0
+    for i in range(0, len(header), 2):
+        total += (header[i] << 8) | header[i + 1]
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+class PcapWriter:
+    '''
+    Writes datagrams to a pcap file, wrapped in synthetic Ethernet, IPv4 and
+    UDP headers so that standard tools can dissect them as RTP.
+
+    Attributes:
+        source (tuple): The default source ``(address, port)``.
+        destination (tuple): The default destination ``(address, port)``.
+        packets (int): The number of packets written.
+    '''
+
+    def __init__(
+       self,
+       path: str,
+       source: Address = ('127.0.0.1', 5004),
+       destination: Address = ('127.0.0.1', 5004),
+       snapLength: int = 65535) -> None:
+        self.source = source
+        self.destination = destination
+        self.packets = 0
+        self._identification = 0
+        self._file = open(path, 'wb')
+        self._file.write(_pcapHeader.pack(
+            PCAP_MAGIC, 2, 4, 0, 0, snapLength, LINKTYPE_ETHERNET))
+
+    def __enter__(self) -> 'PcapWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def write(
+       self,
+       datagram: Buffer,
+       timestamp: Optional[float] = None,
+       source: Optional[Address] = None,
+       destination: Optional[Address] = None) -> None:
+        '''
+        Write a UDP datagram captured at ``timestamp``, in seconds since the
+        epoch, defaulting to now.
+        '''
+
+        if timestamp is None:
+            timestamp = time.time()
+        srcAddress, srcPort = source or self.source
+        dstAddress, dstPort = destination or self.destination
+
+        length = len(datagram)
+        frame = bytearray(
+            _ethernet.size + _ipv4.size + _udp.size + length)
+
+        _ethernet.pack_into(
+            frame, 0, b'\x02\x00\x00\x00\x00\x02', b'\x02\x00\x00\x00\x00\x01',
+            _ETHERTYPE_IPV4)
+        ipStart = _ethernet.size
+        _ipv4.pack_into(
+            frame, ipStart, 0x45, 0, _ipv4.size + _udp.size + length,
+            self._identification, 0x4000, 64, _IPPROTO_UDP, 0,
+            socket.inet_aton(srcAddress), socket.inet_aton(dstAddress))
+        checksum = _ipv4Checksum(frame[ipStart:ipStart + _ipv4.size])
+        frame[ipStart + 10] = checksum >> 8
+        frame[ipStart + 11] = checksum & 0xff
+        udpStart = ipStart + _ipv4.size
+        _udp.pack_into(
+            frame, udpStart, srcPort, dstPort, _udp.size + length, 0)
+        frame[udpStart + _udp.size:] = datagram
+
+        self._identification = (self._identification + 1) & 0xffff
+
+        seconds = int(timestamp)
+        micros = int(round((timestamp - seconds) * 1e6))
+        if micros >= 1000000:
+            seconds += 1
+            micros -= 1000000
+        self._file.write(
+            _pcapRecord.pack(seconds, micros, len(frame), len(frame)))
+        self._file.write(frame)
+        self.packets += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class RtpdumpWriter:
+    '''
+    Writes datagrams to a file in the ``rtpdump`` format used by the
+    ``rtptools`` suite. Packet times are stored as milliseconds since the
+    first packet.
+
+    Attributes:
+        source (tuple): The ``(address, port)`` recorded in the file header.
+        packets (int): The number of packets written.
+    '''
+
+    def __init__(
+       self,
+       path: str,
+       source: Address = ('127.0.0.1', 5004)) -> None:
+        self.source = source
+        self.packets = 0
+        self._start: Optional[float] = None
+        self._file = open(path, 'wb')
+
+    def __enter__(self) -> 'RtpdumpWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _writeHeader(self, start: float) -> None:
+        address, port = self.source
+        self._file.write(
+            RTPDUMP_MAGIC + '{}/{}\n'.format(address, port).encode('ascii'))
+        seconds = int(start)
+        self._file.write(_rtpdumpHeader.pack(
+            seconds, int((start - seconds) * 1e6),
+            int.from_bytes(socket.inet_aton(address), 'big'), port, 0))
+
+    def write(
+       self,
+       datagram: Buffer,
+       timestamp: Optional[float] = None) -> None:
+        '''
+        Write a datagram received at ``timestamp``, in seconds since the
+        epoch, defaulting to now.
+        '''
+
+        if timestamp is None:
+            timestamp = time.time()
+        if self._start is None:
+            self._start = timestamp
+            self._writeHeader(timestamp)
+
+        length = len(datagram)
+        offset = int(round((timestamp - self._start) * 1000))
+        self._file.write(_rtpdumpRecord.pack(
+            length + _rtpdumpRecord.size, length, offset & 0xffffffff))
+        self._file.write(datagram)
+        self.packets += 1
+
+    def close(self) -> None:
+        if self._start is None:
+            self._writeHeader(time.time())
+        self._file.close()
+
+
+class PcapReader:
+    '''
+    Reads the UDP payloads out of a pcap file, in either byte order and with
+    microsecond or nanosecond timestamps. Ethernet (with VLAN tags), Linux
+    cooked, BSD loopback and raw IP link types are understood, over IPv4 or
+    IPv6. Anything else, including IP fragments, is counted in ``skipped``.
+
+    The file is memory mapped and datagrams are returned as ``memoryview``
+    objects onto it, which must all be released before :meth:`close` is
+    called.
+
+    Attributes:
+        linkType (int): The pcap link type.
+        skipped (int): Records that weren't UDP datagrams.
+    '''
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("{} is not a pcap file".format(path))
+
+        if len(self._map) < _pcapHeader.size:
+            self._map.close()
+            raise ValueError("{} is not a pcap file".format(path))
+
+        for order in '<>':
+            magic = Struct(order + 'I').unpack_from(self._map)[0]
+            if magic in (PCAP_MAGIC, PCAP_MAGIC_NS):
+                break
+        else:
+            self._map.close()
+            raise ValueError("{} is not a pcap file".format(path))
+
+        self._record = Struct(order + 'IIII')
+        self._fraction = 1e-9 if magic == PCAP_MAGIC_NS else 1e-6
+        self.linkType = Struct(order + 'I').unpack_from(self._map, 20)[0]
+        self.skipped = 0
+
+    def __enter__(self) -> 'PcapReader':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _ipOffset(self, data: memoryview, start: int, end: int) -> int:
+        # Get the offset of the IP header in a frame, or -1
+        linkType = self.linkType
+        if linkType == LINKTYPE_ETHERNET:
+            offset = start + 14
+            if offset > end:
+                return -1
+            etherType = _uint16.unpack_from(data, offset - 2)[0]
+            while etherType in _ETHERTYPE_VLAN and offset + 4 <= end:
+                offset += 4
+                etherType = _uint16.unpack_from(data, offset - 2)[0]
+            if etherType not in (_ETHERTYPE_IPV4, _ETHERTYPE_IPV6):
+                return -1
+            return offset
+        if linkType == LINKTYPE_LINUX_SLL:
+            if start + 16 > end:
+                return -1
+            return start + 16
+        if linkType == LINKTYPE_NULL:
+            return start + 4
+        if linkType in (LINKTYPE_RAW, LINKTYPE_RAW_ALT):
+            return start
+        return -1
+
+    def _udpPayload(
+       self, data: memoryview, start: int, end: int) -> Tuple[int, int]:
+        # Get the bounds of the UDP payload in a frame, or (-1, -1)
+        ip = self._ipOffset(data, start, end)
+        if (ip < 0) or (ip >= end):
+            return (-1, -1)
+
+        version = data[ip] >> 4
+        if version == 4:
+            headerLength = (data[ip] & 0x0f) * 4
+            if (ip + headerLength + 8 > end) or (data[ip + 9] != _IPPROTO_UDP):
+                return (-1, -1)
+            if _uint16.unpack_from(data, ip + 6)[0] & 0x3fff:
+                # A fragment
+                return (-1, -1)
+            udp = ip + headerLength
+        elif version == 6:
+            if (ip + 48 > end) or (data[ip + 6] != _IPPROTO_UDP):
+                return (-1, -1)
+            udp = ip + 40
+        else:
+            return (-1, -1)
+
+        udpLength = _uint16.unpack_from(data, udp + 4)[0]
+        if (udpLength < _udp.size) or (udp + udpLength > end):
+            # Malformed, or cut short by the capture's snapshot length
+            return (-1, -1)
+        return (udp + _udp.size, udp + udpLength)
+
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        '''
+        Iterate over ``(arrival time, datagram)`` pairs.
+        '''
+
+        data = memoryview(self._map)
+        unpackRecord = self._record.unpack_from
+        recordSize = self._record.size
+        fraction = self._fraction
+        size = len(data)
+        offset = _pcapHeader.size
+        try:
+            while offset + recordSize <= size:
+                seconds, frac, captured, _ = unpackRecord(data, offset)
+                start = offset + recordSize
+                end = min(start + captured, size)
+                offset = start + captured
+
+                payloadStart, payloadEnd = self._udpPayload(data, start, end)
+                if payloadStart < 0:
+                    self.skipped += 1
+                    continue
+
+                yield (seconds + (frac * fraction),
+                       data[payloadStart:payloadEnd])
+        finally:
+            data.release()
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class RtpdumpReader:
+    '''
+    Reads the RTP packets out of an ``rtpdump`` file. RTCP packets are
+    counted in ``skipped``. The file is memory mapped, as for
+    :class:`PcapReader`.
+
+    Attributes:
+        source (tuple): The ``(address, port)`` from the file header.
+        start (float): The start time from the file header.
+        skipped (int): Records that weren't RTP packets.
+    '''
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("{} is not an rtpdump file".format(path))
+
+        end = self._map.find(b'\n')
+        if (not self._map[:len(RTPDUMP_MAGIC)] == RTPDUMP_MAGIC) or (end < 0):
+            self._map.close()
+            raise ValueError("{} is not an rtpdump file".format(path))
+
+        address, _, port = self._map[len(RTPDUMP_MAGIC):end].decode(
+            'ascii').rpartition('/')
+        self.source = (address, int(port))
+        self._offset = end + 1 + _rtpdumpHeader.size
+        seconds, micros, _, _, _ = _rtpdumpHeader.unpack_from(
+            self._map, end + 1)
+        self.start = seconds + (micros * 1e-6)
+        self.skipped = 0
+
+    def __enter__(self) -> 'RtpdumpReader':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        '''
+        Iterate over ``(arrival time, datagram)`` pairs.
+        '''
+
+        data = memoryview(self._map)
+        unpackRecord = _rtpdumpRecord.unpack_from
+        recordSize = _rtpdumpRecord.size
+        size = len(data)
+        start = self.start
+        offset = self._offset
+        try:
+            while offset + recordSize <= size:
+                length, packetLength, ms = unpackRecord(data, offset)
+                if length < recordSize:
+                    break
+                payload = offset + recordSize
+                offset += length
+                if packetLength == 0:
+                    self.skipped += 1
+                    continue
+
+                yield (start + (ms * 1e-3),
+                       data[payload:min(payload + packetLength, size)])
+        finally:
+            data.release()
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def openCapture(path: str) -> Union[PcapReader, RtpdumpReader]:
+    '''
+    Open a pcap or rtpdump file, telling which from its first bytes.
+    '''
+
+    with open(path, 'rb') as f:
+        start = f.read(len(RTPDUMP_MAGIC))
+
+    if start == RTPDUMP_MAGIC:
+        return RtpdumpReader(path)
+    return PcapReader(path)
@@ -0,0 +1,207 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from math import sqrt
+from typing import Dict, Iterable, NamedTuple, Optional, Union
+from .peek import peekSSRC, peekTimestamp
+from .unwrap import Unwrapper
+
+
+class DriftEstimate(NamedTuple):
+    '''
+    A fit of RTP timestamps against arrival time.
+
+    Attributes:
+        rate (float): The sender's clock rate, in ticks per second of the
+            receiver's clock.
+        drift (float): How far ``rate`` is from the nominal clock rate, in
+            parts per million.
+        intercept (float): The unwrapped timestamp predicted at arrival time
+            ``0``.
+    '''
+
+    rate: float
+    drift: float
+    intercept: float
+
+
+class DriftEstimator:
+    '''
+    Estimates the clock rate and drift of an RTP sender from
+    ``(timestamp, arrival time)`` pairs, using an exponentially weighted
+    linear regression that is updated incrementally in O(1) time and memory.
+    Each sample's weight decays by ``forgetting`` per new sample, so the
+    estimate follows roughly the last ``1 / (1 - forgetting)`` samples.
+
+    Timestamps are unwrapped, and sums are kept relative to running means so
+    precision doesn't degrade over long runs.
+
+    Attributes:
+        clockRate (int): The nominal RTP clock rate, e.g. ``90000``.
+        forgetting (float): The per-sample weight decay, ``0 < x <= 1``.
+        samples (int): The number of samples seen.
+    '''
+
+    def __init__(self, clockRate: int, forgetting: float = 0.999) -> None:
+        if (forgetting <= 0) or (forgetting > 1):
+            raise ValueError("Forgetting factor must be in range 0-1")
+
+        self.clockRate = clockRate
+        self.forgetting = forgetting
+        self.samples = 0
+        self._unwrapper = Unwrapper(32)
+        self._origin: Optional[float] = None
+        self._weight = 0.0
+        self._meanX = 0.0
+        self._meanY = 0.0
+        self._covXX = 0.0
+        self._covXY = 0.0
+        self._covYY = 0.0
+
+    def update(self, timestamp: int, arrivalTime: float) -> None:
+        '''
+        Add a sample.
+        '''
+
+        ticks = self._unwrapper.unwrap(timestamp)
+        if self._origin is None:
+            self._origin = arrivalTime
+
+        x = arrivalTime - self._origin
+        y = float(ticks)
+
+        decay = self.forgetting
+        self._weight = (decay * self._weight) + 1
+        alpha = 1 / self._weight
+
+        dx = x - self._meanX
+        dy = y - self._meanY
+        self._meanX += alpha * dx
+        self._meanY += alpha * dy
+        self._covXX = (decay * self._covXX) + (dx * (x - self._meanX))
+        self._covXY = (decay * self._covXY) + (dx * (y - self._meanY))
+        self._covYY = (decay * self._covYY) + (dy * (y - self._meanY))
+        self.samples += 1
+
+    @property
+    def rate(self) -> float:
+        '''
+        The estimated clock rate in ticks per second, or the nominal rate
+        until there are enough samples.
+        '''
+
+        if self._covXX <= 0:
+            return float(self.clockRate)
+        return self._covXY / self._covXX
+
+    @property
+    def drift(self) -> float:
+        '''
+        The estimated drift from the nominal clock rate, in parts per million.
+        '''
+
+        return ((self.rate / self.clockRate) - 1) * 1e6
+
+    @property
+    def jitter(self) -> float:
+        '''
+        The weighted standard deviation, in seconds, of arrival times around
+        the fitted line.
+        '''
+
+        if (self._covXX <= 0) or (self._weight <= 0):
+            return 0.0
+        rate = self.rate
+        residual = (self._covYY - (rate * self._covXY)) / self._weight
+        return sqrt(max(residual, 0.0)) / rate
+
+    def estimate(self) -> DriftEstimate:
+        '''
+        Get the current fit as a :class:`DriftEstimate`.
+        '''
+
+        rate = self.rate
+        origin = self._origin or 0.0
+        return DriftEstimate(
+            rate,
+            self.drift,
+            self._meanY - (rate * (self._meanX + origin)))
+
+    def predictTimestamp(self, arrivalTime: float) -> float:
+        '''
+        Predict the unwrapped timestamp of a packet arriving at
+        ``arrivalTime``.
+        '''
+
+        origin = self._origin or 0.0
+        return self._meanY + (self.rate * (arrivalTime - origin - self._meanX))
+
+    def predictArrival(self, timestamp: int) -> float:
+        '''
+        Predict when a packet with ``timestamp`` will arrive.
+        '''
+
+        origin = self._origin or 0.0
+        ticks = self._unwrapper.peek(timestamp)
+        return origin + self._meanX + ((ticks - self._meanY) / self.rate)
+
+
+class DriftTracker:
+    '''
+    A :class:`DriftEstimator` per SSRC.
+
+    Attributes:
+        estimators (dict): The estimators, keyed by SSRC.
+    '''
+
+    def __init__(self, clockRate: int, forgetting: float = 0.999) -> None:
+        self.clockRate = clockRate
+        self.forgetting = forgetting
+        self.estimators: Dict[int, DriftEstimator] = {}
+
+    def __getitem__(self, ssrc: int) -> DriftEstimator:
+        return self.estimators[ssrc]
+
+    def update(self, ssrc: int, timestamp: int, arrivalTime: float) -> None:
+        estimator = self.estimators.get(ssrc)
+        if estimator is None:
+            estimator = self.estimators[ssrc] = DriftEstimator(
+                self.clockRate, self.forgetting)
+        estimator.update(timestamp, arrivalTime)
+
+    def updateDatagram(
+       self,
+       datagram: Union[bytes, bytearray, memoryview],
+       arrivalTime: float) -> None:
+        '''
+        Add a sample from an encoded packet, peeking its SSRC and timestamp.
+        '''
+
+        self.update(peekSSRC(datagram), peekTimestamp(datagram), arrivalTime)
+
+
+def estimateDrift(
+       timestamps: Iterable[int],
+       arrivalTimes: Iterable[float],
+       clockRate: int) -> DriftEstimate:
+    '''
+    Fit timestamps against arrival times for a whole capture in a single
+    pass, by ordinary least squares. Timestamps are unwrapped.
+    '''
+
+    estimator = DriftEstimator(clockRate, forgetting=1.0)
+    for timestamp, arrivalTime in zip(timestamps, arrivalTimes):
+        estimator.update(timestamp, arrivalTime)
+
+    return estimator.estimate()
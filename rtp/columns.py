@@ -0,0 +1,128 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, Tuple, Union
+from .peek import HEADER
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# An unsigned 32-bit array typecode for this platform
+_UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+
+
+class PacketColumns:
+    '''
+    The fixed header fields of a batch of packets, decoded into one typed
+    ``array`` per field rather than an ``RTP`` object per packet. Each
+    packet's header is unpacked in a single call and nothing else is copied,
+    which makes this the fast way to get through large captures.
+
+    Packets too short for a header, or not RTP version 2, are counted in
+    ``invalid`` and left out.
+
+    Attributes:
+        arrivalTime (array): Arrival times, as ``double``.
+        sequenceNumber (array): Sequence numbers.
+        timestamp (array): Timestamps.
+        ssrc (array): SSRCs.
+        payloadType (array): Payload type numbers.
+        marker (array): Marker bits, as ``0`` or ``1``.
+        length (array): Datagram lengths in bytes.
+        invalid (int): Packets that couldn't be decoded.
+    '''
+
+    def __init__(self) -> None:
+        self.arrivalTime = array('d')
+        self.sequenceNumber = array('H')
+        self.timestamp = array(_UINT32)
+        self.ssrc = array(_UINT32)
+        self.payloadType = array('B')
+        self.marker = array('B')
+        self.length = array(_UINT32)
+        self.invalid = 0
+
+    def __len__(self) -> int:
+        return len(self.ssrc)
+
+    def clear(self) -> None:
+        '''
+        Empty every column, keeping their storage for reuse.
+        '''
+
+        for column in (
+                self.arrivalTime, self.sequenceNumber, self.timestamp,
+                self.ssrc, self.payloadType, self.marker, self.length):
+            del column[:]
+        self.invalid = 0
+
+    def extend(self, packets: Iterable[Tuple[float, Buffer]]) -> None:
+        '''
+        Decode ``(arrival time, datagram)`` pairs onto the end of the
+        columns.
+        '''
+
+        unpack = HEADER.unpack_from
+        headerSize = HEADER.size
+        addArrivalTime = self.arrivalTime.append
+        addSequenceNumber = self.sequenceNumber.append
+        addTimestamp = self.timestamp.append
+        addSSRC = self.ssrc.append
+        addPayloadType = self.payloadType.append
+        addMarker = self.marker.append
+        addLength = self.length.append
+        invalid = 0
+
+        for arrivalTime, datagram in packets:
+            length = len(datagram)
+            if length < headerSize:
+                invalid += 1
+                continue
+            first, second, sequenceNumber, timestamp, ssrc = unpack(datagram)
+            if (first >> 6) != 2:
+                invalid += 1
+                continue
+
+            addArrivalTime(arrivalTime)
+            addSequenceNumber(sequenceNumber)
+            addTimestamp(timestamp)
+            addSSRC(ssrc)
+            addPayloadType(second & 0x7f)
+            addMarker(second >> 7)
+            addLength(length)
+
+        self.invalid += invalid
+
+    def append(self, datagram: Buffer, arrivalTime: float = 0.0) -> None:
+        self.extend(((arrivalTime, datagram),))
+
+
+def decodeColumns(
+       packets: Iterable[Tuple[float, Buffer]],
+       batchSize: int = 65536) -> Iterator[PacketColumns]:
+    '''
+    Decode ``(arrival time, datagram)`` pairs in batches of ``batchSize``.
+    The same :class:`PacketColumns` is cleared and reused for each batch, so
+    memory use is bounded however long the input is.
+    '''
+
+    columns = PacketColumns()
+    iterator = iter(packets)
+    while True:
+        columns.clear()
+        columns.extend(islice(iterator, batchSize))
+        if (len(columns) == 0) and (columns.invalid == 0):
+            return
+        yield columns
@@ -12,50 +12,164 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collections import UserList
-from typing import Iterable, List, Union
+import sys
+from array import array
+from struct import Struct
+from typing import (
+    Any, Callable, Iterable, Iterator, List, MutableSequence, Optional, Union,
+    overload)
 from .errors import LengthError
 
+# An unsigned 32-bit array typecode for this platform
+_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
 
-class CSRCList(UserList):
+_packers = [Struct('!{}I'.format(n)) for n in range(16)]
+
+
+class CSRCList(MutableSequence[int]):
     '''
     A list of Contributing Source Identifiers (CSRCs). CSRCs are stored as
     integers. The list size and CSRC values are validated in accordance with
     RFC 3550. The list size is ``0-15``. CSRC values are ``0 <= x < 2**32``.
+
+    CSRCs are held in an ``array`` of unsigned 32-bit integers, and can be
+    unpacked from or packed into an encoded header in one step.
     '''
 
-    def __init__(self, inList: Union[List[int], 'CSRCList'] = []) -> None:
-        if len(inList) > 15:
-            raise LengthError("CSRC list length too long. Max length is 15.")
+    def __init__(
+       self,
+       inList: Union[Iterable[int], 'CSRCList'] = ()) -> None:
+        self.data = array(_TYPECODE)
+        self.extend(inList)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.data)
+
+    def __contains__(self, value: object) -> bool:
+        return value in self.data
+
+    def __repr__(self) -> str:
+        return repr(self.data.tolist())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CSRCList):
+            return self.data == other.data
+        if isinstance(other, array):
+            return self.data == other
+        return self.data.tolist() == other
+
+    def _asList(self, other: Union[List[int], 'CSRCList']) -> List[int]:
+        if isinstance(other, CSRCList):
+            return other.data.tolist()
+        return other
+
+    # Ordered as lists are, so CSRC lists compare with lists and each other
+    def __lt__(self, other: Union[List[int], 'CSRCList']) -> bool:
+        return self.data.tolist() < self._asList(other)
+
+    def __le__(self, other: Union[List[int], 'CSRCList']) -> bool:
+        return self.data.tolist() <= self._asList(other)
 
-        self.data: List[int] = []
+    def __gt__(self, other: Union[List[int], 'CSRCList']) -> bool:
+        return self.data.tolist() > self._asList(other)
 
-        for x in inList:
-            self._csrcIsValid(x)
-            self.data.append(x)
+    def __ge__(self, other: Union[List[int], 'CSRCList']) -> bool:
+        return self.data.tolist() >= self._asList(other)
+
+    @overload
+    def __getitem__(self, i: int) -> int:
+        ...
+
+    @overload
+    def __getitem__(self, i: slice) -> 'CSRCList':
+        ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[int, 'CSRCList']:
+        if isinstance(i, slice):
+            return CSRCList(self.data[i])
+        return self.data[i]
+
+    @overload
+    def __setitem__(self, i: int, value: int) -> None:
+        ...
+
+    @overload
+    def __setitem__(self, i: slice, value: Iterable[int]) -> None:
+        ...
+
+    def __setitem__(
+       self,
+       i: Union[int, slice],
+       value: Union[int, Iterable[int]]) -> None:
+        if isinstance(i, slice):
+            assert not isinstance(value, int)
+            values = list(value)
+            self._csrcsAreValid(values)
+            newData = array(_TYPECODE, self.data)
+            newData[i] = array(_TYPECODE, values)
+            if len(newData) > 15:
+                raise LengthError(
+                    "CSRC list length too long. Max length is 15.")
+            self.data = newData
+        else:
+            assert isinstance(value, int)
+            self._csrcIsValid(value)
+            self.data[i] = value
+
+    def __delitem__(self, i: Union[int, slice]) -> None:
+        del self.data[i]
 
     def __add__(self, value: Iterable[int]) -> 'CSRCList':
         newList = CSRCList(self)
         newList += value
         return newList
 
+    def __radd__(self, value: Iterable[int]) -> 'CSRCList':
+        newList = CSRCList(value)
+        newList += self
+        return newList
+
     def __iadd__(self, value: Iterable[int]) -> 'CSRCList':
         self.extend(value)
 
         return self
 
+    def __mul__(self, n: int) -> 'CSRCList':
+        return CSRCList(self.data * n)
+
+    __rmul__ = __mul__
+
+    def __imul__(self, n: int) -> 'CSRCList':
+        newData = self.data * n
+        if len(newData) > 15:
+            raise LengthError(
+                "Repeating would make CSRC list length too long. "
+                "Max length is 15.")
+        self.data = newData
+
+        return self
+
     def extend(self, value: Iterable[int]) -> None:
         '''
         Extend the list by appending all the CSRCs from the iterable.
         '''
 
-        if len(self.data) + len(list(value)) > 15:
+        if isinstance(value, CSRCList):
+            values = value.data.tolist()
+        else:
+            values = list(value)
+
+        if len(self.data) + len(values) > 15:
             raise LengthError(
                 "Extending would make CSRC list length too long. "
                 "Max length is 15.")
 
-        for x in value:
-            self.append(x)
+        self._csrcsAreValid(values)
+
+        self.data.extend(values)
 
     def append(self, value: int) -> None:
         '''
@@ -86,9 +200,64 @@ class CSRCList(UserList):
 
         self.data.insert(i, x)
 
+    def clear(self) -> None:
+        del self.data[:]
+
+    def copy(self) -> 'CSRCList':
+        return CSRCList(self)
+
+    def sort(
+       self,
+       key: Optional[Callable[[int], Any]] = None,
+       reverse: bool = False) -> None:
+        self.data = array(
+            _TYPECODE, sorted(self.data, key=key, reverse=reverse))
+
+    def unpackFrom(
+       self,
+       buffer: Union[bytes, bytearray, memoryview],
+       count: int,
+       offset: int = 12) -> None:
+        '''
+        Replace the contents of the list with ``count`` big-endian CSRCs read
+        from ``buffer`` at ``offset``, which defaults to where the CSRC list
+        starts in an RTP header.
+        '''
+
+        if count > 15:
+            raise LengthError("CSRC list length too long. Max length is 15.")
+
+        end = offset + (4 * count)
+        if len(buffer) < end:
+            raise LengthError("Buffer too short for CSRC list")
+
+        del self.data[:]
+        self.data.frombytes(memoryview(buffer)[offset:end])
+        if sys.byteorder == 'little':
+            self.data.byteswap()
+
+    def packInto(
+       self,
+       buffer: Union[bytearray, memoryview],
+       offset: int = 12) -> None:
+        '''
+        Write the CSRCs, big-endian, into ``buffer`` at ``offset``.
+        '''
+
+        _packers[len(self.data)].pack_into(buffer, offset, *self.data)
+
     def _csrcIsValid(self, value: int) -> None:
         if type(value) is not int:
             raise AttributeError(
                 "CSRC values must be unsigned 32-bit integers")
         elif (value < 0) or (value >= 2**32):
             raise ValueError("CSRC values must be unsigned 32-bit integers")
+
+    def _csrcsAreValid(self, values: List[int]) -> None:
+        if not values:
+            return
+        if set(map(type, values)) != {int}:
+            raise AttributeError(
+                "CSRC values must be unsigned 32-bit integers")
+        elif (min(values) < 0) or (max(values) >= 2**32):
+            raise ValueError("CSRC values must be unsigned 32-bit integers")
@@ -0,0 +1,141 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from enum import IntEnum
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from .rtp import RTP
+
+
+class DecodeStatus(IntEnum):
+    '''
+    The outcome of checking an encoded packet before decoding it.
+    '''
+
+    OK = 0
+    TOO_SHORT = 1
+    BAD_VERSION = 2
+    TRUNCATED_CSRC = 3
+    TRUNCATED_EXTENSION = 4
+
+
+class DecodeCounters:
+    '''
+    Per-:class:`DecodeStatus` counts of decoded packets. Index with a
+    ``DecodeStatus`` to read a single count.
+    '''
+
+    def __init__(self) -> None:
+        self._counts = [0] * len(DecodeStatus)
+
+    def __getitem__(self, status: DecodeStatus) -> int:
+        return self._counts[status]
+
+    def count(self, status: DecodeStatus) -> None:
+        '''
+        Add one to the count for ``status``.
+        '''
+
+        self._counts[status] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def errors(self) -> int:
+        return sum(self._counts) - self._counts[DecodeStatus.OK]
+
+    def snapshot(self) -> Dict[str, int]:
+        '''
+        Get the counts keyed by status name, e.g. for exporting as metrics.
+        '''
+
+        return {s.name: self._counts[s] for s in DecodeStatus}
+
+    def reset(self) -> None:
+        self._counts = [0] * len(DecodeStatus)
+
+
+def checkPacket(packet: Union[bytes, bytearray, memoryview]) -> DecodeStatus:
+    '''
+    Check that an encoded packet can be decoded by ``RTP.fromBytearray``
+    without raising. Only the header is inspected and nothing is allocated.
+    '''
+
+    length = len(packet)
+    if length < 12:
+        return DecodeStatus.TOO_SHORT
+
+    first = packet[0]
+    if (first >> 6) != 2:
+        return DecodeStatus.BAD_VERSION
+
+    offset = 12 + (4 * (first & 0x0f))
+    if length < offset:
+        return DecodeStatus.TRUNCATED_CSRC
+
+    if first & 0x10:
+        if length < (offset + 4):
+            return DecodeStatus.TRUNCATED_EXTENSION
+        offset += 4 + (4 * ((packet[offset + 2] << 8) | packet[offset + 3]))
+        if length < offset:
+            return DecodeStatus.TRUNCATED_EXTENSION
+
+    return DecodeStatus.OK
+
+
+def tryDecode(
+       packet: Union[bytearray, memoryview],
+       counters: Optional[DecodeCounters] = None,
+       into: Optional[RTP] = None) -> Tuple[DecodeStatus, Optional[RTP]]:
+    '''
+    Decode a packet without raising on malformed input. Returns the status and
+    the decoded ``RTP``, which is ``None`` unless the status is
+    ``DecodeStatus.OK``. If ``into`` is given it is populated, reusing its
+    buffers, instead of creating a new instance.
+    '''
+
+    status = checkPacket(packet)
+    if counters is not None:
+        counters._counts[status] += 1
+
+    if status is not DecodeStatus.OK:
+        return (status, None)
+
+    if into is None:
+        return (status, RTP().fromBytearray(packet))
+
+    return (status, into.fromBytearray(packet, reuseBuffers=True))
+
+
+def decodeBatch(
+       packets: Iterable[Union[bytearray, memoryview]],
+       counters: Optional[DecodeCounters] = None) -> List[RTP]:
+    '''
+    Decode many packets, skipping malformed ones. Pass ``counters`` to find
+    out how many were skipped, and why.
+    '''
+
+    if counters is None:
+        counters = DecodeCounters()
+    counts = counters._counts
+
+    decoded = []
+    for packet in packets:
+        status = checkPacket(packet)
+        counts[status] += 1
+        if status is DecodeStatus.OK:
+            decoded.append(RTP().fromBytearray(packet))
+
+    return decoded
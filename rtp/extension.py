@@ -12,9 +12,63 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Optional
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
 from .errors import LengthError
 
+# RFC 8285 profile values for startBits. The two-byte profile's low 4 bits
+# are application bits.
+ONE_BYTE_PROFILE = 0xBEDE
+TWO_BYTE_PROFILE = 0x1000
+
+
+def parseElements(
+       startBits: Union[bytes, bytearray, memoryview],
+       headerExtension: Union[bytes, bytearray, memoryview]
+       ) -> Dict[int, memoryview]:
+    '''
+    Split header extension data in the RFC 8285 one-byte or two-byte
+    format into its elements, keyed by ID. The element data is viewed, not
+    copied. Data in any other format has no elements.
+    '''
+
+    profile = (startBits[0] << 8) | startBits[1]
+    view = memoryview(headerExtension)
+    length = len(view)
+    elements = {}
+    offset = 0
+
+    if profile == ONE_BYTE_PROFILE:
+        while offset < length:
+            header = view[offset]
+            elementId = header >> 4
+            if elementId == 0:
+                # Padding
+                offset += 1
+                continue
+            if elementId == 15:
+                break
+            start = offset + 1
+            offset = start + (header & 0x0f) + 1
+            if offset > length:
+                raise LengthError("Header extension element is truncated")
+            elements[elementId] = view[start:offset]
+
+    elif (profile & 0xfff0) == TWO_BYTE_PROFILE:
+        while offset < length:
+            elementId = view[offset]
+            if elementId == 0:
+                offset += 1
+                continue
+            if offset + 2 > length:
+                raise LengthError("Header extension element is truncated")
+            start = offset + 2
+            offset = start + view[offset + 1]
+            if offset > length:
+                raise LengthError("Header extension element is truncated")
+            elements[elementId] = view[start:offset]
+
+    return elements
+
 
 class Extension:
     '''
@@ -27,6 +81,12 @@ class Extension:
             multiple of 4 bytes long.
     '''
 
+    # The data last parsed by elements(), its elements, and values decoded
+    # from them, e.g. by an ExtensionRegistry. The elements view the data, so
+    # aren't copied or pickled with the instance.
+    _parsed: Optional[
+        Tuple[bytes, bytes, Dict[int, memoryview], Dict[Any, Any]]]
+
     def __init__(
        self,
        startBits: Optional[bytearray] = None,
@@ -34,6 +94,7 @@ class Extension:
 
         self.startBits = bytearray(2)
         self.headerExtension = bytearray()
+        self._parsed = None
 
         if startBits is not None:
             self.startBits = startBits
@@ -49,6 +110,15 @@ class Extension:
             (self.startBits == other.startBits) and
             (self.headerExtension == other.headerExtension))
 
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_parsed']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._parsed = None
+
     @property
     def startBits(self) -> bytearray:
         return self._startBits
@@ -79,9 +149,73 @@ class Extension:
         else:
             self._headerExtension = s
 
-    def fromBytearray(self, inBytes: bytearray) -> 'Extension':
+    @classmethod
+    def fromElements(
+       cls,
+       elements: Mapping[int, Union[bytes, bytearray, memoryview]]
+       ) -> 'Extension':
+        '''
+        Build an RFC 8285 header extension from elements keyed by ID. The
+        one-byte format is used if every element fits it.
+        '''
+
+        oneByte = all(
+            (1 <= i <= 14) and (1 <= len(d) <= 16)
+            for i, d in elements.items())
+
+        data = bytearray()
+        for elementId, element in elements.items():
+            if oneByte:
+                data.append((elementId << 4) | (len(element) - 1))
+            else:
+                if not (1 <= elementId <= 255):
+                    raise ValueError(
+                        "Header extension ID must be in the range 1-255")
+                if len(element) > 255:
+                    raise LengthError(
+                        "Header extension element doesn't fit RFC 8285")
+                data += bytes((elementId, len(element)))
+            data += element
+        data += bytes(-len(data) % 4)
+
+        profile = ONE_BYTE_PROFILE if oneByte else TWO_BYTE_PROFILE
+        return cls(bytearray(profile.to_bytes(2, byteorder='big')), data)
+
+    def elements(self) -> Dict[int, memoryview]:
+        '''
+        Get the RFC 8285 elements, keyed by ID, as :func:`parseElements`
+        does. The result is cached until ``startBits`` or
+        ``headerExtension`` change.
+        '''
+
+        return self.elementsAndValues()[0]
+
+    def elementsAndValues(
+       self) -> Tuple[Dict[int, memoryview], Dict[Any, Any]]:
         '''
-        Populate instance from a bytearray.
+        Get the elements, as :meth:`elements` does, along with a ``dict``
+        that values decoded from them can be cached in. Both are replaced
+        when ``startBits`` or ``headerExtension`` change.
+        '''
+
+        parsed = self._parsed
+        if ((parsed is None) or
+                (parsed[1] != self._headerExtension) or
+                (parsed[0] != self._startBits)):
+            startBits = bytes(self._startBits)
+            data = bytes(self._headerExtension)
+            parsed = self._parsed = (
+                startBits, data, parseElements(startBits, data), {})
+        return (parsed[2], parsed[3])
+
+    def fromBytearray(
+       self,
+       inBytes: Union[bytearray, memoryview],
+       reuseBuffers: bool = False) -> 'Extension':
+        '''
+        Populate instance from a bytearray or other buffer. If
+        ``reuseBuffers`` is set, the existing ``startBits`` and
+        ``headerExtension`` bytearrays are overwritten in place.
         '''
 
         length = int.from_bytes(inBytes[2:4], byteorder='big')
@@ -89,8 +223,13 @@ class Extension:
             raise LengthError(
                 "Extension bytearray length doesn't match length field")
 
-        self.startBits = inBytes[0:2]
-        self.headerExtension = inBytes[4:]
+        view = memoryview(inBytes)
+        if reuseBuffers:
+            self.startBits[:] = view[0:2]
+            self.headerExtension[:] = view[4:]
+        else:
+            self.startBits = bytearray(view[0:2])
+            self.headerExtension = bytearray(view[4:])
 
         return self
 
@@ -0,0 +1,364 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from abc import ABC, abstractmethod
+from array import array
+from struct import Struct
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional, Union
+from .errors import LengthError
+from .extension import Extension
+from .rtp import RTP
+
+_uint16 = Struct('!H')
+_ptpTimestamp = Struct('!HII')
+
+
+class AudioLevel(NamedTuple):
+    '''
+    A client-to-mixer audio level, as defined by RFC 6464.
+
+    Attributes:
+        voice (bool): Whether the packet contains voice.
+        level (int): The audio level in -dBov, ``0-127``.
+    '''
+
+    voice: bool
+    level: int
+
+
+class VideoOrientation(NamedTuple):
+    '''
+    A coordination of video orientation, as defined by 3GPP TS 26.114.
+
+    Attributes:
+        camera (bool): Whether the back-facing camera is in use.
+        flip (bool): Whether the video is flipped horizontally.
+        rotation (int): The clockwise rotation in degrees: ``0``, ``90``,
+            ``180`` or ``270``.
+    '''
+
+    camera: bool
+    flip: bool
+    rotation: int
+
+
+class ExtensionCodec (ABC):
+    '''
+    Decodes and encodes the data of one kind of header extension element.
+
+    Attributes:
+        name (str): A short name to look the codec up by.
+        uri (str): The URI identifying the extension in SDP, or ``None``.
+        typecode (str): The ``array`` typecode of its batch columns.
+    '''
+
+    name = ''
+    uri: Optional[str] = None
+    typecode = 'q'
+
+    @abstractmethod
+    def decode(self, data: memoryview) -> Any:
+        '''
+        Decode an element's data, raising ``LengthError`` if it is too
+        short.
+        '''
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        '''
+        Encode a value as an element's data.
+        '''
+
+    def columnValue(self, value: Any) -> int:
+        '''
+        The integer held in a batch column for a decoded value.
+        '''
+
+        return int(value)
+
+    def _check(self, data: memoryview, length: int) -> None:
+        if len(data) < length:
+            raise LengthError(
+                "{} element must be {} bytes long".format(self.name, length))
+
+
+class AbsSendTimeCodec (ExtensionCodec):
+    '''
+    The abs-send-time extension: a 24-bit, 6.18 fixed point time in seconds.
+    Decodes to the raw 24-bit value.
+    '''
+
+    name = 'abs-send-time'
+    uri = 'http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time'
+    typecode = 'i'
+
+    def decode(self, data: memoryview) -> int:
+        self._check(data, 3)
+        return (data[0] << 16) | (data[1] << 8) | data[2]
+
+    def encode(self, value: int) -> bytes:
+        return (value & 0xffffff).to_bytes(3, byteorder='big')
+
+    @staticmethod
+    def toSeconds(value: int) -> float:
+        return value / (1 << 18)
+
+
+class TransportSequenceNumberCodec (ExtensionCodec):
+    '''
+    The transport-wide congestion control sequence number, 16 bits.
+    '''
+
+    name = 'transport-cc'
+    uri = ('http://www.ietf.org/id/'
+           'draft-holmer-rmcat-transport-wide-cc-extensions-01')
+    typecode = 'i'
+
+    def decode(self, data: memoryview) -> int:
+        self._check(data, 2)
+        return _uint16.unpack_from(data)[0]
+
+    def encode(self, value: int) -> bytes:
+        return _uint16.pack(value)
+
+
+class AudioLevelCodec (ExtensionCodec):
+    '''
+    The RFC 6464 client-to-mixer audio level. Batch columns hold the level.
+    '''
+
+    name = 'audio-level'
+    uri = 'urn:ietf:params:rtp-hdrext:ssrc-audio-level'
+    typecode = 'h'
+
+    def decode(self, data: memoryview) -> AudioLevel:
+        self._check(data, 1)
+        return AudioLevel((data[0] & 0x80) != 0, data[0] & 0x7f)
+
+    def encode(self, value: AudioLevel) -> bytes:
+        return bytes(((0x80 if value.voice else 0) | (value.level & 0x7f),))
+
+    def columnValue(self, value: AudioLevel) -> int:
+        return value.level
+
+
+class VideoOrientationCodec (ExtensionCodec):
+    '''
+    The 3GPP coordination of video orientation. Batch columns hold the
+    rotation in degrees.
+    '''
+
+    name = 'video-orientation'
+    uri = 'urn:3gpp:video-orientation'
+    typecode = 'h'
+
+    def decode(self, data: memoryview) -> VideoOrientation:
+        self._check(data, 1)
+        return VideoOrientation(
+            (data[0] & 0x08) != 0, (data[0] & 0x04) != 0,
+            90 * (data[0] & 0x03))
+
+    def encode(self, value: VideoOrientation) -> bytes:
+        return bytes((
+            (0x08 if value.camera else 0) | (0x04 if value.flip else 0) |
+            ((value.rotation // 90) & 0x03),))
+
+    def columnValue(self, value: VideoOrientation) -> int:
+        return value.rotation
+
+
+class PTPTimestampCodec (ExtensionCodec):
+    '''
+    A PTP timestamp in the IEEE 1588 wire format, a 48-bit count of seconds
+    and 32-bit count of nanoseconds, as used to carry capture times in SMPTE
+    ST 2110 streams. Decodes to integer nanoseconds since the PTP epoch. Its
+    URI is whatever the session negotiates, so it is only registered by ID.
+    '''
+
+    name = 'ptp-timestamp'
+
+    def decode(self, data: memoryview) -> int:
+        self._check(data, _ptpTimestamp.size)
+        high, low, nanoseconds = _ptpTimestamp.unpack_from(data)
+        return (((high << 32) | low) * 1000000000) + nanoseconds
+
+    def encode(self, value: int) -> bytes:
+        seconds, nanoseconds = divmod(value, 1000000000)
+        return _ptpTimestamp.pack(
+            (seconds >> 32) & 0xffff, seconds & 0xffffffff, nanoseconds)
+
+
+CODECS: Dict[str, ExtensionCodec] = {c.name: c for c in (
+    AbsSendTimeCodec(), TransportSequenceNumberCodec(), AudioLevelCodec(),
+    VideoOrientationCodec(), PTPTimestampCodec())}
+
+_CODECS_BY_URI = {c.uri: c for c in CODECS.values() if c.uri is not None}
+
+
+class ExtensionRegistry:
+    '''
+    Maps the header extension IDs negotiated for a session to codecs, and
+    decodes extension values from packets by name. Each packet's extension
+    is only scanned for elements once, and each value is only decoded once,
+    until the extension data changes.
+
+    Malformed extensions are treated as missing wherever values are looked
+    up: an element too short for its codec, or every element of a header
+    extension whose element list is truncated.
+
+    Attributes:
+        codecs (dict): The codec registered for each ID.
+    '''
+
+    def __init__(
+       self,
+       mapping: Optional[Mapping[int, Union[str, ExtensionCodec]]] = None
+       ) -> None:
+        self.codecs: Dict[int, ExtensionCodec] = {}
+        self._ids: Dict[str, int] = {}
+        if mapping is not None:
+            for elementId, codec in mapping.items():
+                self.register(elementId, codec)
+
+    def register(
+       self,
+       elementId: int,
+       codec: Union[str, ExtensionCodec]) -> None:
+        '''
+        Register a codec for extension ID ``elementId``. The codec can be
+        given by name or by URI, as in an SDP ``a=extmap`` line.
+        '''
+
+        if not (1 <= elementId <= 255):
+            raise ValueError("Extension ID must be in the range 1-255")
+
+        if isinstance(codec, str):
+            found = CODECS.get(codec) or _CODECS_BY_URI.get(codec)
+            if found is None:
+                raise ValueError("Unknown header extension {}".format(codec))
+            codec = found
+
+        self.unregister(elementId)
+        self.codecs[elementId] = codec
+        self._ids[codec.name] = elementId
+
+    def unregister(self, elementId: int) -> None:
+        codec = self.codecs.pop(elementId, None)
+        if (codec is not None) and (self._ids.get(codec.name) == elementId):
+            del self._ids[codec.name]
+
+    def _id(self, key: Union[int, str]) -> int:
+        if isinstance(key, int):
+            if key in self.codecs:
+                return key
+        elif key in self._ids:
+            return self._ids[key]
+        raise ValueError("No extension registered as {}".format(key))
+
+    def _decode(self, extension: Extension, elementId: int) -> Any:
+        try:
+            elements, values = extension.elementsAndValues()
+        except LengthError:
+            return None
+        codec = self.codecs[elementId]
+        # Keyed by codec too, as registries may map IDs differently
+        key = (elementId, codec)
+        try:
+            return values[key]
+        except KeyError:
+            pass
+
+        data = elements.get(elementId)
+        value = None
+        if data is not None:
+            try:
+                value = codec.decode(data)
+            except LengthError:
+                pass
+        values[key] = value
+        return value
+
+    def get(self, packet: RTP, key: Union[int, str]) -> Any:
+        '''
+        Get the value of the extension registered as ``key``, a name or ID,
+        from ``packet``, or ``None`` if the packet doesn't carry it or it is
+        malformed.
+        '''
+
+        elementId = self._id(key)
+        if packet.extension is None:
+            return None
+        return self._decode(packet.extension, elementId)
+
+    def decode(self, packet: RTP) -> Dict[str, Any]:
+        '''
+        Get the values of every registered extension ``packet`` carries,
+        keyed by codec name. Malformed extensions are left out.
+        '''
+
+        extension = packet.extension
+        if extension is None:
+            return {}
+
+        try:
+            elements = extension.elements()
+        except LengthError:
+            return {}
+
+        values = {}
+        for i in elements:
+            if i in self.codecs:
+                value = self._decode(extension, i)
+                if value is not None:
+                    values[self.codecs[i].name] = value
+        return values
+
+    def encode(self, values: Mapping[Union[int, str], Any]) -> Extension:
+        '''
+        Build a header extension carrying ``values``, keyed by name or ID.
+        '''
+
+        elements = {}
+        for key, value in values.items():
+            elementId = self._id(key)
+            elements[elementId] = self.codecs[elementId].encode(value)
+        return Extension.fromElements(elements)
+
+    def column(
+       self,
+       packets: Iterable[RTP],
+       key: Union[int, str],
+       missing: int = -1) -> array:
+        '''
+        Extract one extension from many packets into an ``array`` column of
+        the codec's typecode, with ``missing`` where a packet doesn't carry
+        it or carries it malformed.
+        '''
+
+        elementId = self._id(key)
+        codec = self.codecs[elementId]
+        columnValue = codec.columnValue
+        decode = self._decode
+        column = array(codec.typecode)
+        append = column.append
+
+        for packet in packets:
+            extension = packet.extension
+            if extension is None:
+                append(missing)
+                continue
+            value = decode(extension, elementId)
+            append(missing if value is None else columnValue(value))
+
+        return column
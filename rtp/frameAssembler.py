@@ -0,0 +1,266 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from typing import Dict, List, NamedTuple, Optional, Union
+from .decoder import DecodeStatus, checkPacket
+from .peek import HEADER, peekPayloadOffset
+from .rtp import RTP
+from .unwrap import Unwrapper
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class Frame(NamedTuple):
+    '''
+    A frame delivered by a :class:`FrameAssembler`.
+
+    Attributes:
+        timestamp (int): The RTP timestamp shared by the frame's packets.
+        payloads (list): The payload of each packet received, as a
+            ``memoryview``, in sequence number order.
+        firstSequenceNumber (int): The sequence number of the first packet
+            received.
+        lastSequenceNumber (int): The sequence number of the last packet
+            received.
+        missing (int): Packets known to be missing from the frame.
+        complete (bool): Whether every packet of the frame was received,
+            up to and including the end of the frame.
+    '''
+
+    timestamp: int
+    payloads: List[memoryview]
+    firstSequenceNumber: int
+    lastSequenceNumber: int
+    missing: int
+    complete: bool
+
+
+class _PendingFrame:
+    def __init__(self, timestamp: int, created: float) -> None:
+        self.timestamp = timestamp
+        self.created = created
+        self.payloads: Dict[int, memoryview] = {}
+        self.first = 0
+        self.last = 0
+        self.end: Optional[int] = None
+
+    def add(self, sequence: int, payload: memoryview) -> None:
+        if not self.payloads:
+            self.first = sequence
+            self.last = sequence
+        elif sequence < self.first:
+            self.first = sequence
+        elif sequence > self.last:
+            self.last = sequence
+        self.payloads[sequence] = payload
+
+
+def _paddingLength(payload: memoryview) -> int:
+    # The padding count, or -1 if it runs past the start of the payload
+    if len(payload) == 0 or payload[-1] > len(payload):
+        return -1
+    return payload[-1]
+
+
+class FrameAssembler:
+    '''
+    Groups the packets of a single RTP stream into frames by timestamp,
+    whatever the payload format. A frame ends with the packet carrying the
+    marker bit or, for formats that don't set it, with the packet before
+    the first one of a later timestamp. Frames are delivered in order, with
+    their payloads as ``memoryview`` objects onto the packets rather than
+    copied together, so the packets must not be reused until the frame has
+    been consumed.
+
+    A frame still waiting for packets is delivered incomplete once it has
+    been in flight for ``timeout`` seconds, or when more than ``maxFrames``
+    frames are in flight. Packets arriving for a frame already delivered are
+    dropped. Nothing is known of the stream before the first packet
+    received, so that packet is taken as the start of the first frame.
+
+    Attributes:
+        maxFrames (int): The most frames held in flight.
+        timeout (float): How long, in seconds, a frame may wait for
+            packets.
+        completeFrames (int): Frames delivered complete.
+        incompleteFrames (int): Frames delivered with packets missing.
+        late (int): Packets dropped because their frame had been delivered.
+        invalid (int): Datagrams dropped because they weren't valid RTP.
+    '''
+
+    def __init__(self, maxFrames: int = 8, timeout: float = 0.1) -> None:
+        if maxFrames < 1:
+            raise ValueError("FrameAssembler needs at least one frame")
+
+        self.maxFrames = maxFrames
+        self.timeout = timeout
+        self.completeFrames = 0
+        self.incompleteFrames = 0
+        self.late = 0
+        self.invalid = 0
+
+        self._sequence = Unwrapper(16)
+        self._frames: Dict[int, _PendingFrame] = {}
+        self._lastEnd: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def add(self, packet: RTP, now: Optional[float] = None) -> List[Frame]:
+        '''
+        Add a decoded packet. Returns any frames it completes.
+        '''
+
+        payload = memoryview(packet.payload)
+        if packet.padding:
+            padding = _paddingLength(payload)
+            if padding < 0:
+                self.invalid += 1
+                return []
+            payload = payload[:len(payload) - padding]
+
+        return self._add(
+            packet.sequenceNumber, packet.timestamp, packet.marker,
+            payload, now)
+
+    def addDatagram(
+       self,
+       datagram: Buffer,
+       now: Optional[float] = None) -> List[Frame]:
+        '''
+        Add an encoded packet, which is viewed rather than decoded. Returns
+        any frames it completes.
+        '''
+
+        view = memoryview(datagram)
+        if checkPacket(view) is not DecodeStatus.OK:
+            self.invalid += 1
+            return []
+
+        first, second, sequenceNumber, timestamp, _ = HEADER.unpack_from(
+            view)
+        payload = view[peekPayloadOffset(view):]
+        if first & 0x20:
+            padding = _paddingLength(payload)
+            if padding < 0:
+                self.invalid += 1
+                return []
+            payload = payload[:len(payload) - padding]
+
+        return self._add(
+            sequenceNumber, timestamp, (second & 0x80) != 0, payload, now)
+
+    def _add(
+       self,
+       sequenceNumber: int,
+       timestamp: int,
+       marker: bool,
+       payload: memoryview,
+       now: Optional[float]) -> List[Frame]:
+        if now is None:
+            now = time.monotonic()
+
+        sequence = self._sequence.unwrap(sequenceNumber)
+        if (self._lastEnd is not None) and (sequence <= self._lastEnd):
+            self.late += 1
+            return self.expire(now)
+
+        frame = self._frames.get(timestamp)
+        if frame is None:
+            frame = self._frames[timestamp] = _PendingFrame(timestamp, now)
+        frame.add(sequence, payload)
+        if marker:
+            frame.end = sequence
+
+        return self._deliver(now)
+
+    def _oldest(self) -> Optional[_PendingFrame]:
+        if not self._frames:
+            return None
+        return min(self._frames.values(), key=lambda f: f.first)
+
+    def _end(self, frame: _PendingFrame) -> Optional[int]:
+        if frame.end is not None:
+            return frame.end
+
+        # Without a marker, a frame ends where a later one starts
+        later = [
+            f.first for f in self._frames.values() if f.first > frame.last]
+        if later:
+            return min(later) - 1
+        return None
+
+    def _start(self, frame: _PendingFrame) -> int:
+        if self._lastEnd is None:
+            return frame.first
+        return self._lastEnd + 1
+
+    def _emit(self, frame: _PendingFrame, end: Optional[int]) -> Frame:
+        del self._frames[frame.timestamp]
+
+        complete = end is not None
+        if end is None:
+            end = frame.last
+        missing = (end - self._start(frame) + 1) - len(frame.payloads)
+        complete = complete and (missing == 0)
+        if complete:
+            self.completeFrames += 1
+        else:
+            self.incompleteFrames += 1
+
+        self._lastEnd = max(end, frame.last)
+        payloads = frame.payloads
+        return Frame(
+            frame.timestamp, [payloads[s] for s in sorted(payloads)],
+            frame.first & 0xffff, frame.last & 0xffff, missing, complete)
+
+    def _deliver(self, now: float) -> List[Frame]:
+        frames = []
+        while True:
+            frame = self._oldest()
+            if frame is None:
+                break
+
+            end = self._end(frame)
+            if (((end is not None) and
+                    (len(frame.payloads) == end - self._start(frame) + 1)) or
+                    (len(self._frames) > self.maxFrames) or
+                    (now - frame.created >= self.timeout)):
+                frames.append(self._emit(frame, end))
+            else:
+                break
+
+        return frames
+
+    def expire(self, now: Optional[float] = None) -> List[Frame]:
+        '''
+        Deliver frames that have been waiting longer than ``timeout``.
+        '''
+
+        if now is None:
+            now = time.monotonic()
+        return self._deliver(now)
+
+    def flush(self) -> List[Frame]:
+        '''
+        Deliver every frame in flight, complete or not.
+        '''
+
+        frames = []
+        frame = self._oldest()
+        while frame is not None:
+            frames.append(self._emit(frame, self._end(frame)))
+            frame = self._oldest()
+        return frames
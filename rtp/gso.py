@@ -0,0 +1,220 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import socket
+from struct import Struct
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+from .peek import HEADER
+from .rtp import RTP
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Linux's UDP_SEGMENT, which not every Python exports
+SOL_UDP = getattr(socket, 'SOL_UDP', 17)
+UDP_SEGMENT = getattr(socket, 'UDP_SEGMENT', 103)
+
+# The kernel's limits on a single segmentation offload send
+MAX_SEGMENTS = 64
+MAX_SEND_SIZE = 65507
+
+# Errors meaning the kernel or interface can't offload segmentation, rather
+# than that this send failed
+_GSO_UNSUPPORTED = frozenset((
+    errno.EINVAL, errno.ENOPROTOOPT, errno.EIO, errno.EOPNOTSUPP))
+
+_segmentSize = Struct('=H')
+_uint16 = Struct('!H')
+
+
+def encodeBatch(
+       packets: Iterable[RTP],
+       into: Optional[bytearray] = None) -> Tuple[bytearray, List[int]]:
+    '''
+    Encode packets back to back into one contiguous buffer, reusing ``into``
+    if given. Returns the buffer and each packet's encoded length. Each
+    packet is encoded in place, without building it separately first.
+    '''
+
+    packets = list(packets)
+    lengths = []
+    for packet in packets:
+        length = (
+            HEADER.size + (4 * len(packet.csrcList)) + len(packet.payload))
+        if packet.extension is not None:
+            length += 4 + len(packet.extension.headerExtension)
+        lengths.append(length)
+
+    # Size the buffer once, then encode each packet straight into it
+    total = sum(lengths)
+    if into is None:
+        into = bytearray(total)
+    elif len(into) < total:
+        into.extend(bytes(total - len(into)))
+    else:
+        del into[total:]
+
+    offset = 0
+    for packet, length in zip(packets, lengths):
+        extension = packet.extension
+        HEADER.pack_into(
+            into, offset,
+            (packet.version << 6) | (packet.padding << 5) |
+            ((extension is not None) << 4) | len(packet.csrcList),
+            (packet.marker << 7) | packet.payloadType.value,
+            packet.sequenceNumber, packet.timestamp, packet.ssrc)
+        position = offset + HEADER.size
+        packet.csrcList.packInto(into, position)
+        position += 4 * len(packet.csrcList)
+
+        if extension is not None:
+            headerExtension = extension.headerExtension
+            into[position:position + 2] = extension.startBits
+            _uint16.pack_into(into, position + 2, len(headerExtension) // 4)
+            position += 4
+            into[position:position + len(headerExtension)] = headerExtension
+            position += len(headerExtension)
+
+        offset += length
+        into[position:offset] = packet.payload
+
+    return (into, lengths)
+
+
+def gsoSupported(sock: socket.socket) -> bool:
+    '''
+    Check whether ``sock`` supports UDP segmentation offload.
+    '''
+
+    try:
+        sock.getsockopt(SOL_UDP, UDP_SEGMENT)
+    except OSError:
+        return False
+    return True
+
+
+class GSOSender:
+    '''
+    Sends batches of RTP packets from a UDP socket using UDP segmentation
+    offload: runs of equal-length packets are written into one buffer and
+    handed to the kernel with a single ``sendmsg``, which splits them into
+    datagrams. The last packet of a run may be shorter than the rest, so a
+    frame ending in a short packet still goes in one call. Where offload
+    isn't supported, or a send fails because the kernel or outgoing
+    interface can't offload it, packets are sent one by one from then on.
+    Any other error, such as a full send buffer, is raised as it would be
+    without offload.
+
+    Attributes:
+        sock (socket.socket): The socket sent from.
+        useGSO (bool): Whether segmentation offload is being used.
+        sendCalls (int): Send system calls made.
+        packets (int): Packets sent.
+    '''
+
+    def __init__(
+       self,
+       sock: socket.socket,
+       useGSO: Optional[bool] = None) -> None:
+        self.sock = sock
+        if useGSO is None:
+            useGSO = gsoSupported(sock)
+        self.useGSO = useGSO
+        self.sendCalls = 0
+        self.packets = 0
+
+        self._buffer = bytearray()
+
+    def _sendEach(
+       self,
+       view: memoryview,
+       lengths: Sequence[int],
+       address: Optional[Tuple[str, int]]) -> None:
+        offset = 0
+        for length in lengths:
+            datagram = view[offset:offset + length]
+            if address is None:
+                self.sock.send(datagram)
+            else:
+                self.sock.sendto(datagram, address)
+            offset += length
+        self.sendCalls += len(lengths)
+
+    def _sendSegments(
+       self,
+       view: memoryview,
+       segmentSize: int,
+       address: Optional[Tuple[str, int]]) -> None:
+        ancillary = [(SOL_UDP, UDP_SEGMENT, _segmentSize.pack(segmentSize))]
+        if address is None:
+            self.sock.sendmsg([view], ancillary)
+        else:
+            self.sock.sendmsg([view], ancillary, 0, address)
+        self.sendCalls += 1
+
+    def sendDatagrams(
+       self,
+       buffer: Buffer,
+       lengths: Sequence[int],
+       address: Optional[Tuple[str, int]] = None) -> None:
+        '''
+        Send datagrams laid out back to back in ``buffer``, with the given
+        ``lengths``, to ``address``, or to the connected peer if ``None``.
+        '''
+
+        view = memoryview(buffer)
+        count = len(lengths)
+        start = 0
+        offset = 0
+        while start < count:
+            size = lengths[start]
+            end = start + 1
+            total = size
+            limit = min(count, start + MAX_SEGMENTS)
+            while ((end < limit) and (lengths[end] <= size) and
+                    (total + lengths[end] <= MAX_SEND_SIZE)):
+                total += lengths[end]
+                end += 1
+                if lengths[end - 1] < size:
+                    break
+
+            run = view[offset:offset + total]
+            if (not self.useGSO) or (end - start == 1):
+                self._sendEach(run, lengths[start:end], address)
+            else:
+                try:
+                    self._sendSegments(run, size, address)
+                except OSError as e:
+                    # e.g. no checksum offload on the outgoing interface
+                    if e.errno not in _GSO_UNSUPPORTED:
+                        raise
+                    self.useGSO = False
+                    self._sendEach(run, lengths[start:end], address)
+
+            start = end
+            offset += total
+
+        self.packets += count
+
+    def send(
+       self,
+       packets: Iterable[RTP],
+       address: Optional[Tuple[str, int]] = None) -> None:
+        '''
+        Encode and send packets to ``address``, or to the connected peer if
+        ``None``.
+        '''
+
+        buffer, lengths = encodeBatch(packets, self._buffer)
+        self.sendDatagrams(buffer, lengths, address)
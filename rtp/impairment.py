@@ -0,0 +1,372 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import select
+import socket
+import threading
+import time
+from heapq import heappop, heappush
+from random import Random
+from typing import Any, Iterable, List, Optional, Tuple
+from .rtp import RTP
+
+
+class GilbertElliott:
+    '''
+    The Gilbert-Elliott two-state loss model, for bursty loss. The channel
+    moves between a good and a bad state with the given per-packet
+    probabilities, and drops packets with a different probability in each.
+
+    With the defaults, loss happens only in the bad state, in bursts of mean
+    length ``1 / pBadToGood``.
+
+    Attributes:
+        pGoodToBad (float): The probability of moving from good to bad.
+        pBadToGood (float): The probability of moving from bad to good.
+        lossGood (float): The loss probability in the good state.
+        lossBad (float): The loss probability in the bad state.
+        bad (bool): Whether the channel is in the bad state.
+    '''
+
+    def __init__(
+       self,
+       pGoodToBad: float,
+       pBadToGood: float,
+       lossGood: float = 0.0,
+       lossBad: float = 1.0) -> None:
+        self.pGoodToBad = pGoodToBad
+        self.pBadToGood = pBadToGood
+        self.lossGood = lossGood
+        self.lossBad = lossBad
+        self.bad = False
+
+    @property
+    def lossRate(self) -> float:
+        '''
+        The long run loss probability.
+        '''
+
+        total = self.pGoodToBad + self.pBadToGood
+        if total == 0:
+            return self.lossBad if self.bad else self.lossGood
+        pBad = self.pGoodToBad / total
+        return (pBad * self.lossBad) + ((1 - pBad) * self.lossGood)
+
+    def lost(self, rng: Random) -> bool:
+        '''
+        Step the model by one packet and return whether it is lost.
+        '''
+
+        if self.bad:
+            if rng.random() < self.pBadToGood:
+                self.bad = False
+        elif rng.random() < self.pGoodToBad:
+            self.bad = True
+
+        return rng.random() < (self.lossBad if self.bad else self.lossGood)
+
+
+class Impairment:
+    '''
+    Impairs a packet stream as a network would: random or bursty loss,
+    duplication, fixed delay with jitter, extra delay for a fraction of
+    packets to reorder them, and a bit rate limit with a bounded queue.
+
+    Packets may be encoded datagrams or ``RTP`` objects; they are passed
+    through untouched, and duplicates are the same object. Packets go in with
+    :meth:`push` and come out, once due, from :meth:`pop`. Given a ``seed``
+    the impairments are repeatable.
+
+    Only the impairments that are enabled cost anything per packet. With no
+    delay, jitter, reordering or rate limit, :meth:`push` skips the release
+    queue entirely and packets are available from :meth:`pop` immediately.
+
+    Times are in seconds and default to ``time.monotonic()``.
+
+    Attributes:
+        loss (float): The probability of dropping each packet, if
+            ``lossModel`` isn't given.
+        lossModel (GilbertElliott): A bursty loss model.
+        duplicate (float): The probability of delivering a packet twice.
+        delay (float): The fixed delay added to every packet.
+        jitter (float): The maximum extra delay, uniformly distributed, added
+            to every packet. Jitter larger than the packet interval reorders
+            packets.
+        reorder (float): The probability of holding a packet back by
+            ``reorderDelay``.
+        reorderDelay (float): The extra delay for reordered packets.
+        rate (float): The link rate in bits per second, or ``None`` for no
+            limit.
+        queueLimit (float): The most time, in seconds, packets may queue
+            behind the rate limit before they are dropped.
+        pushed (int): Packets pushed.
+        delivered (int): Packets popped, including duplicates.
+        dropped (int): Packets lost to the loss model.
+        overflowed (int): Packets dropped by the rate limit's queue.
+        duplicated (int): Packets duplicated.
+        reordered (int): Packets held back to reorder them.
+    '''
+
+    def __init__(
+       self,
+       seed: Optional[int] = None,
+       loss: float = 0.0,
+       lossModel: Optional[GilbertElliott] = None,
+       duplicate: float = 0.0,
+       delay: float = 0.0,
+       jitter: float = 0.0,
+       reorder: float = 0.0,
+       reorderDelay: float = 0.01,
+       rate: Optional[float] = None,
+       queueLimit: float = 0.1) -> None:
+        if (rate is not None) and (rate <= 0):
+            raise ValueError("Impairment rate must be positive")
+
+        self.loss = loss
+        self.lossModel = lossModel
+        self.duplicate = duplicate
+        self.delay = delay
+        self.jitter = jitter
+        self.reorder = reorder
+        self.reorderDelay = reorderDelay
+        self.rate = rate
+        self.queueLimit = queueLimit
+
+        self.pushed = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.duplicated = 0
+        self.reordered = 0
+
+        self._rng = Random(seed)
+        self._queue: List[Tuple[float, int, Any]] = []
+        self._ready: List[Any] = []
+        self._order = 0
+        self._linkFree = 0.0
+
+    def __len__(self) -> int:
+        return len(self._queue) + len(self._ready)
+
+    @staticmethod
+    def _sizeOf(packet: Any) -> int:
+        if isinstance(packet, RTP):
+            size = 12 + (4 * len(packet.csrcList)) + len(packet.payload)
+            if packet.extension is not None:
+                size += len(bytes(packet.extension))
+            return size
+        return len(packet)
+
+    def _lost(self) -> bool:
+        if self.lossModel is not None:
+            return self.lossModel.lost(self._rng)
+        return (self.loss > 0) and (self._rng.random() < self.loss)
+
+    def _schedule(self, packet: Any, departure: float) -> None:
+        rng = self._rng
+        due = departure + self.delay
+        if self.jitter:
+            due += rng.random() * self.jitter
+        if self.reorder and (rng.random() < self.reorder):
+            due += self.reorderDelay
+            self.reordered += 1
+
+        heappush(self._queue, (due, self._order, packet))
+        self._order += 1
+
+    def push(self, packet: Any, now: Optional[float] = None) -> None:
+        '''
+        Send a packet into the impaired link.
+        '''
+
+        self.pushed += 1
+        if self._lost():
+            self.dropped += 1
+            return
+
+        copies = 1
+        if self.duplicate and (self._rng.random() < self.duplicate):
+            copies = 2
+            self.duplicated += 1
+
+        if (not self.rate and not self.delay and not self.jitter and
+                not self.reorder and not self._queue):
+            # Nothing to delay, so skip the clock and the queue entirely
+            self._ready.append(packet)
+            if copies == 2:
+                self._ready.append(packet)
+            return
+
+        if now is None:
+            now = time.monotonic()
+
+        for _ in range(copies):
+            departure = now
+            if self.rate:
+                start = max(now, self._linkFree)
+                if (start - now) > self.queueLimit:
+                    self.overflowed += 1
+                    continue
+                departure = start + ((self._sizeOf(packet) * 8) / self.rate)
+                self._linkFree = departure
+            self._schedule(packet, departure)
+
+    def pop(self, now: Optional[float] = None) -> List[Any]:
+        '''
+        Get the packets that have come out of the link by ``now``, in the
+        order they arrive.
+        '''
+
+        out = self._ready
+        self._ready = []
+        queue = self._queue
+        if queue:
+            if now is None:
+                now = time.monotonic()
+            while queue and (queue[0][0] <= now):
+                out.append(heappop(queue)[2])
+
+        self.delivered += len(out)
+        return out
+
+    def nextDue(self) -> Optional[float]:
+        '''
+        The time the next queued packet comes out, or ``None`` if there is
+        nothing queued. Packets ready now are due at ``0``.
+        '''
+
+        if self._ready:
+            return 0.0
+        if self._queue:
+            return self._queue[0][0]
+        return None
+
+    def apply(
+       self,
+       packets: Iterable[Any],
+       now: Optional[float] = None) -> List[Any]:
+        '''
+        Push many packets at once and pop whatever is then due.
+        '''
+
+        push = self.push
+        for packet in packets:
+            push(packet, now)
+
+        return self.pop(now)
+
+    def flush(self) -> List[Any]:
+        '''
+        Get every packet still in the link, regardless of when it is due.
+        '''
+
+        out = self._ready
+        self._ready = []
+        queue = self._queue
+        while queue:
+            out.append(heappop(queue)[2])
+
+        self.delivered += len(out)
+        return out
+
+
+class ImpairmentRelay:
+    '''
+    A UDP relay that passes datagrams through an :class:`Impairment`, so that
+    an unmodified sender and receiver can be tested over loopback. Datagrams
+    received on ``address`` are forwarded to ``destination`` from a
+    background thread.
+
+    Attributes:
+        impairment (Impairment): The impairment applied.
+        address (tuple): The address the relay receives on.
+        destination (tuple): The address datagrams are forwarded to.
+        sendErrors (int): Datagrams dropped because forwarding them failed,
+            e.g. with a full send buffer.
+    '''
+
+    def __init__(
+       self,
+       impairment: Impairment,
+       destination: Tuple[str, int],
+       address: Tuple[str, int] = ('127.0.0.1', 0),
+       maxPacketSize: int = 65535) -> None:
+        self.impairment = impairment
+        self.destination = destination
+        self.maxPacketSize = maxPacketSize
+        self.sendErrors = 0
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(address)
+        self._sock.setblocking(False)
+        self.address = self._sock.getsockname()
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'ImpairmentRelay':
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        impairment = self.impairment
+        sock = self._sock
+        while self._running:
+            due = impairment.nextDue()
+            timeout = 0.01
+            if due is not None:
+                timeout = min(timeout, max(due - time.monotonic(), 0.0))
+
+            readable, _, _ = select.select([sock], [], [], timeout)
+            now = time.monotonic()
+            if readable:
+                while True:
+                    try:
+                        datagram = sock.recv(self.maxPacketSize)
+                    except OSError:
+                        # Nothing left, or an error reported for an
+                        # earlier send
+                        break
+                    impairment.push(datagram, now)
+
+            for datagram in impairment.pop(now):
+                try:
+                    sock.sendto(datagram, self.destination)
+                except OSError:
+                    # A dropped packet, as the network itself might drop
+                    self.sendErrors += 1
+
+    def start(self) -> None:
+        '''
+        Start relaying in a background thread.
+        '''
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        '''
+        Stop relaying and close the socket. Packets still in the link are
+        discarded.
+        '''
+
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sock.close()
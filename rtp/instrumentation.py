@@ -0,0 +1,330 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Opt-in counters and latency histograms for the encode and decode paths.
+
+Calling :func:`enable` wraps ``RTP.fromBytearray``, ``RTP.toBytearray``,
+``Extension.fromBytearray`` and ``Extension.toBytearray`` so that every call
+is counted and timed; :func:`disable` puts the original methods back. While
+disabled there is no instrumentation code on those paths at all.
+'''
+
+import functools
+import inspect
+from array import array
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+from .extension import Extension
+from .rtp import RTP
+
+
+class Histogram:
+    '''
+    A latency histogram with fixed log-linear buckets. Each power-of-two
+    range of samples is split into ``subBuckets`` equal sub-buckets, so a
+    bucket's upper bound is never more than ``1/subBuckets`` above the
+    samples in it, and recording a sample is still a single
+    ``int.bit_length``, a shift and an array update. There are
+    ``numBuckets`` power-of-two ranges; samples beyond the last are counted
+    in its last sub-bucket, which then reaches up to the largest sample.
+
+    Attributes:
+        count (int): The number of samples recorded.
+        total (int): The sum of all samples.
+        min (int): The smallest sample, or ``0`` if there are none.
+        max (int): The largest sample.
+    '''
+
+    def __init__(self, numBuckets: int = 40, subBuckets: int = 16) -> None:
+        if (subBuckets < 1) or (subBuckets & (subBuckets - 1)):
+            raise ValueError("Histogram sub-buckets must be a power of two")
+
+        self._subBits = subBuckets.bit_length() - 1
+        self._buckets = array('Q', bytes(8 * numBuckets * subBuckets))
+        self._last = (numBuckets * subBuckets) - 1
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        # Samples below subBuckets get a bucket each. Above that, the top
+        # subBits bits after the leading one pick the sub-bucket.
+        subBits = self._subBits
+        shift = value.bit_length() - subBits - 1
+        if shift < 0:
+            return value
+        return ((shift + 1) << subBits) + (value >> shift) - (1 << subBits)
+
+    def _upperBound(self, index: int) -> int:
+        if index == self._last:
+            # The last bucket also holds every sample beyond it
+            return max(self._bucketBound(index), self.max + 1)
+        return self._bucketBound(index)
+
+    def _bucketBound(self, index: int) -> int:
+        subBits = self._subBits
+        shift = (index >> subBits) - 1
+        if shift < 0:
+            return index + 1
+        return (index - (shift << subBits) + 1) << shift
+
+    def record(self, value: int) -> None:
+        '''
+        Add a sample. Samples are non-negative integers, e.g. nanoseconds.
+        '''
+
+        index = self._index(value)
+        if index > self._last:
+            index = self._last
+        self._buckets[index] += 1
+
+        if (self.count == 0) or (value < self.min):
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def buckets(self) -> List[Tuple[int, int]]:
+        '''
+        Get the non-empty buckets as ``(upperBound, count)`` pairs, where
+        ``upperBound`` is exclusive.
+        '''
+
+        return [
+            (self._upperBound(i), c) for i, c in enumerate(self._buckets)
+            if c]
+
+    def percentile(self, p: float) -> int:
+        '''
+        Estimate the ``p`` th percentile (``0 <= p <= 100``) as the upper
+        bound of the bucket it falls in.
+        '''
+
+        if self.count == 0:
+            return 0
+
+        target = self.count * p / 100
+        seen = 0
+        for i, c in enumerate(self._buckets):
+            seen += c
+            if seen >= target:
+                return min(self._upperBound(i), self.max)
+
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'buckets': self.buckets()}
+
+    def reset(self) -> None:
+        for i in range(len(self._buckets)):
+            self._buckets[i] = 0
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+
+class OperationStats:
+    '''
+    Counters and a latency histogram for one instrumented operation.
+
+    Attributes:
+        calls (int): The number of completed calls.
+        bytes (int): The number of bytes decoded or encoded.
+        errors (dict): Failed calls, keyed by exception class name.
+        latency (:obj:`Histogram`): Call durations in nanoseconds.
+    '''
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.bytes = 0
+        self.errors: Dict[str, int] = {}
+        self.latency = Histogram()
+
+    def record(self, nanoseconds: int, numBytes: int) -> None:
+        self.calls += 1
+        self.bytes += numBytes
+        self.latency.record(nanoseconds)
+
+    def error(self, e: BaseException) -> None:
+        name = type(e).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'bytes': self.bytes,
+            'errors': dict(self.errors),
+            'latency': self.latency.snapshot()}
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.bytes = 0
+        self.errors = {}
+        self.latency.reset()
+
+
+class StatsSource(Protocol):
+    def snapshot(self) -> Dict[str, Any]:
+        ...
+
+
+class Registry:
+    '''
+    A collection of named statistics. Instrumented operations register an
+    :class:`OperationStats` here; other components, such as a
+    ``DecodeCounters`` or a receiver, can be added as sources with
+    :meth:`register`. Exporters either call :meth:`snapshot` directly or add
+    a hook, which is called with the snapshot on every :meth:`collect`.
+    '''
+
+    def __init__(self) -> None:
+        self._operations: Dict[str, OperationStats] = {}
+        self._sources: Dict[str, StatsSource] = {}
+        self._hooks: List[Callable[[Dict[str, Any]], None]] = []
+
+    def operation(self, name: str) -> OperationStats:
+        '''
+        Get the statistics for operation ``name``, creating them if needed.
+        '''
+
+        stats = self._operations.get(name)
+        if stats is None:
+            stats = self._operations[name] = OperationStats()
+        return stats
+
+    def register(self, name: str, source: StatsSource) -> None:
+        '''
+        Include ``source.snapshot()`` in snapshots under ``name``.
+        '''
+
+        self._sources[name] = source
+
+    def unregister(self, name: str) -> None:
+        del self._sources[name]
+
+    def addHook(self, hook: Callable[[Dict[str, Any]], None]) -> None:
+        self._hooks.append(hook)
+
+    def removeHook(self, hook: Callable[[Dict[str, Any]], None]) -> None:
+        self._hooks.remove(hook)
+
+    def snapshot(self) -> Dict[str, Any]:
+        '''
+        Get the current statistics of every operation and source, keyed by
+        name.
+        '''
+
+        snap = {n: s.snapshot() for n, s in self._operations.items()}
+        snap.update({n: s.snapshot() for n, s in self._sources.items()})
+        return snap
+
+    def collect(self) -> Dict[str, Any]:
+        '''
+        Take a snapshot and pass it to every hook.
+        '''
+
+        snap = self.snapshot()
+        for hook in self._hooks:
+            hook(snap)
+        return snap
+
+    def reset(self) -> None:
+        '''
+        Zero the statistics of every operation.
+        '''
+
+        for stats in self._operations.values():
+            stats.reset()
+
+
+registry = Registry()
+
+# (class, method name, whether the byte count comes from the result rather
+# than the first argument)
+_INSTRUMENTED = [
+    (RTP, 'fromBytearray', False),
+    (RTP, 'toBytearray', True),
+    (Extension, 'fromBytearray', False),
+    (Extension, 'toBytearray', True)]
+
+_originals: Dict[Tuple[type, str], Callable] = {}
+
+
+def _wrap(
+       method: Callable, stats: OperationStats, fromResult: bool) -> Callable:
+    # The bytes argument may be passed by keyword, so find its name
+    argument = ''
+    if not fromResult:
+        argument = list(inspect.signature(method).parameters)[1]
+
+    @functools.wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        start = perf_counter_ns()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as e:
+            stats.error(e)
+            raise
+        if fromResult:
+            numBytes = len(result)
+        elif args:
+            numBytes = len(args[0])
+        else:
+            numBytes = len(kwargs[argument])
+        stats.record(perf_counter_ns() - start, numBytes)
+        return result
+
+    return wrapper
+
+
+def enable(target: Optional[Registry] = None) -> None:
+    '''
+    Start instrumenting the encode and decode methods, recording into
+    ``target`` or the module-level ``registry``.
+    '''
+
+    if _originals:
+        disable()
+
+    if target is None:
+        target = registry
+
+    for cls, name, fromResult in _INSTRUMENTED:
+        method = cls.__dict__[name]
+        _originals[(cls, name)] = method
+        stats = target.operation('{}.{}'.format(cls.__name__, name))
+        setattr(cls, name, _wrap(method, stats, fromResult))
+
+
+def disable() -> None:
+    '''
+    Stop instrumenting, restoring the original methods.
+    '''
+
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+
+
+def isEnabled() -> bool:
+    return bool(_originals)
@@ -0,0 +1,95 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List, Union
+from .rtp import RTP
+
+
+class PacketPool:
+    '''
+    A freelist of ``RTP`` instances for receive loops that decode a packet,
+    use it briefly, and move on. Recycled instances keep their ``CSRCList``,
+    ``Extension`` and payload bytearray, which are overwritten in place by
+    :meth:`decode` rather than reallocated. The payload bytearray keeps its
+    allocation as long as packet sizes stay roughly stable, as they do for
+    most media streams.
+
+    An instance must not be used after it has been released back to the pool.
+
+    Attributes:
+        maxSize (int): The most released instances the pool will hold on to.
+        allocated (int): The number of instances the pool has created.
+        reused (int): The number of times an instance was taken from the pool
+            rather than created.
+    '''
+
+    def __init__(self, maxSize: int = 256) -> None:
+        if maxSize < 0:
+            raise ValueError("PacketPool maxSize must not be negative")
+
+        self.maxSize = maxSize
+        self.allocated = 0
+        self.reused = 0
+        self._free: List[RTP] = []
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def _new(self) -> RTP:
+        self.allocated += 1
+        return RTP(sequenceNumber=0, ssrc=0)
+
+    def acquire(self) -> RTP:
+        '''
+        Take an instance from the pool, creating one if the pool is empty. The
+        fields of a recycled instance hold whatever it was last populated
+        with.
+        '''
+
+        if self._free:
+            self.reused += 1
+            return self._free.pop()
+
+        return self._new()
+
+    def release(self, packet: RTP) -> None:
+        '''
+        Return an instance to the pool. If the pool is already full the
+        instance is left for the garbage collector.
+        '''
+
+        if len(self._free) < self.maxSize:
+            self._free.append(packet)
+
+    def decode(self, packet: Union[bytearray, memoryview]) -> RTP:
+        '''
+        Populate a pooled instance from an encoded packet. If decoding raises,
+        the instance is returned to the pool before the error propagates.
+        '''
+
+        instance = self.acquire()
+        try:
+            return instance.fromBytearray(packet, reuseBuffers=True)
+        except Exception:
+            self.release(instance)
+            raise
+
+    def prefill(self, count: int) -> None:
+        '''
+        Allocate instances up front, up to ``maxSize``, so that the first
+        packets of a stream don't pay for allocation.
+        '''
+
+        while (len(self._free) < min(count, self.maxSize)):
+            self._free.append(self._new())
@@ -0,0 +1,238 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+from multiprocessing import shared_memory
+from struct import Struct
+from typing import Optional, Union, cast
+from .errors import LengthError
+
+# Write and read indices live on separate cache lines so the producer and
+# consumer don't contend for the same line.
+_WRITE_INDEX_OFFSET = 0
+_READ_INDEX_OFFSET = 64
+_GEOMETRY_OFFSET = 128
+_HEADER_SIZE = 192
+
+_index = Struct('=Q')
+_geometry = Struct('=II')
+_slotLength = Struct('=I')
+
+
+class PacketRing:
+    '''
+    A single-producer, single-consumer ring of datagram slots held in
+    ``multiprocessing.shared_memory``. One process writes datagrams into the
+    ring and another reads them back as ``memoryview`` objects onto the
+    shared block, so packets cross the process boundary without being pickled
+    or copied.
+
+    Only the name of the ring needs passing to the other process, which then
+    attaches with ``PacketRing(name=name)``. The slot geometry is stored in
+    the shared block.
+
+    Attributes:
+        name (str): The name of the shared memory block.
+        slotCount (int): The number of slots in the ring.
+        slotSize (int): The largest datagram, in bytes, a slot can hold.
+    '''
+
+    def __init__(
+       self,
+       slotCount: int = 1024,
+       slotSize: int = 2048,
+       name: Optional[str] = None) -> None:
+        if name is None:
+            if slotCount <= 0:
+                raise ValueError("PacketRing slotCount must be positive")
+            if slotSize <= 0:
+                raise ValueError("PacketRing slotSize must be positive")
+
+            stride = (_slotLength.size + slotSize + 7) & ~7
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=_HEADER_SIZE + (stride * slotCount))
+            self._owner = True
+            self._buf = cast(memoryview, self._shm.buf)
+            _index.pack_into(self._buf, _WRITE_INDEX_OFFSET, 0)
+            _index.pack_into(self._buf, _READ_INDEX_OFFSET, 0)
+            _geometry.pack_into(
+                self._buf, _GEOMETRY_OFFSET, slotCount, slotSize)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+            self._buf = cast(memoryview, self._shm.buf)
+            slotCount, slotSize = _geometry.unpack_from(
+                self._buf, _GEOMETRY_OFFSET)
+
+        self._slotCount = slotCount
+        self._slotSize = slotSize
+        self._stride = (_slotLength.size + slotSize + 7) & ~7
+
+    def __enter__(self) -> 'PacketRing':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    def __len__(self) -> int:
+        return self._writeIndex() - self._readIndex()
+
+    def __reduce__(self) -> tuple:
+        # Only the name crosses the process boundary; the receiving process
+        # attaches to the existing block.
+        return (self.__class__, (self._slotCount, self._slotSize, self.name))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def slotCount(self) -> int:
+        return self._slotCount
+
+    @property
+    def slotSize(self) -> int:
+        return self._slotSize
+
+    def _writeIndex(self) -> int:
+        return _index.unpack_from(self._buf, _WRITE_INDEX_OFFSET)[0]
+
+    def _readIndex(self) -> int:
+        return _index.unpack_from(self._buf, _READ_INDEX_OFFSET)[0]
+
+    def _slotOffset(self, index: int) -> int:
+        return _HEADER_SIZE + (self._stride * (index % self._slotCount))
+
+    def reserve(self) -> Optional[memoryview]:
+        '''
+        Return a writable view of the next free slot, or ``None`` if the ring
+        is full. Fill the view and then call :meth:`commit`.
+        '''
+
+        writeIndex = self._writeIndex()
+        if (writeIndex - self._readIndex()) >= self._slotCount:
+            return None
+
+        start = self._slotOffset(writeIndex) + _slotLength.size
+        return self._buf[start:start + self._slotSize]
+
+    def commit(self, length: int) -> None:
+        '''
+        Publish the slot most recently returned by :meth:`reserve` as holding
+        a datagram of ``length`` bytes.
+        '''
+
+        if (length < 0) or (length > self._slotSize):
+            raise LengthError("Datagram length doesn't fit in ring slot")
+
+        writeIndex = self._writeIndex()
+        _slotLength.pack_into(
+            self._buf, self._slotOffset(writeIndex), length)
+        _index.pack_into(self._buf, _WRITE_INDEX_OFFSET, writeIndex + 1)
+
+    def put(self, datagram: Union[bytes, memoryview]) -> bool:
+        '''
+        Copy a datagram into the ring. Returns ``False`` if the ring is full.
+        '''
+
+        length = len(datagram)
+        if length > self._slotSize:
+            raise LengthError("Datagram is larger than the ring slot size")
+
+        slot = self.reserve()
+        if slot is None:
+            return False
+
+        slot[:length] = datagram
+        self.commit(length)
+        return True
+
+    def recvInto(self, sock: socket.socket) -> int:
+        '''
+        Receive one datagram from ``sock`` directly into the next free slot.
+        Returns the number of bytes received, or ``-1`` if the ring is full,
+        in which case the datagram is left queued on the socket.
+        '''
+
+        slot = self.reserve()
+        if slot is None:
+            return -1
+
+        length = sock.recv_into(slot)
+        self.commit(length)
+        return length
+
+    def peek(self, writable: bool = False) -> Optional[memoryview]:
+        '''
+        Return a view of the oldest datagram in the ring, or ``None`` if the
+        ring is empty. The view is read-only unless ``writable`` is set, e.g.
+        to rewrite headers in place before forwarding. It is only valid until
+        :meth:`release` is called.
+        '''
+
+        readIndex = self._readIndex()
+        if readIndex == self._writeIndex():
+            return None
+
+        offset = self._slotOffset(readIndex)
+        length = _slotLength.unpack_from(self._buf, offset)[0]
+        start = offset + _slotLength.size
+        view = self._buf[start:start + length]
+        if writable:
+            return view
+        return view.toreadonly()
+
+    def release(self) -> None:
+        '''
+        Hand the oldest slot back to the producer.
+        '''
+
+        readIndex = self._readIndex()
+        if readIndex == self._writeIndex():
+            raise IndexError("Release from empty PacketRing")
+
+        _index.pack_into(self._buf, _READ_INDEX_OFFSET, readIndex + 1)
+
+    def get(self) -> Optional[bytes]:
+        '''
+        Remove the oldest datagram from the ring and return a copy of it, or
+        ``None`` if the ring is empty.
+        '''
+
+        view = self.peek()
+        if view is None:
+            return None
+
+        datagram = bytes(view)
+        view.release()
+        self.release()
+        return datagram
+
+    def close(self) -> None:
+        '''
+        Detach from the shared memory block. Any views handed out must have
+        been released first.
+        '''
+
+        self._shm.close()
+
+    def unlink(self) -> None:
+        '''
+        Destroy the shared memory block. Only the creating process should call
+        this.
+        '''
+
+        self._shm.unlink()
@@ -0,0 +1,97 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Read individual RTP header fields straight from an encoded packet without
+decoding it into an ``RTP``. Any buffer is accepted. Nothing is validated, so
+check the packet first (e.g. with ``checkPacket``) if it may be malformed; a
+buffer shorter than the fixed header raises ``struct.error``.
+'''
+
+from struct import Struct
+from typing import NamedTuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+HEADER = Struct('!BBHII')
+_uint16 = Struct('!H')
+_uint32 = Struct('!I')
+
+
+class PeekedHeader(NamedTuple):
+    '''
+    The fixed fields of an RTP header, as returned by :func:`peekHeader`.
+    ``payloadType`` is the raw number rather than a ``PayloadType``.
+    '''
+
+    version: int
+    padding: bool
+    hasExtension: bool
+    csrcCount: int
+    marker: bool
+    payloadType: int
+    sequenceNumber: int
+    timestamp: int
+    ssrc: int
+
+
+def peekHeader(buf: Buffer) -> PeekedHeader:
+    '''
+    Read all the fixed header fields.
+    '''
+
+    first, second, sequenceNumber, timestamp, ssrc = HEADER.unpack_from(buf)
+    return PeekedHeader(
+        first >> 6,
+        (first & 0x20) != 0,
+        (first & 0x10) != 0,
+        first & 0x0f,
+        (second & 0x80) != 0,
+        second & 0x7f,
+        sequenceNumber,
+        timestamp,
+        ssrc)
+
+
+def peekMarker(buf: Buffer) -> bool:
+    return (buf[1] & 0x80) != 0
+
+
+def peekPayloadType(buf: Buffer) -> int:
+    return buf[1] & 0x7f
+
+
+def peekSequenceNumber(buf: Buffer) -> int:
+    return _uint16.unpack_from(buf, 2)[0]
+
+
+def peekTimestamp(buf: Buffer) -> int:
+    return _uint32.unpack_from(buf, 4)[0]
+
+
+def peekSSRC(buf: Buffer) -> int:
+    return _uint32.unpack_from(buf, 8)[0]
+
+
+def peekPayloadOffset(buf: Buffer) -> int:
+    '''
+    Get the offset of the payload, i.e. the length of the fixed header, CSRC
+    list and header extension.
+    '''
+
+    offset = 12 + (4 * (buf[0] & 0x0f))
+    if buf[0] & 0x10:
+        offset += 4 + (4 * _uint16.unpack_from(buf, offset + 2)[0])
+
+    return offset
@@ -0,0 +1,497 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+A small framework for receive and send pipelines that pass batches of
+packets from stage to stage rather than one packet at a time.
+
+A stage is a function taking an iterator of batches (lists) and returning
+an iterator of batches, usually a generator. A :class:`Pipeline` chains a
+source, which is any iterable of batches, through its stages. Run directly,
+the stages are nested generators in the calling thread. Run threaded, each
+stage has a thread of its own and stages are joined by bounded queues, so a
+slow stage holds back the ones before it rather than letting batches pile
+up. Either way, each stage's throughput and the time spent in its own code
+are counted, which shows where the bottleneck is.
+'''
+
+import heapq
+import queue
+import socket
+import threading
+from itertools import count, islice
+from time import perf_counter_ns
+from typing import (
+    Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Sequence,
+    Tuple, Union)
+from .capture import openCapture
+from .decoder import DecodeCounters, tryDecode
+from .frameAssembler import FrameAssembler
+from .gso import GSOSender
+from .instrumentation import Histogram
+from .rtp import RTP
+from .timestamping import TimestampedReader
+from .unwrap import Unwrapper
+
+Batch = List[Any]
+StageFunction = Callable[[Iterator[Batch]], Iterator[Batch]]
+
+# Marks the end of the batches in a queue between threaded stages
+_END = object()
+
+
+class StageStats:
+    '''
+    Counters for one stage of a :class:`Pipeline`.
+
+    Attributes:
+        batchesIn (int): Batches taken from the stage before.
+        itemsIn (int): Items in those batches.
+        batchesOut (int): Batches passed on.
+        itemsOut (int): Items in those batches.
+        busy (int): Nanoseconds spent in the stage's own code.
+        blocked (int): Nanoseconds spent waiting for room in the queue to the
+            next stage, when threaded.
+        latency (:obj:`Histogram`): Nanoseconds spent in the stage's own code
+            to produce each batch.
+    '''
+
+    def __init__(self) -> None:
+        self.batchesIn = 0
+        self.itemsIn = 0
+        self.batchesOut = 0
+        self.itemsOut = 0
+        self.busy = 0
+        self.blocked = 0
+        self.latency = Histogram()
+
+    @property
+    def throughput(self) -> float:
+        '''
+        Items taken in per second of the stage's own time.
+        '''
+
+        if self.busy == 0:
+            return 0.0
+        return self.itemsIn * 1e9 / self.busy
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'batchesIn': self.batchesIn,
+            'itemsIn': self.itemsIn,
+            'batchesOut': self.batchesOut,
+            'itemsOut': self.itemsOut,
+            'busy': self.busy,
+            'blocked': self.blocked,
+            'throughput': self.throughput,
+            'latency': self.latency.snapshot()}
+
+
+class Stage:
+    '''
+    A named stage function.
+
+    Attributes:
+        name (str): The name the stage's statistics are reported under.
+        function (callable): Takes an iterator of batches and returns an
+            iterator of batches.
+    '''
+
+    def __init__(self, name: str, function: StageFunction) -> None:
+        self.name = name
+        self.function = function
+
+
+class _Meter:
+    # Times each batch pulled through an iterator, less the time spent
+    # pulling from the meter upstream of it
+    def __init__(
+       self,
+       iterator: Iterator[Batch],
+       stats: Optional[StageStats],
+       upstream: Optional['_Meter'] = None,
+       inputStats: Optional[StageStats] = None) -> None:
+        self._iterator = iterator
+        self._stats = stats
+        self._upstream = upstream
+        self._inputStats = inputStats
+        self.elapsed = 0
+
+    def __iter__(self) -> '_Meter':
+        return self
+
+    def __next__(self) -> Batch:
+        upstream = self._upstream
+        before = upstream.elapsed if upstream is not None else 0
+        start = perf_counter_ns()
+        try:
+            batch = next(self._iterator)
+        finally:
+            elapsed = perf_counter_ns() - start
+            self.elapsed += elapsed
+            if upstream is not None:
+                elapsed -= upstream.elapsed - before
+            if self._stats is not None:
+                self._stats.busy += elapsed
+
+        if self._stats is not None:
+            self._stats.batchesOut += 1
+            self._stats.itemsOut += len(batch)
+            self._stats.latency.record(elapsed)
+        if self._inputStats is not None:
+            self._inputStats.batchesIn += 1
+            self._inputStats.itemsIn += len(batch)
+        return batch
+
+
+class Pipeline:
+    '''
+    A source of batches followed by a chain of stages. Stages can be
+    :class:`Stage` objects or bare functions, which are named after the
+    function. The last stage is normally a sink; whatever it yields is
+    discarded by :meth:`run`, or iterating over the pipeline yields it.
+
+    Attributes:
+        names (list): The name of the source followed by each stage's.
+        queueSize (int): The most batches held between two threaded stages.
+    '''
+
+    def __init__(
+       self,
+       source: Iterable[Batch],
+       stages: Sequence[Union[Stage, StageFunction]],
+       queueSize: int = 4) -> None:
+        self._source = source
+        self._stages = [
+            s if isinstance(s, Stage) else Stage(s.__name__, s)
+            for s in stages]
+        self.queueSize = queueSize
+        self.names = ['source'] + [s.name for s in self._stages]
+        self._stats = {name: StageStats() for name in self.names}
+        if len(self._stats) != len(self.names):
+            raise ValueError("Pipeline stage names must be unique")
+
+        self._stop = threading.Event()
+
+    def stats(self) -> Dict[str, StageStats]:
+        return dict(self._stats)
+
+    def snapshot(self) -> Dict[str, Any]:
+        '''
+        Every stage's statistics, keyed by name, e.g. for registering with
+        an instrumentation ``Registry``.
+        '''
+
+        return {name: self._stats[name].snapshot() for name in self.names}
+
+    def __iter__(self) -> Iterator[Batch]:
+        '''
+        Run the pipeline in this thread, yielding the batches from the last
+        stage.
+        '''
+
+        iterator = _Meter(iter(self._source), self._stats['source'])
+        for stage in self._stages:
+            stats = self._stats[stage.name]
+            upstream = _Meter(iterator, None, None, stats)
+            iterator = _Meter(iter(stage.function(upstream)), stats, upstream)
+        return iterator
+
+    def run(self, threaded: bool = False) -> None:
+        '''
+        Run the pipeline until the source is exhausted or :meth:`stop` is
+        called. If ``threaded`` each stage runs in a thread of its own. An
+        exception raised by any stage stops the pipeline and is raised
+        here.
+        '''
+
+        self._stop.clear()
+        if not threaded:
+            for _ in self:
+                if self._stop.is_set():
+                    break
+            return
+
+        errors: List[BaseException] = []
+        queues: List[queue.Queue] = [
+            queue.Queue(self.queueSize) for _ in self._stages]
+        threads = [threading.Thread(
+            target=self._feed,
+            args=(
+                _Meter(iter(self._source), self._stats['source']),
+                queues[0] if queues else None, self._stats['source'],
+                errors),
+            daemon=True)]
+        for i, stage in enumerate(self._stages):
+            stats = self._stats[stage.name]
+            upstream = _Meter(self._drain(queues[i]), None, None, stats)
+            iterator = _Meter(iter(stage.function(upstream)), stats, upstream)
+            output = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(
+                target=self._feed, args=(iterator, output, stats, errors),
+                daemon=True))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def stop(self) -> None:
+        '''
+        Stop a running pipeline. Batches already taken from the source may
+        be dropped.
+        '''
+
+        self._stop.set()
+
+    def _put(self, output: queue.Queue, item: Any, stats: StageStats) -> bool:
+        start = perf_counter_ns()
+        try:
+            while not self._stop.is_set():
+                try:
+                    output.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            stats.blocked += perf_counter_ns() - start
+
+    def _drain(self, input: queue.Queue) -> Iterator[Batch]:
+        while True:
+            try:
+                item = input.get(timeout=0.05)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def _feed(
+       self,
+       iterator: Iterator[Batch],
+       output: Optional[queue.Queue],
+       stats: StageStats,
+       errors: List[BaseException]) -> None:
+        try:
+            for batch in iterator:
+                if self._stop.is_set():
+                    return
+                if (output is not None) and not self._put(
+                        output, batch, stats):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            self._stop.set()
+        finally:
+            if output is not None:
+                self._put(output, _END, stats)
+
+
+def captureSource(path: str, batchSize: int = 256) -> Iterator[Batch]:
+    '''
+    A source of batches of ``(arrival time, datagram)`` pairs from a pcap
+    or rtpdump capture. Datagrams are copied out of the capture so that
+    batches can outlive it.
+    '''
+
+    with openCapture(path) as reader:
+        iterator = iter(reader)
+        while True:
+            batch = [(t, bytes(d)) for t, d in islice(iterator, batchSize)]
+            if not batch:
+                return
+            yield batch
+
+
+def socketSource(
+       sock: socket.socket,
+       batchSize: int = 64,
+       stop: Optional[threading.Event] = None,
+       maxPacketSize: int = 2048) -> Iterator[Batch]:
+    '''
+    A source of batches of ``(arrival time, datagram)`` pairs received on
+    ``sock``, timestamped by the kernel where possible. Each batch is what
+    was waiting on the socket, up to ``batchSize`` datagrams. If ``sock``
+    has a timeout, ``stop`` is checked each time it expires.
+    '''
+
+    reader = TimestampedReader(sock, maxPacketSize)
+    while (stop is None) or not stop.is_set():
+        try:
+            datagram, arrivalTime = reader.read()
+        except socket.timeout:
+            continue
+
+        batch = [(arrivalTime, bytes(datagram))]
+        timeout = sock.gettimeout()
+        sock.settimeout(0.0)
+        try:
+            while len(batch) < batchSize:
+                datagram, arrivalTime = reader.read()
+                batch.append((arrivalTime, bytes(datagram)))
+        except BlockingIOError:
+            pass
+        finally:
+            sock.settimeout(timeout)
+        yield batch
+
+
+def decode(counters: Optional[DecodeCounters] = None) -> Stage:
+    '''
+    A stage decoding ``(arrival time, datagram)`` pairs to ``RTP`` with
+    their ``arrivalTime`` set. Malformed datagrams are dropped, and counted
+    in ``counters`` if given.
+    '''
+
+    def decode(batches: Iterator[Batch]) -> Iterator[Batch]:
+        for batch in batches:
+            packets = []
+            for arrivalTime, datagram in batch:
+                _, packet = tryDecode(datagram, counters)
+                if packet is not None:
+                    packet.arrivalTime = arrivalTime
+                    packets.append(packet)
+            yield packets
+
+    return Stage('decode', decode)
+
+
+def demux(ssrcs: Optional[Iterable[int]] = None) -> Stage:
+    '''
+    A stage splitting each batch of ``RTP`` into a batch per SSRC, in order
+    of first appearance. If ``ssrcs`` is given, packets of other SSRCs are
+    dropped.
+    '''
+
+    wanted = None if ssrcs is None else frozenset(ssrcs)
+
+    def demux(batches: Iterator[Batch]) -> Iterator[Batch]:
+        for batch in batches:
+            groups: Dict[int, List[RTP]] = {}
+            for packet in batch:
+                if (wanted is None) or (packet.ssrc in wanted):
+                    groups.setdefault(packet.ssrc, []).append(packet)
+            yield from groups.values()
+
+    return Stage('demux', demux)
+
+
+def reorder(depth: int = 8) -> Stage:
+    '''
+    A stage putting ``RTP`` back into sequence number order, per SSRC.
+    Packets are held until ``depth`` later ones have arrived, so reordering
+    by up to ``depth`` packets is undone. Duplicates are dropped, and so are
+    packets arriving after a later one has been passed on.
+    '''
+
+    def reorder(batches: Iterator[Batch]) -> Iterator[Batch]:
+        order = count()
+        held: Dict[int, List[Tuple[int, int, RTP]]] = {}
+        unwrappers: Dict[int, Unwrapper] = {}
+        released: Dict[int, int] = {}
+
+        for batch in batches:
+            out = []
+            for packet in batch:
+                ssrc = packet.ssrc
+                unwrapper = unwrappers.get(ssrc)
+                if unwrapper is None:
+                    unwrapper = unwrappers[ssrc] = Unwrapper(16)
+                    held[ssrc] = []
+                sequence = unwrapper.unwrap(packet.sequenceNumber)
+                if sequence <= released.get(ssrc, sequence - 1):
+                    continue
+
+                heap = held[ssrc]
+                heapq.heappush(heap, (sequence, next(order), packet))
+                while len(heap) > depth:
+                    sequence, _, packet = heapq.heappop(heap)
+                    if sequence > released.get(ssrc, sequence - 1):
+                        released[ssrc] = sequence
+                        out.append(packet)
+            yield out
+
+        out = []
+        for ssrc, heap in held.items():
+            while heap:
+                sequence, _, packet = heapq.heappop(heap)
+                if sequence > released.get(ssrc, sequence - 1):
+                    released[ssrc] = sequence
+                    out.append(packet)
+        yield out
+
+    return Stage('reorder', reorder)
+
+
+def depacketize(maxFrames: int = 8, timeout: float = 0.1) -> Stage:
+    '''
+    A stage grouping ``RTP`` into :class:`Frame` objects with a
+    :class:`FrameAssembler` per SSRC. Frames still in flight when the input
+    ends are delivered as they are.
+    '''
+
+    def depacketize(batches: Iterator[Batch]) -> Iterator[Batch]:
+        assemblers: Dict[int, FrameAssembler] = {}
+        for batch in batches:
+            frames = []
+            for packet in batch:
+                assembler = assemblers.get(packet.ssrc)
+                if assembler is None:
+                    assembler = assemblers[packet.ssrc] = FrameAssembler(
+                        maxFrames, timeout)
+                frames.extend(assembler.add(packet, packet.arrivalTime))
+            yield frames
+
+        yield [f for a in assemblers.values() for f in a.flush()]
+
+    return Stage('depacketize', depacketize)
+
+
+def fileSink(file: IO[bytes]) -> Stage:
+    '''
+    A sink writing the payloads of each :class:`Frame` to ``file``, without
+    joining them first. Each batch is passed on once written.
+    '''
+
+    def fileSink(batches: Iterator[Batch]) -> Iterator[Batch]:
+        for batch in batches:
+            for frame in batch:
+                file.writelines(frame.payloads)
+            yield batch
+
+    return Stage('fileSink', fileSink)
+
+
+def socketSink(
+       sock: socket.socket,
+       address: Optional[Tuple[str, int]] = None) -> Stage:
+    '''
+    A sink sending each batch of ``RTP`` from ``sock`` with a
+    :class:`GSOSender`, to ``address`` or the connected peer. Each batch is
+    passed on once sent.
+    '''
+
+    def socketSink(batches: Iterator[Batch]) -> Iterator[Batch]:
+        sender = GSOSender(sock)
+        for batch in batches:
+            sender.send(batch, address)
+            yield batch
+
+    return Stage('socketSink', socketSink)
@@ -0,0 +1,315 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import mmap
+import os
+import re
+import time
+from struct import Struct
+from typing import (
+    BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple,
+    Union)
+from .errors import LengthError
+from .peek import peekSequenceNumber, peekSSRC, peekTimestamp
+from .rtp import RTP
+from .unwrap import Unwrapper
+
+# Each datagram in a segment file is preceded by its length
+_length = Struct('!H')
+
+# Index records: extended sequence number, RTP timestamp, arrival time and
+# offset of the datagram's length prefix in the segment file
+_indexRecord = Struct('!qIdQ')
+
+DATA_SUFFIX = '.rtpseg'
+INDEX_SUFFIX = '.rtpidx'
+
+
+class IndexRecord(NamedTuple):
+    '''
+    One entry of a recording's index.
+    '''
+
+    sequence: int
+    timestamp: int
+    arrivalTime: float
+    offset: int
+
+
+def _segmentName(prefix: str, segment: int, suffix: str) -> str:
+    return '{}-{:06d}{}'.format(prefix, segment, suffix)
+
+
+def _segmentPaths(prefix: str, suffix: str) -> List[str]:
+    # The segment files of the recording at prefix, in order, and not those
+    # of another recording whose prefix starts with this one
+    pattern = re.compile(re.escape(prefix) + r'-\d{6}' + re.escape(suffix))
+    return sorted(
+        path for path in glob.glob(glob.escape(prefix) + '-*' + suffix)
+        if pattern.fullmatch(path))
+
+
+class Recorder:
+    '''
+    Writes RTP datagrams to a recording made up of segment files, each with a
+    sidecar index of fixed-width :class:`IndexRecord` entries. A new segment
+    is started once the current one reaches ``segmentSize`` bytes. Sequence
+    numbers are extended per SSRC so they keep increasing across wraps.
+
+    Any existing recording at ``prefix`` is removed when recording starts,
+    so none of its segments outlive it. Datagrams are not validated beyond
+    needing a complete fixed header.
+
+    Attributes:
+        prefix (str): The path prefix of the segment and index files.
+        segmentSize (int): The size, in bytes, at which to start a new
+            segment.
+        segment (int): The number of the segment being written.
+    '''
+
+    def __init__(self, prefix: str, segmentSize: int = 2**30) -> None:
+        self.prefix = prefix
+        self.segmentSize = segmentSize
+        self.segment = -1
+        self._data: Optional[BinaryIO] = None
+        self._index: Optional[BinaryIO] = None
+        self._offset = 0
+        self._unwrappers: Dict[int, Unwrapper] = {}
+        for suffix in (DATA_SUFFIX, INDEX_SUFFIX):
+            for path in _segmentPaths(prefix, suffix):
+                os.remove(path)
+        self._nextSegment()
+
+    def __enter__(self) -> 'Recorder':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _nextSegment(self) -> None:
+        self.close()
+        self.segment += 1
+        self._data = open(
+            _segmentName(self.prefix, self.segment, DATA_SUFFIX), 'wb')
+        self._index = open(
+            _segmentName(self.prefix, self.segment, INDEX_SUFFIX), 'wb')
+        self._offset = 0
+
+    def write(
+       self,
+       datagram: Union[bytes, bytearray, memoryview],
+       arrivalTime: Optional[float] = None) -> None:
+        '''
+        Append a datagram to the recording. ``arrivalTime`` defaults to the
+        current time.
+        '''
+
+        if (len(datagram) < 12) or (len(datagram) >= 2**16):
+            raise LengthError("Recorded datagrams must be 12-65535 bytes")
+
+        if (self._data is None) or (self._index is None):
+            raise ValueError("Recorder is closed")
+
+        if arrivalTime is None:
+            arrivalTime = time.time()
+
+        if self._offset >= self.segmentSize:
+            self._nextSegment()
+            return self.write(datagram, arrivalTime)
+
+        ssrc = peekSSRC(datagram)
+        unwrapper = self._unwrappers.get(ssrc)
+        if unwrapper is None:
+            unwrapper = self._unwrappers[ssrc] = Unwrapper(16)
+
+        self._index.write(_indexRecord.pack(
+            unwrapper.unwrap(peekSequenceNumber(datagram)),
+            peekTimestamp(datagram),
+            arrivalTime,
+            self._offset))
+        self._data.write(_length.pack(len(datagram)))
+        self._data.write(datagram)
+        self._offset += _length.size + len(datagram)
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+
+class _Segment:
+    def __init__(self, dataPath: str, indexPath: str) -> None:
+        with open(dataPath, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(indexPath, 'rb') as f:
+            self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.length = len(self.index) // _indexRecord.size
+
+    def record(self, i: int) -> IndexRecord:
+        return IndexRecord._make(
+            _indexRecord.unpack_from(self.index, i * _indexRecord.size))
+
+    def datagram(self, offset: int) -> memoryview:
+        length = _length.unpack_from(self.data, offset)[0]
+        start = offset + _length.size
+        return memoryview(self.data)[start:start + length]
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+
+class RecordingReader:
+    '''
+    Reads a recording written by :class:`Recorder`. Segment and index files
+    are memory mapped, and positions are found by binary search of the
+    index, so seeking doesn't depend on the length of the recording.
+
+    Positions are record numbers counted from the start of the recording.
+    Datagrams are returned as ``memoryview`` objects onto the mapped files,
+    which must all be released before :meth:`close` is called.
+    '''
+
+    def __init__(self, prefix: str) -> None:
+        self._segments: List[_Segment] = []
+        self._starts: List[int] = []
+        total = 0
+        for dataPath in _segmentPaths(prefix, DATA_SUFFIX):
+            indexPath = dataPath[:-len(DATA_SUFFIX)] + INDEX_SUFFIX
+            if self._isEmpty(indexPath):
+                continue
+            segment = _Segment(dataPath, indexPath)
+            self._segments.append(segment)
+            self._starts.append(total)
+            total += segment.length
+        self._length = total
+
+    @staticmethod
+    def _isEmpty(path: str) -> bool:
+        with open(path, 'rb') as f:
+            return len(f.read(1)) == 0
+
+    def __enter__(self) -> 'RecordingReader':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _locate(self, position: int) -> Tuple[_Segment, int]:
+        if (position < 0) or (position >= self._length):
+            raise IndexError("Recording position out of range")
+
+        lo, hi = 0, len(self._starts)
+        while (hi - lo) > 1:
+            mid = (lo + hi) // 2
+            if self._starts[mid] <= position:
+                lo = mid
+            else:
+                hi = mid
+
+        return (self._segments[lo], position - self._starts[lo])
+
+    def record(self, position: int) -> IndexRecord:
+        '''
+        Get the index entry at ``position``.
+        '''
+
+        segment, i = self._locate(position)
+        return segment.record(i)
+
+    def datagram(self, position: int) -> memoryview:
+        '''
+        Get the datagram at ``position``.
+        '''
+
+        segment, i = self._locate(position)
+        return segment.datagram(segment.record(i).offset)
+
+    def _search(
+       self, key: Callable[[IndexRecord], float], target: float) -> int:
+        lo, hi = 0, self._length
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(self.record(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def seekTime(self, arrivalTime: float) -> int:
+        '''
+        Get the position of the first datagram that arrived at or after
+        ``arrivalTime``. Returns ``len(self)`` if there is none.
+        '''
+
+        return self._search(lambda r: r.arrivalTime, arrivalTime)
+
+    def seekSequence(self, sequence: int) -> int:
+        '''
+        Get the position of the first datagram with an extended sequence
+        number of at least ``sequence``. Returns ``len(self)`` if there is
+        none. The search assumes a single stream in (mostly) sequence order.
+        '''
+
+        return self._search(lambda r: r.sequence, sequence)
+
+    def records(
+       self,
+       start: int = 0,
+       stop: Optional[int] = None) -> Iterator[Tuple[IndexRecord, memoryview]]:
+        '''
+        Iterate over index entries and datagrams from ``start`` up to, but
+        not including, ``stop``.
+        '''
+
+        if stop is None or stop > self._length:
+            stop = self._length
+
+        position = max(start, 0)
+        while position < stop:
+            segment, i = self._locate(position)
+            end = min(segment.length, i + (stop - position))
+            for j in range(i, end):
+                record = segment.record(j)
+                yield (record, segment.datagram(record.offset))
+            position += end - i
+
+    def packets(
+       self,
+       start: int = 0,
+       stop: Optional[int] = None) -> Iterator[RTP]:
+        '''
+        Iterate over datagrams, decoded as ``RTP``, from ``start`` up to, but
+        not including, ``stop``.
+        '''
+
+        for _, datagram in self.records(start, stop):
+            with datagram:
+                packet = RTP().fromBytearray(datagram)
+            yield packet
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+        self._starts = []
+        self._length = 0
@@ -0,0 +1,250 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+from struct import Struct
+from typing import Deque, List, NamedTuple, Optional, Set, Tuple, Union
+from .errors import LengthError
+from .payloadType import PayloadType
+from .rtp import RTP
+from .unwrap import Unwrapper
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+MAX_OFFSET = (2**14) - 1
+MAX_LENGTH = (2**10) - 1
+
+_blockHeader = Struct('!BHB')
+
+
+class REDBlock(NamedTuple):
+    '''
+    A block parsed from a RED payload.
+
+    Attributes:
+        payloadType (int): The block's payload type number.
+        timestampOffset (int): How far the block's timestamp is behind the
+            packet's. ``0`` for the primary block.
+        data (memoryview): The block's data, viewed in the payload.
+    '''
+
+    payloadType: int
+    timestampOffset: int
+    data: memoryview
+
+
+class REDFrame(NamedTuple):
+    '''
+    A block of audio delivered by a :class:`REDDecoder`.
+
+    Attributes:
+        timestamp (int): The block's RTP timestamp.
+        payloadType (int): The block's payload type number.
+        data (memoryview): The block's data, viewed in the packet's payload.
+        recovered (bool): Whether the block was recovered from redundancy
+            because its own packet was lost.
+    '''
+
+    timestamp: int
+    payloadType: int
+    data: memoryview
+    recovered: bool
+
+
+def parseRED(payload: Buffer) -> List[REDBlock]:
+    '''
+    Split an RFC 2198 RED payload into its blocks, oldest first and the
+    primary block last. Block data is not copied.
+    '''
+
+    view = memoryview(payload)
+    headers: List[Tuple[int, int, int]] = []
+    offset = 0
+    while True:
+        if offset >= len(view):
+            raise LengthError("RED payload is truncated in its headers")
+        if view[offset] & 0x80:
+            if offset + _blockHeader.size > len(view):
+                raise LengthError("RED payload is truncated in its headers")
+            first, middle, last = _blockHeader.unpack_from(view, offset)
+            headers.append((
+                first & 0x7f, middle >> 2, ((middle & 0x3) << 8) | last))
+            offset += _blockHeader.size
+        else:
+            primaryType = view[offset] & 0x7f
+            offset += 1
+            break
+
+    blocks = []
+    for payloadType, timestampOffset, length in headers:
+        if offset + length > len(view):
+            raise LengthError("RED payload is shorter than its blocks")
+        blocks.append(REDBlock(
+            payloadType, timestampOffset, view[offset:offset + length]))
+        offset += length
+
+    blocks.append(REDBlock(primaryType, 0, view[offset:]))
+    return blocks
+
+
+class REDEncoder:
+    '''
+    Builds RFC 2198 RED payloads carrying each block of audio together with
+    copies of up to ``distance`` previous blocks. Previous blocks too old or
+    too long for a RED block header are left out.
+
+    Attributes:
+        payloadType (PayloadType): The payload type of the audio blocks.
+        distance (int): The number of previous blocks carried.
+    '''
+
+    def __init__(self, payloadType: PayloadType, distance: int = 1) -> None:
+        if type(payloadType) is not PayloadType:
+            raise AttributeError("PayloadType value must be PayloadType")
+        if distance < 0:
+            raise ValueError("RED distance must not be negative")
+
+        self.payloadType = payloadType
+        self.distance = distance
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=distance)
+
+    def encode(self, block: Buffer, timestamp: int) -> bytearray:
+        '''
+        Build the RED payload for the block of audio with ``timestamp``.
+        '''
+
+        redundant = []
+        for previous, data in self._history:
+            offset = (timestamp - previous) & 0xffffffff
+            if (0 < offset <= MAX_OFFSET) and (len(data) <= MAX_LENGTH):
+                redundant.append((offset, data))
+
+        size = (_blockHeader.size * len(redundant)) + 1 + len(block)
+        size += sum(len(data) for _, data in redundant)
+        payload = bytearray(size)
+
+        payloadType = self.payloadType.value
+        position = 0
+        for offset, data in redundant:
+            length = len(data)
+            _blockHeader.pack_into(
+                payload, position, 0x80 | payloadType,
+                (offset << 2) | (length >> 8), length & 0xff)
+            position += _blockHeader.size
+        payload[position] = payloadType
+        position += 1
+
+        for _, data in redundant:
+            payload[position:position + len(data)] = data
+            position += len(data)
+        payload[position:] = block
+
+        if self.distance:
+            self._history.append((timestamp, bytes(block)))
+
+        return payload
+
+    def encodeRTP(self, packet: RTP, redPayloadType: PayloadType) -> RTP:
+        '''
+        Replace the payload of ``packet`` with a RED payload carrying it,
+        and set its payload type to ``redPayloadType``.
+        '''
+
+        packet.payload = self.encode(packet.payload, packet.timestamp)
+        packet.payloadType = redPayloadType
+        return packet
+
+
+class REDDecoder:
+    '''
+    Unpacks RED payloads into blocks of audio in timestamp order, recovering
+    blocks whose own packets were lost from the redundancy in later packets.
+    Blocks already delivered are not delivered again, and a primary block
+    older than one already delivered is dropped as late.
+
+    Delivered blocks are ``memoryview`` objects onto the payload passed in.
+
+    Attributes:
+        delivered (int): Blocks delivered, including recovered blocks.
+        recovered (int): Blocks recovered from redundancy.
+        duplicates (int): Primary blocks dropped as already delivered.
+        late (int): Primary blocks dropped because a later block had already
+            been delivered.
+        history (int): The number of recent timestamps remembered to spot
+            blocks already delivered.
+    '''
+
+    def __init__(self, history: int = 64) -> None:
+        self.history = history
+        self.delivered = 0
+        self.recovered = 0
+        self.duplicates = 0
+        self.late = 0
+
+        self._unwrapper = Unwrapper(32)
+        self._highest: Optional[int] = None
+        self._seen: Set[int] = set()
+        self._order: Deque[int] = deque()
+
+    def _remember(self, extended: int) -> None:
+        self._seen.add(extended)
+        self._order.append(extended)
+        if len(self._order) > self.history:
+            self._seen.discard(self._order.popleft())
+
+    def decode(self, payload: Buffer, timestamp: int) -> List[REDFrame]:
+        '''
+        Unpack the RED payload of a packet with ``timestamp``.
+        '''
+
+        blocks = parseRED(payload)
+        extended = self._unwrapper.unwrap(timestamp)
+        frames: List[REDFrame] = []
+
+        if self._highest is not None:
+            # Oldest first, as they'd have arrived
+            for block in sorted(
+                    blocks[:-1], key=lambda b: -b.timestampOffset):
+                blockTimestamp = extended - block.timestampOffset
+                if ((blockTimestamp > self._highest) and
+                        (blockTimestamp not in self._seen)):
+                    self._remember(blockTimestamp)
+                    frames.append(REDFrame(
+                        blockTimestamp & 0xffffffff, block.payloadType,
+                        block.data, True))
+            self.recovered += len(frames)
+
+        primary = blocks[-1]
+        if extended in self._seen:
+            self.duplicates += 1
+        elif (self._highest is not None) and (extended < self._highest):
+            # Delivering it now would break timestamp order
+            self.late += 1
+        else:
+            self._remember(extended)
+            frames.append(REDFrame(
+                timestamp, primary.payloadType, primary.data, False))
+
+        if (self._highest is None) or (extended > self._highest):
+            self._highest = extended
+
+        self.delivered += len(frames)
+        return frames
+
+    def decodeRTP(self, packet: RTP) -> List[REDFrame]:
+        '''
+        Unpack the RED payload of a decoded packet.
+        '''
+
+        return self.decode(packet.payload, packet.timestamp)
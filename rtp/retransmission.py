@@ -0,0 +1,195 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+from random import randint
+from struct import Struct
+from typing import Iterable, List, Optional, Tuple, Union
+from .errors import LengthError
+from .payloadType import PayloadType
+from .peek import peekPayloadOffset, peekSequenceNumber
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_uint16 = Struct('!H')
+_uint32 = Struct('!I')
+
+
+def nackSequences(pid: int, blp: int) -> List[int]:
+    '''
+    Expand a Generic NACK entry (RFC 4585) into the sequence numbers it
+    reports lost: the packet ID itself, plus ``pid + i + 1`` for each bit
+    ``i`` set in the bitmask of following lost packets.
+    '''
+
+    sequences = [pid]
+    for i in range(16):
+        if (blp >> i) & 1:
+            sequences.append((pid + i + 1) & 0xffff)
+
+    return sequences
+
+
+class RTXPacketizer:
+    '''
+    Builds retransmission packets in the RFC 4588 format. Each one carries
+    the original packet's header fields and payload under its own SSRC,
+    payload type and sequence number, with the original sequence number
+    prepended to the payload.
+
+    Attributes:
+        ssrc (int): The SSRC of the retransmission stream.
+        payloadType (PayloadType): The payload type of the retransmission
+            stream.
+        sequenceNumber (int): The sequence number of the next retransmission
+            packet.
+    '''
+
+    def __init__(
+       self,
+       ssrc: int,
+       payloadType: PayloadType,
+       sequenceNumber: Optional[int] = None) -> None:
+        if type(payloadType) is not PayloadType:
+            raise AttributeError("PayloadType value must be PayloadType")
+        if (ssrc < 0) or (ssrc >= 2**32):
+            raise ValueError("SSRC must be in range 0-2**32")
+
+        self.ssrc = ssrc
+        self.payloadType = payloadType
+
+        if sequenceNumber is None:
+            self.sequenceNumber = randint(0, (2**16)-1)
+        else:
+            self.sequenceNumber = sequenceNumber
+
+    def packetize(self, original: Buffer) -> bytearray:
+        '''
+        Wrap an encoded packet in a retransmission packet.
+        '''
+
+        offset = peekPayloadOffset(original)
+        if len(original) < offset:
+            raise LengthError("Packet is shorter than its header")
+
+        view = memoryview(original)
+        packet = bytearray(len(original) + 2)
+        packet[0:offset] = view[0:offset]
+        packet[1] = (packet[1] & 0x80) | self.payloadType.value
+        _uint16.pack_into(packet, 2, self.sequenceNumber)
+        _uint32.pack_into(packet, 8, self.ssrc)
+        packet[offset:offset + 2] = view[2:4]
+        packet[offset + 2:] = view[offset:]
+
+        self.sequenceNumber = (self.sequenceNumber + 1) & 0xffff
+
+        return packet
+
+
+class RetransmissionCache:
+    '''
+    A fixed-size ring of recently sent packets, indexed by sequence number
+    modulo the ring size. All storage is allocated up front and packets are
+    copied into it, so storing and looking up a packet is O(1) and allocates
+    nothing. Lookups return ``memoryview`` objects onto the ring, which are
+    only valid until the slot is overwritten.
+
+    Attributes:
+        size (int): The number of packets held. Must be a power of two no
+            greater than ``2**16`` so that slots line up across sequence
+            number wraps.
+        maxPacketSize (int): The largest packet, in bytes, that can be held.
+    '''
+
+    def __init__(self, size: int = 1024, maxPacketSize: int = 1500) -> None:
+        if (size <= 0) or (size > 2**16) or (size & (size - 1)):
+            raise ValueError(
+                "RetransmissionCache size must be a power of two up to 2**16")
+
+        self.size = size
+        self.maxPacketSize = maxPacketSize
+        self._mask = size - 1
+        self._buffer = bytearray(size * maxPacketSize)
+        self._view = memoryview(self._buffer)
+        self._lengths = array('I', bytes(4 * size))
+        self._sequences = array('l', [-1] * size)
+
+    def __contains__(self, sequenceNumber: int) -> bool:
+        return self._sequences[sequenceNumber & self._mask] == sequenceNumber
+
+    def store(self, packet: Buffer) -> None:
+        '''
+        Keep a copy of an encoded packet that has just been sent.
+        '''
+
+        length = len(packet)
+        if length > self.maxPacketSize:
+            raise LengthError("Packet is larger than the cache's slot size")
+
+        sequenceNumber = peekSequenceNumber(packet)
+        slot = sequenceNumber & self._mask
+        start = slot * self.maxPacketSize
+        self._view[start:start + length] = packet
+        self._lengths[slot] = length
+        self._sequences[slot] = sequenceNumber
+
+    def lookup(self, sequenceNumber: int) -> Optional[memoryview]:
+        '''
+        Get the packet with ``sequenceNumber``, or ``None`` if it is no
+        longer held.
+        '''
+
+        slot = sequenceNumber & self._mask
+        if self._sequences[slot] != sequenceNumber:
+            return None
+
+        start = slot * self.maxPacketSize
+        return self._view[start:start + self._lengths[slot]]
+
+    def resend(
+       self,
+       sequenceNumbers: Iterable[int],
+       rtx: Optional[RTXPacketizer] = None) -> List[Buffer]:
+        '''
+        Get the packets to resend for a list of lost sequence numbers. Packets
+        no longer held are skipped. If ``rtx`` is given the packets are
+        wrapped as retransmission packets; otherwise views of the original
+        packets are returned.
+        '''
+
+        packets: List[Buffer] = []
+        for sequenceNumber in sequenceNumbers:
+            packet = self.lookup(sequenceNumber)
+            if packet is None:
+                continue
+            if rtx is None:
+                packets.append(packet)
+            else:
+                packets.append(rtx.packetize(packet))
+
+        return packets
+
+    def resendNack(
+       self,
+       entries: Iterable[Tuple[int, int]],
+       rtx: Optional[RTXPacketizer] = None) -> List[Buffer]:
+        '''
+        As :meth:`resend`, for Generic NACK ``(pid, blp)`` entries.
+        '''
+
+        sequenceNumbers: List[int] = []
+        for pid, blp in entries:
+            sequenceNumbers.extend(nackSequences(pid, blp))
+
+        return self.resend(sequenceNumbers, rtx)
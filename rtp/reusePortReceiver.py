@@ -0,0 +1,280 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ctypes
+import multiprocessing
+import socket
+import struct
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, Dict, List, Optional
+from .decoder import DecodeStatus, tryDecode
+
+# Linux's SO_ATTACH_REUSEPORT_CBPF, which the socket module doesn't export
+SO_ATTACH_REUSEPORT_CBPF = 51
+
+# Classic BPF instructions
+_BPF_LD_W_ABS = 0x20
+_BPF_ALU_MOD_K = 0x94
+_BPF_RET_A = 0x16
+
+_sockFilter = struct.Struct('=HBBI')
+
+# Per-worker statistics, in the order they're held in shared memory
+_STATS = ('packets', 'bytes', 'handled', 'errors')
+
+
+def ssrcSteeringProgram(numSockets: int) -> bytes:
+    '''
+    Build a classic BPF program for ``SO_ATTACH_REUSEPORT_CBPF`` that picks
+    the socket in a ``SO_REUSEPORT`` group from a packet's SSRC. The program
+    sees the UDP payload, so it loads the SSRC from byte ``8`` and returns it
+    modulo the number of sockets, matching :func:`shardForSSRC`.
+    '''
+
+    if numSockets <= 0:
+        raise ValueError("Steering needs at least one socket")
+
+    return b''.join((
+        _sockFilter.pack(_BPF_LD_W_ABS, 0, 0, 8),
+        _sockFilter.pack(_BPF_ALU_MOD_K, 0, 0, numSockets),
+        _sockFilter.pack(_BPF_RET_A, 0, 0, 0)))
+
+
+def attachSteering(sock: socket.socket, numSockets: int) -> bool:
+    '''
+    Attach :func:`ssrcSteeringProgram` to the ``SO_REUSEPORT`` group that
+    ``sock`` belongs to. Returns ``False`` if the platform doesn't support
+    it, in which case the kernel spreads packets by flow hash.
+    '''
+
+    program = ssrcSteeringProgram(numSockets)
+    buffer = ctypes.create_string_buffer(program, len(program))
+    fprog = struct.pack(
+        '@HP', len(program) // _sockFilter.size, ctypes.addressof(buffer))
+    try:
+        sock.setsockopt(
+            socket.SOL_SOCKET, SO_ATTACH_REUSEPORT_CBPF, fprog)
+    except OSError:
+        return False
+    return True
+
+
+def openReusePortSocket(
+       port: int,
+       address: str = '0.0.0.0',
+       group: Optional[str] = None,
+       interface: str = '0.0.0.0',
+       receiveBuffer: Optional[int] = None) -> socket.socket:
+    '''
+    Open a UDP socket bound with ``SO_REUSEPORT`` so that several can share
+    ``port``. If ``group`` is given the socket is bound to that multicast
+    group and joins it on ``interface``.
+    '''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if receiveBuffer is not None:
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, receiveBuffer)
+
+        if group is None:
+            sock.bind((address, port))
+        else:
+            sock.bind((group, port))
+            sock.setsockopt(
+                socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                socket.inet_aton(group) + socket.inet_aton(interface))
+    except BaseException:
+        sock.close()
+        raise
+
+    return sock
+
+
+def _workerMain(
+       sock: socket.socket,
+       handler: Callable[[Any], None],
+       decode: bool,
+       stopEvent: Any,
+       stats: Any,
+       index: int,
+       maxPacketSize: int,
+       pollInterval: float) -> None:
+    buffer = bytearray(maxPacketSize)
+    view = memoryview(buffer)
+    base = index * len(_STATS)
+    packets = 0
+    received = 0
+    handled = 0
+    errors = 0
+
+    sock.settimeout(pollInterval)
+    while not stopEvent.is_set():
+        try:
+            length = sock.recv_into(buffer)
+        except socket.timeout:
+            stats[base:base + len(_STATS)] = [
+                packets, received, handled, errors]
+            continue
+
+        packets += 1
+        received += length
+        datagram = view[:length]
+        if decode:
+            status, packet = tryDecode(datagram)
+            if status is not DecodeStatus.OK:
+                errors += 1
+                continue
+            handler(packet)
+        else:
+            handler(datagram)
+        handled += 1
+
+        if not (packets & 0xff):
+            stats[base:base + len(_STATS)] = [
+                packets, received, handled, errors]
+
+    stats[base:base + len(_STATS)] = [packets, received, handled, errors]
+    sock.close()
+
+
+class ReusePortReceiver:
+    '''
+    Spreads receiving an RTP port across worker processes, each with its own
+    socket in a ``SO_REUSEPORT`` group, so the kernel rather than a single
+    reader shares out the packets. With ``steering`` on Linux, a BPF program
+    sends every packet of an SSRC to the same worker; otherwise the kernel
+    spreads by flow, which keeps each sender on one worker.
+
+    The handler is called in the worker process with a ``memoryview`` of
+    each datagram, valid only for the duration of the call, or with a decoded
+    ``RTP`` if ``decode`` is set. Malformed packets are counted, not passed
+    on, when decoding.
+
+    Attributes:
+        numWorkers (int): The number of worker processes.
+        port (int): The port received on.
+        steered (bool): Whether SSRC steering is in effect.
+    '''
+
+    def __init__(
+       self,
+       handler: Callable[[Any], None],
+       port: int,
+       numWorkers: int = 2,
+       address: str = '0.0.0.0',
+       group: Optional[str] = None,
+       interface: str = '0.0.0.0',
+       steering: bool = True,
+       decode: bool = False,
+       receiveBuffer: Optional[int] = None,
+       maxPacketSize: int = 2048,
+       pollInterval: float = 0.05,
+       context: Optional[BaseContext] = None) -> None:
+        if numWorkers <= 0:
+            raise ValueError("ReusePortReceiver needs at least one worker")
+
+        self.numWorkers = numWorkers
+        self._handler = handler
+        self._decode = decode
+        self._maxPacketSize = maxPacketSize
+        self._pollInterval = pollInterval
+        self._context: Any = context or multiprocessing.get_context()
+
+        # Sockets are opened here, in order, so that their position in the
+        # reuseport group matches the worker index the BPF program returns
+        self._sockets: List[socket.socket] = []
+        try:
+            for _ in range(numWorkers):
+                sock = openReusePortSocket(
+                    port, address, group, interface, receiveBuffer)
+                self._sockets.append(sock)
+                # Port 0 picks a free port for the first socket only
+                port = sock.getsockname()[1]
+        except BaseException:
+            for sock in self._sockets:
+                sock.close()
+            raise
+
+        self.port = port
+        self.steered = steering and attachSteering(
+            self._sockets[0], numWorkers)
+
+        self._stopEvent = self._context.Event()
+        self._stats = self._context.Array(
+            'Q', numWorkers * len(_STATS), lock=False)
+        self._workers: List[Any] = []
+
+    def __enter__(self) -> 'ReusePortReceiver':
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        '''
+        Start the worker processes.
+        '''
+
+        for index, sock in enumerate(self._sockets):
+            process = self._context.Process(
+                target=_workerMain,
+                args=(
+                    sock, self._handler, self._decode, self._stopEvent,
+                    self._stats, index, self._maxPacketSize,
+                    self._pollInterval),
+                daemon=True)
+            process.start()
+            self._workers.append(process)
+
+    def stats(self) -> List[Dict[str, int]]:
+        '''
+        Each worker's packets and bytes received, packets handled and
+        decode errors. Workers publish their counts every 256 packets and
+        whenever they're idle.
+        '''
+
+        values = self._stats[:]
+        width = len(_STATS)
+        return [
+            dict(zip(_STATS, values[i * width:(i + 1) * width]))
+            for i in range(self.numWorkers)]
+
+    def totals(self) -> Dict[str, int]:
+        '''
+        :meth:`stats` summed over all the workers.
+        '''
+
+        totals = dict.fromkeys(_STATS, 0)
+        for workerStats in self.stats():
+            for key, value in workerStats.items():
+                totals[key] += value
+        return totals
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        '''
+        Stop the workers and close the sockets.
+        '''
+
+        self._stopEvent.set()
+        for process in self._workers:
+            process.join(timeout)
+        self._workers = []
+
+        for sock in self._sockets:
+            sock.close()
+        self._sockets = []
@@ -0,0 +1,122 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Iterable, Optional, Union
+from .payloadType import PayloadType
+from .peek import HEADER
+
+WritableBuffer = Union[bytearray, memoryview]
+
+
+class HeaderRewriter:
+    '''
+    Rewrites fixed RTP header fields in place inside encoded packets, for
+    translators and relays that forward packets with only these changes. The
+    packet is never decoded into an ``RTP`` or re-encoded.
+
+    Any attribute left as ``None`` is not changed. Offsets are added modulo
+    the field width, so sequence numbers and timestamps wrap correctly.
+
+    Attributes:
+        ssrc (int): The SSRC to write.
+        sequenceOffset (int): The amount to add to sequence numbers.
+        timestampOffset (int): The amount to add to timestamps.
+        payloadType (PayloadType): The payload type to write.
+        marker (bool): The marker bit to write.
+    '''
+
+    def __init__(
+       self,
+       ssrc: Optional[int] = None,
+       sequenceOffset: int = 0,
+       timestampOffset: int = 0,
+       payloadType: Optional[PayloadType] = None,
+       marker: Optional[bool] = None) -> None:
+        if (ssrc is not None) and ((ssrc < 0) or (ssrc >= 2**32)):
+            raise ValueError("SSRC must be in range 0-2**32")
+        if ((payloadType is not None) and
+                (type(payloadType) is not PayloadType)):
+            raise AttributeError("PayloadType value must be PayloadType")
+        if (marker is not None) and (type(marker) is not bool):
+            raise AttributeError("Marker value must be boolean")
+
+        self.ssrc = ssrc
+        self.sequenceOffset = sequenceOffset
+        self.timestampOffset = timestampOffset
+        self.payloadType = payloadType
+        self.marker = marker
+
+    def rewrite(self, packet: WritableBuffer, offset: int = 0) -> None:
+        '''
+        Rewrite the header of the packet starting at ``offset`` in
+        ``packet``.
+        '''
+
+        first, second, sequenceNumber, timestamp, ssrc = HEADER.unpack_from(
+            packet, offset)
+
+        if self.marker is not None:
+            second = (second & 0x7f) | (self.marker << 7)
+        if self.payloadType is not None:
+            second = (second & 0x80) | self.payloadType.value
+        if self.ssrc is not None:
+            ssrc = self.ssrc
+
+        HEADER.pack_into(
+            packet, offset, first, second,
+            (sequenceNumber + self.sequenceOffset) & 0xffff,
+            (timestamp + self.timestampOffset) & 0xffffffff,
+            ssrc)
+
+    def rewriteBatch(self, packets: Iterable[WritableBuffer]) -> None:
+        '''
+        Rewrite the headers of many packets.
+        '''
+
+        rewrite = self.rewrite
+        for packet in packets:
+            rewrite(packet)
+
+    def rewriteStrided(
+       self,
+       buffer: WritableBuffer,
+       count: int,
+       stride: int,
+       start: int = 0) -> None:
+        '''
+        Rewrite ``count`` packets laid out in one buffer at a fixed
+        ``stride``, starting at ``start``, as in a ring of packet slots or a
+        segmentation offload buffer.
+        '''
+
+        rewrite = self.rewrite
+        for offset in range(start, start + (count * stride), stride):
+            rewrite(buffer, offset)
+
+
+def rewriteHeader(
+       packet: WritableBuffer,
+       ssrc: Optional[int] = None,
+       sequenceOffset: int = 0,
+       timestampOffset: int = 0,
+       payloadType: Optional[PayloadType] = None,
+       marker: Optional[bool] = None) -> None:
+    '''
+    Rewrite the header of a single packet in place. See
+    :class:`HeaderRewriter`.
+    '''
+
+    HeaderRewriter(
+        ssrc, sequenceOffset, timestampOffset, payloadType, marker
+        ).rewrite(packet)
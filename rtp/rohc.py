@@ -0,0 +1,532 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+from enum import IntEnum
+from struct import Struct
+from typing import Deque, Dict, List, Optional, Tuple, Union
+from .errors import LengthError
+from .peek import HEADER
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+PROFILE_RTP = 0x01
+
+_IR = 0xfd
+_IR_DYN = 0xf8
+
+# Type, profile, CRC-8, then the static chain (SSRC) for IR
+_irHeader = Struct('!BBBI')
+_irDynHeader = Struct('!BBB')
+# First and second header bytes, sequence number, timestamp, timestamp stride
+_dynamicChain = Struct('!BBHII')
+
+
+def _crcTable(poly: int, mask: int) -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ poly
+            else:
+                crc >>= 1
+        table.append(crc & mask)
+    return table
+
+
+_crc3Table = _crcTable(0x6, 0x7)
+_crc7Table = _crcTable(0x79, 0x7f)
+_crc8Table = _crcTable(0xe0, 0xff)
+
+
+def crc3(data: Buffer) -> int:
+    '''
+    The ROHC 3-bit CRC (RFC 3095 section 5.9.2).
+    '''
+
+    crc = 0x7
+    for byte in data:
+        crc = _crc3Table[byte ^ crc]
+    return crc
+
+
+def crc7(data: Buffer) -> int:
+    '''
+    The ROHC 7-bit CRC (RFC 3095 section 5.9.2).
+    '''
+
+    crc = 0x7f
+    for byte in data:
+        crc = _crc7Table[byte ^ crc]
+    return crc
+
+
+def crc8(data: Buffer) -> int:
+    '''
+    The ROHC 8-bit CRC (RFC 3095 section 5.9.1).
+    '''
+
+    crc = 0xff
+    for byte in data:
+        crc = _crc8Table[byte ^ crc]
+    return crc
+
+
+class ROHCPacketType(IntEnum):
+    '''
+    The ROHC packet types used by :class:`ROHCCompressor`.
+    '''
+
+    IR = 0
+    IR_DYN = 1
+    UO_0 = 2
+    UO_1 = 3
+    UOR_2 = 4
+
+
+class ROHCDecompressorState(IntEnum):
+    '''
+    The states of a unidirectional mode decompressor (RFC 3095 section
+    5.3.2).
+    '''
+
+    NO_CONTEXT = 0
+    STATIC_CONTEXT = 1
+    FULL_CONTEXT = 2
+
+
+def _snOffset(k: int) -> int:
+    # The W-LSB interpretation interval offset for sequence numbers
+    return -1 if k <= 4 else (1 << (k - 5)) - 1
+
+
+def _tsOffset(k: int) -> int:
+    # The W-LSB interpretation interval offset for scaled timestamps
+    return (1 << (k - 2)) - 1
+
+
+def _lsbDecode(reference: int, lsbs: int, k: int, offset: int) -> int:
+    low = reference - offset
+    return low + ((lsbs - low) & ((1 << k) - 1))
+
+
+def _lsbFits(
+       value: int,
+       references: List[int],
+       k: int,
+       offset: int) -> bool:
+    for reference in references:
+        low = reference - offset
+        if not (low <= value < low + (1 << k)):
+            return False
+    return True
+
+
+class ROHCCompressor:
+    '''
+    A Robust Header Compression (RFC 3095) compressor for the fixed RTP
+    header, using the RTP profile's IR, IR-DYN, UO-0, UO-1 and UOR-2 packets
+    in unidirectional mode.
+
+    Only the 12-byte fixed header is compressed. The SSRC is sent in IR
+    packets only, and the first header byte and payload type in IR and
+    IR-DYN packets. Sequence numbers and timestamps are sent as W-LSB
+    encoded least significant bits, with timestamps scaled by a detected
+    stride (the timestamp divided by the stride, with the remainder sent as
+    part of the context), so a steady stream needs one byte per packet. Any
+    CSRCs, extension and payload follow the compressed header unchanged.
+
+    The first ``optimism`` packets after each change to the stride, the
+    timestamp remainder or the static fields repeat the full context, and a
+    full IR is sent every ``refreshInterval`` packets, so a decompressor
+    recovers from loss without a feedback channel.
+
+    Attributes:
+        optimism (int): Packets sent with the full context after a change.
+        refreshInterval (int): Packets between IR refreshes.
+        windowWidth (int): Recently sent values the W-LSB encoding must be
+            decodable against, to survive that many consecutive losses.
+        counts (dict): Packets sent of each :class:`ROHCPacketType`.
+    '''
+
+    def __init__(
+       self,
+       optimism: int = 3,
+       refreshInterval: int = 256,
+       windowWidth: int = 4) -> None:
+        self.optimism = optimism
+        self.refreshInterval = refreshInterval
+        self.windowWidth = windowWidth
+        self.counts: Dict[ROHCPacketType, int] = {
+            packetType: 0 for packetType in ROHCPacketType}
+
+        self._ssrc: Optional[int] = None
+        self._first = 0
+        self._payloadType = 0
+        self._stride = 0
+        # The timestamp modulo the stride, or the timestamp if there is none
+        self._base = 0
+        self._lastTimestamp = 0
+        self._lastSequence = 0
+        self._unwrappedTimestamp = 0
+        self._extendedSequence = 0
+        self._confident = 0
+        self._sinceRefresh = 0
+        self._window: Deque[Tuple[int, int]] = deque(maxlen=windowWidth)
+
+    def _unwrap(self, sequenceNumber: int, timestamp: int) -> Tuple[int, int]:
+        sequenceStep = (
+            ((sequenceNumber - self._lastSequence + 2**15) & 0xffff) - 2**15)
+        timestampStep = (
+            ((timestamp - self._lastTimestamp + 2**31) & 0xffffffff) - 2**31)
+        return (self._extendedSequence + sequenceStep,
+                self._unwrappedTimestamp + timestampStep)
+
+    def _scaled(self, timestamp: int) -> Optional[int]:
+        # The scaled timestamp, or None if it can't be scaled by the stride
+        if self._stride == 0:
+            return 0 if timestamp == self._base else None
+        scaled, offset = divmod(timestamp, self._stride)
+        if offset != self._base:
+            return None
+        return scaled
+
+    def compress(self, datagram: Buffer) -> bytearray:
+        '''
+        Compress the header of an encoded packet.
+        '''
+
+        if len(datagram) < HEADER.size:
+            raise LengthError("Packet is shorter than an RTP header")
+
+        first, second, sequenceNumber, timestamp, ssrc = HEADER.unpack_from(
+            datagram)
+        marker = second >> 7
+        payloadType = second & 0x7f
+
+        newStream = ssrc != self._ssrc
+        if newStream:
+            packetType = ROHCPacketType.IR
+            self._ssrc = ssrc
+            self._stride = 0
+            self._confident = 0
+            extended, unwrapped = sequenceNumber, timestamp
+        else:
+            extended, unwrapped = self._unwrap(sequenceNumber, timestamp)
+            packetType = self._choose(
+                first, payloadType, marker, extended, timestamp)
+
+        if packetType in (ROHCPacketType.IR, ROHCPacketType.IR_DYN):
+            if (not newStream) and (self._scaled(timestamp) is None):
+                # Detect the stride from the step since the last packet
+                sequenceStep = extended - self._extendedSequence
+                timestampStep = unwrapped - self._unwrappedTimestamp
+                stride = 0
+                if ((sequenceStep > 0) and (timestampStep > 0) and
+                        (timestampStep % sequenceStep == 0)):
+                    stride = timestampStep // sequenceStep
+                if stride != self._stride:
+                    self._stride = stride
+                    self._confident = 0
+            base = (timestamp % self._stride) if self._stride else timestamp
+            if ((self._first != first) or
+                    (self._payloadType != payloadType) or
+                    (self._base != base)):
+                self._confident = 0
+            self._first = first
+            self._payloadType = payloadType
+            self._base = base
+            if self._confident == 0:
+                # Scaled timestamps from before the change mean something
+                # else now, so can't be decoded against
+                self._window.clear()
+
+        scaled = self._scaled(timestamp)
+        assert scaled is not None
+
+        header = memoryview(datagram)[:HEADER.size]
+        if packetType == ROHCPacketType.IR:
+            out = bytearray(_irHeader.size + _dynamicChain.size)
+            _irHeader.pack_into(out, 0, _IR, PROFILE_RTP, 0, ssrc)
+            _dynamicChain.pack_into(
+                out, _irHeader.size, first, second, sequenceNumber,
+                timestamp, self._stride)
+            out[2] = crc8(out)
+            self._sinceRefresh = 0
+        elif packetType == ROHCPacketType.IR_DYN:
+            out = bytearray(_irDynHeader.size + _dynamicChain.size)
+            _irDynHeader.pack_into(out, 0, _IR_DYN, PROFILE_RTP, 0)
+            _dynamicChain.pack_into(
+                out, _irDynHeader.size, first, second, sequenceNumber,
+                timestamp, self._stride)
+            out[2] = crc8(out)
+        elif packetType == ROHCPacketType.UO_0:
+            out = bytearray(
+                (((extended & 0xf) << 3) | crc3(header),))
+        elif packetType == ROHCPacketType.UO_1:
+            out = bytearray((
+                0x80 | (scaled & 0x3f),
+                (marker << 7) | ((extended & 0xf) << 3) | crc3(header)))
+        else:
+            out = bytearray((
+                0xc0 | ((scaled >> 1) & 0x1f),
+                ((scaled & 1) << 7) | (marker << 6) | (extended & 0x3f),
+                crc7(header)))
+
+        if packetType in (ROHCPacketType.IR, ROHCPacketType.IR_DYN):
+            self._confident += 1
+        self._sinceRefresh += 1
+        self.counts[packetType] += 1
+
+        self._extendedSequence = extended
+        self._unwrappedTimestamp = unwrapped
+        self._lastSequence = sequenceNumber
+        self._lastTimestamp = timestamp
+        self._window.append((extended, scaled))
+
+        out += memoryview(datagram)[HEADER.size:]
+        return out
+
+    def _choose(
+       self,
+       first: int,
+       payloadType: int,
+       marker: int,
+       extended: int,
+       timestamp: int) -> ROHCPacketType:
+        if self._sinceRefresh >= self.refreshInterval:
+            return ROHCPacketType.IR
+
+        scaled = self._scaled(timestamp)
+        if ((first != self._first) or (payloadType != self._payloadType) or
+                (scaled is None) or (self._confident < self.optimism) or
+                (not self._window)):
+            return ROHCPacketType.IR_DYN
+
+        sequences = [sequence for sequence, _ in self._window]
+        timestamps = [timestamp for _, timestamp in self._window]
+
+        if _lsbFits(extended, sequences, 4, _snOffset(4)):
+            linear = all(
+                (scaled - timestamp) == (extended - sequence)
+                for sequence, timestamp in self._window)
+            if linear and not marker:
+                return ROHCPacketType.UO_0
+            if _lsbFits(scaled, timestamps, 6, _tsOffset(6)):
+                return ROHCPacketType.UO_1
+
+        if (_lsbFits(extended, sequences, 6, _snOffset(6)) and
+                _lsbFits(scaled, timestamps, 6, _tsOffset(6))):
+            return ROHCPacketType.UOR_2
+
+        return ROHCPacketType.IR_DYN
+
+
+class ROHCDecompressor:
+    '''
+    Decompresses packets from a :class:`ROHCCompressor`, rebuilding the
+    full RTP header. Packets that fail their CRC, or arrive without the
+    context they need, are dropped and counted.
+
+    As in RFC 3095 unidirectional mode, the decompressor starts with no
+    context and needs an IR. Once ``k2`` of the last ``n2`` packets
+    decompressed against the context have failed their CRC, the context is
+    assumed damaged and the decompressor falls back to the static context,
+    where only packets with a 7- or 8-bit CRC are decompressed until one
+    succeeds. Once ``k1`` of the last ``n1`` packets in the static context
+    have failed, it falls back to no context. Packets that fail their CRC
+    are dropped rather than repaired, so the context is only ever updated
+    from packets that decompressed correctly against it.
+
+    Attributes:
+        k1 (int): Failures that move the static context to no context.
+        n1 (int): Packets the ``k1`` failures are counted over.
+        k2 (int): Failures that move the full context to the static context.
+        n2 (int): Packets the ``k2`` failures are counted over.
+        state (:obj:`ROHCDecompressorState`): The decompressor's state.
+        decompressed (int): Packets decompressed.
+        crcFailures (int): Packets dropped because their CRC didn't match,
+            or because they were too corrupt to parse.
+        noContext (int): Packets dropped because the decompressor didn't
+            have the context needed to decompress them.
+    '''
+
+    def __init__(
+       self,
+       k1: int = 3,
+       n1: int = 10,
+       k2: int = 3,
+       n2: int = 10) -> None:
+        self.k1 = k1
+        self.n1 = n1
+        self.k2 = k2
+        self.n2 = n2
+        self.state = ROHCDecompressorState.NO_CONTEXT
+        self.decompressed = 0
+        self.crcFailures = 0
+        self.noContext = 0
+
+        self._ssrc: Optional[int] = None
+        self._first = 0
+        self._payloadType = 0
+        self._stride = 0
+        self._base = 0
+        self._sequence = 0
+        self._scaled = 0
+        # Whether each recent packet decompressed against the context failed
+        self._failures: Deque[bool] = deque()
+
+    def _setState(self, state: ROHCDecompressorState) -> None:
+        self.state = state
+        self._failures.clear()
+
+    def _verified(self, failed: bool) -> None:
+        # Record the outcome of a CRC check and change state on too many
+        # failures
+        if self.state == ROHCDecompressorState.FULL_CONTEXT:
+            k, n = self.k2, self.n2
+            damaged = ROHCDecompressorState.STATIC_CONTEXT
+        else:
+            k, n = self.k1, self.n1
+            damaged = ROHCDecompressorState.NO_CONTEXT
+
+        self._failures.append(failed)
+        while len(self._failures) > n:
+            self._failures.popleft()
+        if failed:
+            self.crcFailures += 1
+            if sum(self._failures) >= k:
+                self._setState(damaged)
+        elif self.state == ROHCDecompressorState.STATIC_CONTEXT:
+            self._setState(ROHCDecompressorState.FULL_CONTEXT)
+
+    def _malformed(self) -> Optional[bytearray]:
+        # A packet too corrupt to parse, which fails like a CRC would
+        self._verified(True)
+        return None
+
+    def _dynamic(
+       self, packet: Buffer, offset: int) -> Tuple[bytearray, int]:
+        first, second, sequenceNumber, timestamp, stride = (
+            _dynamicChain.unpack_from(packet, offset))
+        self._first = first
+        self._payloadType = second & 0x7f
+        self._stride = stride
+        if stride:
+            self._scaled, self._base = divmod(timestamp, stride)
+        else:
+            self._scaled, self._base = 0, timestamp
+        self._sequence = sequenceNumber
+        assert self._ssrc is not None
+        header = bytearray(HEADER.size)
+        HEADER.pack_into(
+            header, 0, first, second, sequenceNumber, timestamp, self._ssrc)
+        return (header, offset + _dynamicChain.size)
+
+    def decompress(self, packet: Buffer) -> Optional[bytearray]:
+        '''
+        Decompress a packet, returning the encoded RTP packet, or ``None``
+        if it was dropped. Packets that are truncated or of an unknown type
+        are taken to be corrupt, and dropped as CRC failures.
+        '''
+
+        if len(packet) < 1:
+            return self._malformed()
+
+        packetType = packet[0]
+        if packetType in (_IR, _IR_DYN):
+            size = (_irHeader.size if packetType == _IR
+                    else _irDynHeader.size) + _dynamicChain.size
+            if len(packet) < size:
+                return self._malformed()
+            if ((packetType == _IR_DYN) and
+                    (self.state == ROHCDecompressorState.NO_CONTEXT)):
+                self.noContext += 1
+                return None
+            check = bytearray(packet[:size])
+            check[2] = 0
+            if crc8(check) != packet[2]:
+                self._verified(True)
+                return None
+            if packetType == _IR:
+                self._ssrc = _irHeader.unpack_from(packet)[3]
+                offset = _irHeader.size
+            else:
+                offset = _irDynHeader.size
+            header, offset = self._dynamic(packet, offset)
+            self._setState(ROHCDecompressorState.FULL_CONTEXT)
+            self.decompressed += 1
+            return header + memoryview(packet)[offset:]
+
+        if self.state == ROHCDecompressorState.NO_CONTEXT:
+            self.noContext += 1
+            return None
+
+        if not (packetType & 0x80):
+            if self.state != ROHCDecompressorState.FULL_CONTEXT:
+                self.noContext += 1
+                return None
+            sequence = _lsbDecode(
+                self._sequence, packetType >> 3, 4, _snOffset(4))
+            scaled = self._scaled + (sequence - self._sequence)
+            marker = 0
+            crc = packetType & 0x7
+            crcFunction = crc3
+            offset = 1
+        elif (packetType & 0xc0) == 0x80:
+            if len(packet) < 2:
+                return self._malformed()
+            if self.state != ROHCDecompressorState.FULL_CONTEXT:
+                self.noContext += 1
+                return None
+            scaled = _lsbDecode(
+                self._scaled, packetType & 0x3f, 6, _tsOffset(6))
+            marker = packet[1] >> 7
+            sequence = _lsbDecode(
+                self._sequence, (packet[1] >> 3) & 0xf, 4, _snOffset(4))
+            crc = packet[1] & 0x7
+            crcFunction = crc3
+            offset = 2
+        elif (packetType & 0xe0) == 0xc0:
+            if len(packet) < 3:
+                return self._malformed()
+            scaled = _lsbDecode(
+                self._scaled, ((packetType & 0x1f) << 1) | (packet[1] >> 7),
+                6, _tsOffset(6))
+            marker = (packet[1] >> 6) & 1
+            sequence = _lsbDecode(
+                self._sequence, packet[1] & 0x3f, 6, _snOffset(6))
+            crc = packet[2] & 0x7f
+            crcFunction = crc7
+            offset = 3
+        else:
+            return self._malformed()
+
+        header = bytearray(HEADER.size)
+        HEADER.pack_into(
+            header, 0, self._first, (marker << 7) | self._payloadType,
+            sequence & 0xffff,
+            ((scaled * self._stride) + self._base) & 0xffffffff,
+            self._ssrc)
+
+        failed = crcFunction(header) != crc
+        self._verified(failed)
+        if failed:
+            return None
+
+        self._sequence = sequence
+        self._scaled = scaled
+        self.decompressed += 1
+        return header + memoryview(packet)[offset:]
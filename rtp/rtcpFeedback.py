@@ -0,0 +1,289 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from collections import OrderedDict
+from struct import Struct
+from typing import Iterable, List, Optional, Tuple, Union
+from .peek import peekSequenceNumber, peekSSRC
+from .unwrap import Unwrapper
+
+RTCP_RR = 201
+RTCP_RTPFB = 205
+RTCP_PSFB = 206
+
+FMT_GENERIC_NACK = 1
+FMT_PLI = 1
+FMT_FIR = 4
+
+# Common header (V/P/count, PT, length) followed by sender and media SSRCs
+_feedbackHeader = Struct('!BBHII')
+_reportHeader = Struct('!BBHI')
+_nackEntry = Struct('!HH')
+_firEntry = Struct('!IB3x')
+
+
+def nackEntries(sequenceNumbers: Iterable[int]) -> List[Tuple[int, int]]:
+    '''
+    Compress lost sequence numbers into Generic NACK ``(pid, blp)`` entries
+    (RFC 4585), each covering a packet ID and the 16 packets after it.
+    Extended sequence numbers may be given; they are sorted and reduced to 16
+    bits.
+    '''
+
+    entries: List[Tuple[int, int]] = []
+    pid: Optional[int] = None
+    blp = 0
+    for sequenceNumber in sorted(set(sequenceNumbers)):
+        if (pid is not None) and (sequenceNumber - pid <= 16):
+            blp |= 1 << (sequenceNumber - pid - 1)
+            continue
+
+        if pid is not None:
+            entries.append((pid & 0xffff, blp))
+        pid = sequenceNumber
+        blp = 0
+
+    if pid is not None:
+        entries.append((pid & 0xffff, blp))
+
+    return entries
+
+
+def genericNack(
+       senderSSRC: int,
+       mediaSSRC: int,
+       entries: List[Tuple[int, int]]) -> bytearray:
+    '''
+    Build a Generic NACK transport-layer feedback packet.
+    '''
+
+    packet = bytearray(_feedbackHeader.size + (_nackEntry.size * len(entries)))
+    _feedbackHeader.pack_into(
+        packet, 0, 0x80 | FMT_GENERIC_NACK, RTCP_RTPFB, 2 + len(entries),
+        senderSSRC, mediaSSRC)
+    for i, (pid, blp) in enumerate(entries):
+        _nackEntry.pack_into(
+            packet, _feedbackHeader.size + (_nackEntry.size * i), pid, blp)
+
+    return packet
+
+
+def pictureLossIndication(senderSSRC: int, mediaSSRC: int) -> bytearray:
+    '''
+    Build a Picture Loss Indication payload-specific feedback packet.
+    '''
+
+    packet = bytearray(_feedbackHeader.size)
+    _feedbackHeader.pack_into(
+        packet, 0, 0x80 | FMT_PLI, RTCP_PSFB, 2, senderSSRC, mediaSSRC)
+    return packet
+
+
+def fullIntraRequest(
+       senderSSRC: int,
+       mediaSSRC: int,
+       commandSequence: int) -> bytearray:
+    '''
+    Build a Full Intra Request (RFC 5104) payload-specific feedback packet.
+    '''
+
+    packet = bytearray(_feedbackHeader.size + _firEntry.size)
+    _feedbackHeader.pack_into(
+        packet, 0, 0x80 | FMT_FIR, RTCP_PSFB, 4, senderSSRC, 0)
+    _firEntry.pack_into(
+        packet, _feedbackHeader.size, mediaSSRC, commandSequence & 0xff)
+    return packet
+
+
+def emptyReceiverReport(senderSSRC: int) -> bytearray:
+    '''
+    Build a receiver report with no report blocks, to start a compound packet
+    as RFC 3550 requires.
+    '''
+
+    packet = bytearray(_reportHeader.size)
+    _reportHeader.pack_into(packet, 0, 0x80, RTCP_RR, 1, senderSSRC)
+    return packet
+
+
+class NackGenerator:
+    '''
+    Turns gaps in received sequence numbers into RTCP feedback. Missing
+    packets are NACKed in compact ``(pid, blp)`` entries, re-requested at most
+    once per round trip time and given up on after ``maxRetries``. Feedback
+    goes out from :meth:`poll` no more often than ``minInterval``, batched
+    into one compound packet. If more than ``maxMissing`` packets go missing
+    at once, retransmission is abandoned and a key frame is requested
+    instead, with a PLI or, if ``useFir`` is set, a FIR.
+
+    Times are in seconds and default to ``time.monotonic()``.
+
+    Attributes:
+        senderSSRC (int): The SSRC feedback is sent from.
+        mediaSSRC (int): The SSRC of the stream being received. Learnt from the
+            first packet if not given.
+        rtt (float): The round trip time to the sender.
+        nacked (int): Sequence numbers included in NACKs, counting repeats.
+        recovered (int): Missing packets that later arrived.
+        abandoned (int): Missing packets given up on.
+        keyFramesRequested (int): PLIs and FIRs sent.
+    '''
+
+    def __init__(
+       self,
+       senderSSRC: int,
+       mediaSSRC: Optional[int] = None,
+       rtt: float = 0.1,
+       maxRetries: int = 10,
+       minInterval: float = 0.005,
+       maxMissing: int = 1000,
+       useFir: bool = False,
+       reducedSize: bool = False) -> None:
+        self.senderSSRC = senderSSRC
+        self.mediaSSRC = mediaSSRC
+        self.rtt = rtt
+        self.maxRetries = maxRetries
+        self.minInterval = minInterval
+        self.maxMissing = maxMissing
+        self.useFir = useFir
+        self.reducedSize = reducedSize
+
+        self.nacked = 0
+        self.recovered = 0
+        self.abandoned = 0
+        self.keyFramesRequested = 0
+
+        self._unwrapper = Unwrapper(16)
+        self._highest: Optional[int] = None
+        # Extended sequence number -> [retries, time last NACKed]
+        self._missing: 'OrderedDict[int, List[float]]' = OrderedDict()
+        self._lastFeedback: Optional[float] = None
+        self._keyFramePending = False
+        self._firSequence = 0
+
+    @property
+    def missing(self) -> List[int]:
+        '''
+        The extended sequence numbers currently considered lost.
+        '''
+
+        return list(self._missing)
+
+    def received(self, sequenceNumber: int) -> None:
+        '''
+        Record the arrival of a packet.
+        '''
+
+        extended = self._unwrapper.unwrap(sequenceNumber)
+
+        if self._highest is None:
+            self._highest = extended
+            return
+
+        if extended <= self._highest:
+            if self._missing.pop(extended, None) is not None:
+                self.recovered += 1
+            return
+
+        gap = extended - self._highest - 1
+        if (gap + len(self._missing)) > self.maxMissing:
+            self.abandoned += len(self._missing) + gap
+            self._missing.clear()
+            self.requestKeyFrame()
+        else:
+            for lost in range(self._highest + 1, extended):
+                self._missing[lost] = [0, 0.0]
+
+        self._highest = extended
+
+    def receivedDatagram(self, datagram: Union[bytes, memoryview]) -> None:
+        '''
+        Record the arrival of an encoded packet, peeking its header.
+        '''
+
+        if self.mediaSSRC is None:
+            self.mediaSSRC = peekSSRC(datagram)
+        self.received(peekSequenceNumber(datagram))
+
+    def requestKeyFrame(self) -> None:
+        '''
+        Send a PLI or FIR with the next feedback.
+        '''
+
+        self._keyFramePending = True
+
+    def _due(self, now: float) -> List[int]:
+        due = []
+        expired = []
+        for sequenceNumber, state in self._missing.items():
+            retries, lastSent = state
+            if retries and ((now - lastSent) < self.rtt):
+                continue
+            if retries >= self.maxRetries:
+                expired.append(sequenceNumber)
+                continue
+            state[0] = retries + 1
+            state[1] = now
+            due.append(sequenceNumber)
+
+        for sequenceNumber in expired:
+            del self._missing[sequenceNumber]
+        self.abandoned += len(expired)
+
+        return due
+
+    def poll(self, now: Optional[float] = None) -> Optional[bytearray]:
+        '''
+        Get the feedback to send now, as a compound RTCP packet, or ``None``
+        if there is nothing to send or it is too soon since the last
+        feedback.
+        '''
+
+        if now is None:
+            now = time.monotonic()
+
+        if ((self._lastFeedback is not None) and
+                ((now - self._lastFeedback) < self.minInterval)):
+            return None
+
+        if self.mediaSSRC is None:
+            return None
+
+        due = self._due(now)
+        if (not due) and (not self._keyFramePending):
+            return None
+
+        packet = bytearray()
+        if not self.reducedSize:
+            packet += emptyReceiverReport(self.senderSSRC)
+
+        if due:
+            self.nacked += len(due)
+            packet += genericNack(
+                self.senderSSRC, self.mediaSSRC, nackEntries(due))
+
+        if self._keyFramePending:
+            self._keyFramePending = False
+            self.keyFramesRequested += 1
+            if self.useFir:
+                packet += fullIntraRequest(
+                    self.senderSSRC, self.mediaSSRC, self._firSequence)
+                self._firSequence = (self._firSequence + 1) & 0xff
+            else:
+                packet += pictureLossIndication(
+                    self.senderSSRC, self.mediaSSRC)
+
+        self._lastFeedback = now
+        return packet
@@ -0,0 +1,168 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from enum import IntEnum
+from typing import Callable, Iterable, List, Optional, Union
+from .packetRing import PacketRing
+
+Buffer = Union[bytes, bytearray, memoryview]
+Handler = Callable[[memoryview], None]
+
+
+class PacketClass(IntEnum):
+    '''
+    What a datagram received on an RTP/RTCP multiplexed port is.
+    '''
+
+    RTP = 0
+    RTCP = 1
+    OTHER = 2
+
+
+# RFC 5761 section 4: with the marker bit set, RTP payload types 64-95 share
+# the second byte with RTCP packet types 192-223, so those values are taken
+# to be RTCP and the payload types must not be used on a multiplexed port.
+_SECOND_BYTE = bytes(
+    PacketClass.RTCP if 192 <= b <= 223 else PacketClass.RTP
+    for b in range(256))
+
+# Only RTP version 2 (a first byte of 128-191) is RTP or RTCP. STUN, DTLS and
+# the rest (RFC 7983) all start with other values.
+_FIRST_BYTE = bytes(
+    1 if (b >> 6) == 2 else 0 for b in range(256))
+
+
+def classify(datagram: Buffer) -> PacketClass:
+    '''
+    Classify a datagram as RTP, RTCP or neither from its first two bytes,
+    with a table lookup on each.
+    '''
+
+    if (len(datagram) < 8) or not _FIRST_BYTE[datagram[0]]:
+        return PacketClass.OTHER
+    if _SECOND_BYTE[datagram[1]]:
+        return PacketClass.RTCP
+    return PacketClass.RTP
+
+
+def isRTCP(datagram: Buffer) -> bool:
+    '''
+    Check whether a datagram is RTCP rather than RTP.
+    '''
+
+    return classify(datagram) is PacketClass.RTCP
+
+
+def classifyBatch(
+       datagrams: Iterable[Buffer],
+       into: Optional[bytearray] = None) -> bytearray:
+    '''
+    Classify many datagrams, returning one ``PacketClass`` value per
+    datagram in a ``bytearray``, reusing ``into`` if given.
+    '''
+
+    if into is None:
+        into = bytearray()
+    else:
+        del into[:]
+
+    first = _FIRST_BYTE
+    second = _SECOND_BYTE
+    other = int(PacketClass.OTHER)
+    append = into.append
+    for datagram in datagrams:
+        if (len(datagram) < 8) or not first[datagram[0]]:
+            append(other)
+        else:
+            append(second[datagram[1]])
+
+    return into
+
+
+class MuxDemultiplexer:
+    '''
+    Splits the datagrams received on an RFC 5761 multiplexed port between
+    an RTP handler and an RTCP handler before anything is decoded. Datagrams
+    that are neither go to ``otherHandler`` if one is given, or are dropped.
+    Handlers are called with a ``memoryview`` of each datagram, valid only
+    for the duration of the call.
+
+    Attributes:
+        counts (list): Datagrams seen, indexed by ``PacketClass``.
+    '''
+
+    def __init__(
+       self,
+       rtpHandler: Handler,
+       rtcpHandler: Handler,
+       otherHandler: Optional[Handler] = None) -> None:
+        self._handlers: List[Optional[Handler]] = [
+            rtpHandler, rtcpHandler, otherHandler]
+        self.counts = [0] * len(PacketClass)
+
+    def dispatch(self, datagram: Buffer) -> PacketClass:
+        '''
+        Pass a datagram to the handler for its class, returning the class.
+        '''
+
+        packetClass = classify(datagram)
+        self.counts[packetClass] += 1
+        handler = self._handlers[packetClass]
+        if handler is not None:
+            handler(memoryview(datagram))
+        return packetClass
+
+    def dispatchBatch(self, datagrams: Iterable[Buffer]) -> int:
+        '''
+        Dispatch many datagrams. Returns the number dispatched.
+        '''
+
+        first = _FIRST_BYTE
+        second = _SECOND_BYTE
+        handlers = self._handlers
+        counts = self.counts
+        other = int(PacketClass.OTHER)
+        dispatched = 0
+        for datagram in datagrams:
+            if (len(datagram) < 8) or not first[datagram[0]]:
+                packetClass = other
+            else:
+                packetClass = second[datagram[1]]
+            counts[packetClass] += 1
+            handler = handlers[packetClass]
+            if handler is not None:
+                handler(memoryview(datagram))
+            dispatched += 1
+        return dispatched
+
+    def drainRing(self, ring: PacketRing, maxPackets: int = -1) -> int:
+        '''
+        Dispatch the datagrams waiting in ``ring`` in place, up to
+        ``maxPackets`` unless it is negative, releasing each slot once its
+        handler returns. Returns the number dispatched.
+        '''
+
+        def waiting() -> Iterable[memoryview]:
+            dispatched = 0
+            while dispatched != maxPackets:
+                datagram = ring.peek()
+                if datagram is None:
+                    return
+                try:
+                    yield datagram
+                finally:
+                    ring.release()
+                dispatched += 1
+
+        return self.dispatchBatch(waiting())
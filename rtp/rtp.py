@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Union
 from random import randint
 from .payloadType import PayloadType
 from .csrcList import CSRCList
@@ -38,6 +38,9 @@ class RTP:
         extension (:obj:`Extension`): A header extension. May be ``None``.
         csrcList (:obj:`CSRCList`): The CSRC list.
         payload (bytearray): The RTP payload.
+        arrivalTime (float): When the packet was received, in seconds since
+            the epoch, if known. Not part of the packet, so not encoded or
+            compared. May be ``None``.
 
     '''
 
@@ -52,7 +55,8 @@ class RTP:
        ssrc: Optional[int] = None,
        extension: Optional[Extension] = None,
        csrcList: Optional[Iterable[int]] = None,
-       payload: Optional[bytearray] = None) -> None:
+       payload: Optional[bytearray] = None,
+       arrivalTime: Optional[float] = None) -> None:
         self.version = version
         self.padding = padding
         self.marker = marker
@@ -62,6 +66,7 @@ class RTP:
         self.extension = extension
         self._csrcList = CSRCList()
         self.payload = bytearray()
+        self.arrivalTime = arrivalTime
 
         if sequenceNumber is None:
             self.sequenceNumber = randint(0, (2**16)-1)
@@ -206,9 +211,22 @@ class RTP:
         else:
             self._payload = p
 
-    def fromBytearray(self, packet: bytearray) -> 'RTP':
+    def fromBytearray(
+       self,
+       packet: Union[bytearray, memoryview],
+       reuseBuffers: bool = False) -> 'RTP':
         '''
-        Populate instance from a bytearray.
+        Populate instance from a bytearray. Any object supporting the buffer
+        protocol (e.g. a ``memoryview`` into a receive buffer) is also
+        accepted; the extension and payload are copied out of it.
+
+        If ``reuseBuffers`` is set, the instance's existing payload bytearray
+        and extension are overwritten in place rather than replaced. This
+        avoids allocating when an instance is recycled, but any outside
+        references to the old payload or extension will see the new values.
+
+        ``arrivalTime`` is reset to ``None``, as it belonged to the packet
+        previously held.
         '''
 
         self.version = (packet[0] >> 6) & 3
@@ -225,23 +243,32 @@ class RTP:
 
         self.ssrc = int.from_bytes(packet[8:12], byteorder='big')
 
-        for x in range(csrcListLen):
-            startIndex = 12 + (4*x)
-            endIndex = 12 + 4 + (4*x)
-            self.csrcList.append(
-                int.from_bytes(packet[startIndex: endIndex], byteorder='big'))
+        self.csrcList.unpackFrom(packet, csrcListLen)
 
         extStart = 12 + (4*csrcListLen)
         payloadStart = extStart
 
+        view = memoryview(packet)
+
         if hasExtension:
             extLen = int.from_bytes(
                 packet[extStart+2:extStart+4], byteorder='big')
             payloadStart += (extLen + 1) * 4
-            self.extension = Extension().fromBytearray(
-                packet[extStart:payloadStart])
+            if reuseBuffers and (self.extension is not None):
+                self.extension.fromBytearray(
+                    view[extStart:payloadStart], reuseBuffers=True)
+            else:
+                self.extension = Extension().fromBytearray(
+                    view[extStart:payloadStart])
+        else:
+            self.extension = None
+
+        if reuseBuffers:
+            self.payload[:] = view[payloadStart:]
+        else:
+            self.payload = bytearray(view[payloadStart:])
 
-        self.payload = packet[payloadStart:]
+        self.arrivalTime = None
 
         return self
 
@@ -278,11 +305,7 @@ class RTP:
 
         packet[8:12] = self.ssrc.to_bytes(4, byteorder='big')
 
-        for x in range(len(self.csrcList)):
-            startIndex = 12 + (4*x)
-            endIndex = 12 + 4 + (4*x)
-            packet[startIndex: endIndex] = self.csrcList[x].to_bytes(
-                4, byteorder='big')
+        self.csrcList.packInto(packet)
 
         if self.extension is not None:
             packet[extensionStartIndex:payloadStartIndex] = bytes(
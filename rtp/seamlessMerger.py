@@ -0,0 +1,221 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from array import array
+from typing import List, Optional, Union
+from .errors import LengthError
+from .peek import peekSequenceNumber
+from .unwrap import Unwrapper
+
+_EMPTY = -(2**62)
+
+
+class LegStats:
+    '''
+    Statistics for one leg of a :class:`SeamlessMerger`.
+
+    Attributes:
+        received (int): Packets that were the first copy to arrive.
+        duplicates (int): Packets already received on another leg.
+        late (int): Packets that arrived after their place in the output had
+            passed.
+        lost (int): Packets in the output that this leg never delivered.
+            Counted when the packet leaves the merger's window.
+        skew (float): Smoothed delay, in seconds, between a packet arriving on
+            another leg and its copy arriving on this one.
+        maxSkew (float): The largest such delay seen.
+    '''
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.duplicates = 0
+        self.late = 0
+        self.lost = 0
+        self.skew = 0.0
+        self.maxSkew = 0.0
+
+    def snapshot(self) -> dict:
+        return dict(vars(self))
+
+
+class SeamlessMerger:
+    '''
+    Merges two or more redundant copies of an RTP stream, as sent for SMPTE
+    ST 2022-7 seamless protection switching, into a single deduplicated
+    stream in sequence order.
+
+    Packets are copied into a preallocated window indexed by extended
+    sequence number modulo ``windowSize``, which records which legs delivered
+    each one. Each packet costs O(1) and nothing is allocated per packet.
+    Packets are released in order as soon as they are contiguous. A gap is
+    skipped once packets ``maxDelay`` beyond it have arrived.
+
+    Released packets are ``memoryview`` objects onto the window, valid until
+    ``windowSize`` further packets have arrived. A packet forced out by one
+    arriving a whole window ahead is released as a copy instead, as its
+    slot is reused at once.
+
+    Attributes:
+        legs (list): A :class:`LegStats` per leg.
+        released (int): Packets released.
+        missing (int): Packets skipped because no leg delivered them.
+    '''
+
+    def __init__(
+       self,
+       numLegs: int = 2,
+       windowSize: int = 1024,
+       maxDelay: Optional[int] = None,
+       maxPacketSize: int = 1500,
+       skewSmoothing: float = 1/16) -> None:
+        if (windowSize <= 0) or (windowSize & (windowSize - 1)):
+            raise ValueError(
+                "SeamlessMerger windowSize must be a power of two")
+        if maxDelay is None:
+            maxDelay = windowSize // 2
+        if (maxDelay <= 0) or (maxDelay >= windowSize):
+            raise ValueError(
+                "SeamlessMerger maxDelay must be less than windowSize")
+        if (numLegs <= 0) or (numLegs > 8):
+            raise ValueError("SeamlessMerger supports 1-8 legs")
+
+        self.legs = [LegStats() for _ in range(numLegs)]
+        self.windowSize = windowSize
+        self.maxDelay = maxDelay
+        self.maxPacketSize = maxPacketSize
+        self.released = 0
+        self.missing = 0
+
+        self._skewSmoothing = skewSmoothing
+        self._mask = windowSize - 1
+        self._allLegs = (1 << numLegs) - 1
+        self._buffer = bytearray(windowSize * maxPacketSize)
+        self._view = memoryview(self._buffer)
+        self._sequences = array('q', [_EMPTY] * windowSize)
+        self._lengths = array('I', bytes(4 * windowSize))
+        self._legMasks = array('B', bytes(windowSize))
+        self._arrivals = array('d', bytes(8 * windowSize))
+        self._unwrapper = Unwrapper(16)
+        self._next: Optional[int] = None
+        self._highest = 0
+
+    def _countLost(self, legMask: int) -> None:
+        if legMask == self._allLegs:
+            return
+        for i, leg in enumerate(self.legs):
+            if not (legMask >> i) & 1:
+                leg.lost += 1
+
+    def _release(
+       self,
+       out: List[memoryview],
+       force: int,
+       copySlot: int = -1) -> None:
+        # Release contiguous packets from the cursor, skipping gaps up to
+        # ``force``. The packet in ``copySlot`` is about to be overwritten,
+        # so is copied rather than viewed.
+        assert self._next is not None
+        mask = self._mask
+        sequences = self._sequences
+        while self._next <= self._highest:
+            slot = self._next & mask
+            if sequences[slot] == self._next:
+                start = slot * self.maxPacketSize
+                view = self._view[start:start + self._lengths[slot]]
+                if slot == copySlot:
+                    view = memoryview(bytes(view))
+                out.append(view)
+                self.released += 1
+            elif self._next < force:
+                self.missing += 1
+                self._countLost(0)
+            else:
+                break
+            self._next += 1
+
+    def push(
+       self,
+       leg: int,
+       datagram: Union[bytes, bytearray, memoryview],
+       now: Optional[float] = None) -> List[memoryview]:
+        '''
+        Add a packet received on leg number ``leg``. Returns the packets, if
+        any, that can now be released in order.
+        '''
+
+        length = len(datagram)
+        if length > self.maxPacketSize:
+            raise LengthError("Packet is larger than the merger's slot size")
+
+        if now is None:
+            now = time.monotonic()
+
+        legBit = 1 << leg
+        stats = self.legs[leg]
+        extended = self._unwrapper.unwrap(peekSequenceNumber(datagram))
+        out: List[memoryview] = []
+
+        if self._next is None:
+            self._next = extended
+            self._highest = extended
+
+        slot = extended & self._mask
+        if self._sequences[slot] == extended:
+            # Already held (and possibly released) from another leg
+            if self._legMasks[slot] & legBit:
+                return out
+            self._legMasks[slot] |= legBit
+            stats.duplicates += 1
+            skew = now - self._arrivals[slot]
+            stats.skew += (skew - stats.skew) * self._skewSmoothing
+            if skew > stats.maxSkew:
+                stats.maxSkew = skew
+            return out
+
+        if extended < self._next:
+            stats.late += 1
+            return out
+
+        if extended >= (self._next + self.windowSize):
+            # Too far ahead to hold without overwriting unreleased packets
+            self._highest = extended - 1
+            self._release(out, extended - self.windowSize + 1, slot)
+
+        if self._sequences[slot] != _EMPTY:
+            self._countLost(self._legMasks[slot])
+
+        start = slot * self.maxPacketSize
+        self._view[start:start + length] = datagram
+        self._lengths[slot] = length
+        self._sequences[slot] = extended
+        self._legMasks[slot] = legBit
+        self._arrivals[slot] = now
+        stats.received += 1
+
+        if extended > self._highest:
+            self._highest = extended
+
+        self._release(out, self._highest - self.maxDelay + 1)
+        return out
+
+    def flush(self) -> List[memoryview]:
+        '''
+        Release every held packet, skipping any gaps.
+        '''
+
+        out: List[memoryview] = []
+        if self._next is not None:
+            self._release(out, self._highest + 1)
+        return out
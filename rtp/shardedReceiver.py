@@ -0,0 +1,275 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import socket
+import time
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, List, Optional, Sequence, Union
+from .decoder import DecodeCounters, tryDecode
+from .packetRing import PacketRing
+from .peek import peekSSRC
+
+
+def shardForSSRC(
+       datagram: Union[bytes, memoryview], numShards: int) -> int:
+    '''
+    Pick a shard for an encoded RTP packet from its SSRC, which is read
+    straight from bytes ``8-11`` of the header. Packets too short to carry an
+    SSRC go to shard ``0``.
+    '''
+
+    if len(datagram) < 12:
+        return 0
+
+    return peekSSRC(datagram) % numShards
+
+
+class ShardDispatcher:
+    '''
+    The reader side of a :class:`ShardedReceiver`. A dispatcher owns the
+    producer end of one ring per worker and steers each datagram to the ring
+    of the worker responsible for its SSRC. Each reader process must use its
+    own dispatcher. Dispatchers can be pickled to hand them to a reader
+    process.
+
+    Attributes:
+        dropped (int): Datagrams discarded because the worker's ring was full.
+        oversized (int): Datagrams discarded because they were larger than a
+            ring slot.
+    '''
+
+    def __init__(self, rings: Sequence[PacketRing]) -> None:
+        self._rings = list(rings)
+        # One byte more than a slot holds, so oversized datagrams show up
+        # rather than being silently truncated by the receive
+        self._scratch = bytearray(max(r.slotSize for r in self._rings) + 1)
+        self.dropped = 0
+        self.oversized = 0
+
+    def __reduce__(self) -> tuple:
+        return (self.__class__, (self._rings,))
+
+    def dispatch(self, datagram: Union[bytes, memoryview]) -> bool:
+        '''
+        Copy a datagram into the ring of the worker for its SSRC. Returns
+        ``False`` if that ring is full, or the datagram is too large for it,
+        and the datagram was dropped.
+        '''
+
+        ring = self._rings[shardForSSRC(datagram, len(self._rings))]
+        if len(datagram) > ring.slotSize:
+            self.oversized += 1
+            return False
+        if ring.put(datagram):
+            return True
+
+        self.dropped += 1
+        return False
+
+    def recvInto(self, sock: socket.socket) -> int:
+        '''
+        Receive one datagram from ``sock`` and dispatch it. Returns the
+        number of bytes received.
+        '''
+
+        length = sock.recv_into(self._scratch)
+        with memoryview(self._scratch) as view:
+            self.dispatch(view[:length])
+        return length
+
+
+def _workerMain(
+       rings: List[PacketRing],
+       handler: Callable[[Any], None],
+       decode: bool,
+       stopEvent: Any,
+       handledCounts: Any,
+       errorCounts: Any,
+       index: int,
+       idleSleep: float) -> None:
+    counters = DecodeCounters()
+    handled = 0
+    while True:
+        idle = True
+        for ring in rings:
+            view = ring.peek()
+            while view is not None:
+                idle = False
+                try:
+                    if decode:
+                        # Malformed packets are counted and skipped rather
+                        # than ending the worker
+                        _, packet = tryDecode(view, counters)
+                        if packet is not None:
+                            handler(packet)
+                            handled += 1
+                    else:
+                        handler(view)
+                        handled += 1
+                finally:
+                    view.release()
+                    ring.release()
+                view = ring.peek()
+
+        if idle:
+            handledCounts[index] = handled
+            errorCounts[index] = counters.errors
+            if stopEvent.is_set():
+                break
+            time.sleep(idleSleep)
+
+    for ring in rings:
+        ring.close()
+
+
+class ShardedReceiver:
+    '''
+    A multi-process receive pipeline. Reader processes pull datagrams into
+    shared memory :class:`PacketRing` objects and shard them by SSRC so that
+    every packet of a given stream is handled, in order, by the same worker
+    process. Workers read packets straight out of shared memory, so neither
+    ``RTP`` objects nor payloads are pickled between processes.
+
+    The handler is called in the worker process with a read-only
+    ``memoryview`` of each datagram, valid only for the duration of the call.
+    If ``decode`` is set the handler is instead given a decoded ``RTP``, and
+    malformed datagrams are counted and skipped. With the ``spawn`` start
+    method the handler must be picklable.
+
+    Attributes:
+        numWorkers (int): The number of worker processes.
+        numReaders (int): The number of readers feeding the workers.
+    '''
+
+    def __init__(
+       self,
+       handler: Callable[[Any], None],
+       numWorkers: int = 2,
+       numReaders: int = 1,
+       slotCount: int = 4096,
+       slotSize: int = 2048,
+       decode: bool = False,
+       idleSleep: float = 0.0005,
+       context: Optional[BaseContext] = None) -> None:
+        if numWorkers <= 0:
+            raise ValueError("ShardedReceiver needs at least one worker")
+        if numReaders <= 0:
+            raise ValueError("ShardedReceiver needs at least one reader")
+
+        self.numWorkers = numWorkers
+        self.numReaders = numReaders
+        self._handler = handler
+        self._decode = decode
+        self._idleSleep = idleSleep
+        self._context: Any = context or multiprocessing.get_context()
+
+        # One ring for every (reader, worker) pair keeps each ring
+        # single-producer, single-consumer.
+        self._rings = [
+            [PacketRing(slotCount, slotSize) for _ in range(numWorkers)]
+            for _ in range(numReaders)]
+        self._stopEvent = self._context.Event()
+        self._handledCounts = self._context.Array('Q', numWorkers)
+        self._errorCounts = self._context.Array('Q', numWorkers)
+        self._workers: List[Any] = []
+        self._readers: List[Any] = []
+
+    def __enter__(self) -> 'ShardedReceiver':
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def dispatcher(self, reader: int = 0) -> ShardDispatcher:
+        '''
+        Get the dispatcher for reader number ``reader``.
+        '''
+
+        return ShardDispatcher(self._rings[reader])
+
+    def start(self) -> None:
+        '''
+        Start the worker processes.
+        '''
+
+        for worker in range(self.numWorkers):
+            process = self._context.Process(
+                target=_workerMain,
+                args=(
+                    [readerRings[worker] for readerRings in self._rings],
+                    self._handler,
+                    self._decode,
+                    self._stopEvent,
+                    self._handledCounts,
+                    self._errorCounts,
+                    worker,
+                    self._idleSleep),
+                daemon=True)
+            process.start()
+            self._workers.append(process)
+
+    def startReaders(
+       self,
+       target: Callable[[ShardDispatcher], None]) -> None:
+        '''
+        Start one reader process per reader, each calling ``target`` with its
+        own :class:`ShardDispatcher`. ``target`` typically opens a socket and
+        loops on :meth:`ShardDispatcher.recvInto`.
+        '''
+
+        for reader in range(self.numReaders):
+            process = self._context.Process(
+                target=target, args=(self.dispatcher(reader),), daemon=True)
+            process.start()
+            self._readers.append(process)
+
+    def handled(self) -> List[int]:
+        '''
+        The number of packets each worker has handled, as of when it last
+        went idle.
+        '''
+
+        return self._handledCounts[:]
+
+    def decodeErrors(self) -> List[int]:
+        '''
+        The number of malformed packets each worker has skipped when
+        decoding, as of when it last went idle.
+        '''
+
+        return self._errorCounts[:]
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        '''
+        Stop the reader processes, let the workers drain their rings, and then
+        release the shared memory.
+        '''
+
+        for process in self._readers:
+            process.terminate()
+            process.join(timeout)
+
+        self._stopEvent.set()
+        for process in self._workers:
+            process.join(timeout)
+
+        for readerRings in self._rings:
+            for ring in readerRings:
+                ring.close()
+                ring.unlink()
+
+        self._readers = []
+        self._workers = []
@@ -0,0 +1,234 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Framing of RTP and RTCP packets carried over TCP, either with the two byte
+length prefix of RFC 4571 or interleaved in an RTSP connection (RFC 2326
+section 10.12) behind a ``$``, a channel number and a two byte length.
+'''
+
+import re
+import socket
+from struct import Struct
+from typing import Iterator, NamedTuple, Optional, Union
+from .errors import LengthError
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+MAX_LENGTH = (2**16) - 1
+
+_length = Struct('!H')
+_interleavedHeader = Struct('!cBH')
+_contentLength = re.compile(rb'\r\ncontent-length:[ \t]*(\d+)', re.IGNORECASE)
+
+
+def encodeRFC4571(packet: Buffer) -> bytearray:
+    '''
+    Frame a packet with an RFC 4571 length prefix.
+    '''
+
+    if len(packet) > MAX_LENGTH:
+        raise LengthError("RFC 4571 packets are at most 65535 bytes")
+
+    framed = bytearray(_length.size + len(packet))
+    _length.pack_into(framed, 0, len(packet))
+    framed[_length.size:] = packet
+    return framed
+
+
+def encodeInterleaved(channel: int, packet: Buffer) -> bytearray:
+    '''
+    Frame a packet for RTSP interleaving on ``channel``.
+    '''
+
+    if len(packet) > MAX_LENGTH:
+        raise LengthError("Interleaved packets are at most 65535 bytes")
+    if not (0 <= channel < 256):
+        raise ValueError("Interleaved channel must be in the range 0-255")
+
+    framed = bytearray(_interleavedHeader.size + len(packet))
+    _interleavedHeader.pack_into(framed, 0, b'$', channel, len(packet))
+    framed[_interleavedHeader.size:] = packet
+    return framed
+
+
+class InterleavedPacket(NamedTuple):
+    '''
+    An item read from an RTSP connection by an :class:`InterleavedParser`.
+
+    Attributes:
+        channel (int): The interleaved channel, or ``None`` for an RTSP
+            message.
+        data (memoryview): The packet, or the whole RTSP message including
+            any body.
+    '''
+
+    channel: Optional[int]
+    data: memoryview
+
+
+class _StreamBuffer:
+    # One receive buffer that data is appended to and frames are consumed
+    # from the front of. Unconsumed data is only moved to make room when
+    # new data arrives, and the buffer only grows when that isn't enough, so
+    # reassembly is linear however the stream is split into chunks.
+
+    def __init__(self, initialSize: int) -> None:
+        self._buffer = bytearray(initialSize)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        '''
+        The number of bytes received but not yet parsed into frames.
+        '''
+
+        return self._end - self._start
+
+    def _reserve(self, size: int) -> memoryview:
+        if len(self._buffer) - self._end < size:
+            pending = self._end - self._start
+            if pending + size <= len(self._buffer):
+                self._buffer[:pending] = self._view[self._start:self._end]
+            else:
+                buffer = bytearray(max(2 * len(self._buffer), pending + size))
+                buffer[:pending] = self._view[self._start:self._end]
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            self._start = 0
+            self._end = pending
+
+        return self._view[self._end:self._end + size]
+
+    def feed(self, data: Buffer) -> None:
+        '''
+        Add a chunk received from the stream.
+        '''
+
+        size = len(data)
+        self._reserve(size)[:] = data
+        self._end += size
+        self.bytes += size
+
+    def recvInto(self, sock: socket.socket, size: int = 65536) -> int:
+        '''
+        Receive up to ``size`` bytes from ``sock`` straight into the buffer.
+        Returns the number of bytes received, ``0`` meaning the stream has
+        ended.
+        '''
+
+        received = sock.recv_into(self._reserve(size), size)
+        self._end += received
+        self.bytes += received
+        return received
+
+
+class RFC4571Parser (_StreamBuffer):
+    '''
+    Splits a TCP stream framed as in RFC 4571 into packets. Data is added
+    with :meth:`feed` or :meth:`recvInto` in whatever chunks it arrives, and
+    iterating over the parser yields each complete packet as a
+    ``memoryview`` onto its buffer, ready for ``RTP.fromBytearray``. Views
+    are valid until data is next added.
+
+    Attributes:
+        packets (int): Packets parsed.
+        bytes (int): Bytes received.
+    '''
+
+    def __init__(self, initialSize: int = 65536) -> None:
+        super().__init__(initialSize)
+        self.packets = 0
+
+    def __iter__(self) -> Iterator[memoryview]:
+        view = self._view
+        headerSize = _length.size
+        while self._end - self._start >= headerSize:
+            start = self._start + headerSize
+            end = start + _length.unpack_from(view, self._start)[0]
+            if end > self._end:
+                return
+            self._start = end
+            self.packets += 1
+            yield view[start:end]
+
+
+class InterleavedParser (_StreamBuffer):
+    '''
+    Splits an RTSP connection carrying interleaved RTP and RTCP into
+    :class:`InterleavedPacket` items: packets with their channel numbers,
+    and the RTSP messages between them. Data is added with :meth:`feed` or
+    :meth:`recvInto` and iterating over the parser yields each complete
+    item, viewed in its buffer. Views are valid until data is next added.
+
+    Attributes:
+        packets (int): Interleaved packets parsed.
+        messages (int): RTSP messages parsed.
+        bytes (int): Bytes received.
+        maxMessageSize (int): The largest RTSP message header accepted.
+    '''
+
+    def __init__(
+       self,
+       initialSize: int = 65536,
+       maxMessageSize: int = 65536) -> None:
+        super().__init__(initialSize)
+        self.maxMessageSize = maxMessageSize
+        self.packets = 0
+        self.messages = 0
+
+    def _messageEnd(self) -> int:
+        # The end of the RTSP message at the front, or -1 if incomplete
+        buffer = self._buffer
+        headerEnd = buffer.find(b'\r\n\r\n', self._start, self._end)
+        if headerEnd < 0:
+            if self._end - self._start > self.maxMessageSize:
+                raise LengthError("RTSP message header is too long")
+            return -1
+
+        headerEnd += 4
+        match = _contentLength.search(buffer, self._start, headerEnd)
+        end = headerEnd
+        if match is not None:
+            end += int(match.group(1))
+        if end > self._end:
+            return -1
+        return end
+
+    def __iter__(self) -> Iterator[InterleavedPacket]:
+        view = self._view
+        headerSize = _interleavedHeader.size
+        while self._end > self._start:
+            if view[self._start] == 0x24:
+                if self._end - self._start < headerSize:
+                    return
+                _, channel, length = _interleavedHeader.unpack_from(
+                    view, self._start)
+                start = self._start + headerSize
+                end = start + length
+                if end > self._end:
+                    return
+                self._start = end
+                self.packets += 1
+                yield InterleavedPacket(channel, view[start:end])
+            else:
+                end = self._messageEnd()
+                if end < 0:
+                    return
+                start = self._start
+                self._start = end
+                self.messages += 1
+                yield InterleavedPacket(None, view[start:end])
@@ -0,0 +1,158 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import time
+from struct import Struct
+from typing import Iterable, Iterator, Optional, Tuple
+from .columns import PacketColumns
+from .decoder import DecodeCounters, DecodeStatus, tryDecode
+from .rtp import RTP
+
+# Linux's SO_TIMESTAMPNS, which not every Python exports. The control message
+# carrying the timestamp has the same type.
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)
+SCM_TIMESTAMPNS = SO_TIMESTAMPNS
+
+# struct timespec
+_timespec = Struct('@ll')
+
+# Not every platform has ancillary data, so only TimestampedReader needs it
+_cmsgSpace = getattr(socket, 'CMSG_SPACE', None)
+
+
+def enableTimestamps(sock: socket.socket) -> bool:
+    '''
+    Ask the kernel to timestamp each datagram received on ``sock``. Returns
+    ``False`` if the platform doesn't support it.
+    '''
+
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+    except OSError:
+        return False
+    return True
+
+
+def timestampFromAncillary(
+       ancillary: Iterable[Tuple[int, int, bytes]]) -> Optional[float]:
+    '''
+    Find the kernel receive timestamp in the ancillary data returned by
+    ``recvmsg``, in seconds since the epoch. Returns ``None`` if there isn't
+    one.
+    '''
+
+    for level, kind, data in ancillary:
+        if ((level == socket.SOL_SOCKET) and (kind == SCM_TIMESTAMPNS) and
+                (len(data) >= _timespec.size)):
+            seconds, nanoseconds = _timespec.unpack_from(data)
+            return seconds + (nanoseconds / 1e9)
+    return None
+
+
+class TimestampedReader:
+    '''
+    Receives datagrams from a UDP socket together with the time the kernel
+    received them, read from ``SO_TIMESTAMPNS`` ancillary data rather than
+    from a clock read after the packet reaches userspace. Where the kernel
+    doesn't supply a timestamp, ``time.time()`` is used instead.
+
+    Datagrams are received into a single buffer, so views returned by
+    :meth:`read` are only valid until the next read.
+
+    Attributes:
+        sock (socket.socket): The socket read from.
+        kernelTimestamps (bool): Whether kernel timestamping was enabled.
+        fallbacks (int): Datagrams that arrived without a kernel timestamp.
+    '''
+
+    def __init__(
+       self,
+       sock: socket.socket,
+       maxPacketSize: int = 2048) -> None:
+        if (_cmsgSpace is None) or not hasattr(sock, 'recvmsg_into'):
+            raise OSError(
+                "Ancillary data isn't supported on this platform")
+
+        self.sock = sock
+        self.kernelTimestamps = enableTimestamps(sock)
+        self.fallbacks = 0
+
+        self._ancillarySize = _cmsgSpace(_timespec.size)
+        self._buffer = bytearray(maxPacketSize)
+        self._view = memoryview(self._buffer)
+
+    def _receive(self) -> Tuple[memoryview, float]:
+        length, ancillary, _, _ = self.sock.recvmsg_into(
+            [self._buffer], self._ancillarySize)
+
+        arrivalTime = timestampFromAncillary(ancillary)
+        if arrivalTime is None:
+            arrivalTime = time.time()
+            self.fallbacks += 1
+
+        return (self._view[:length], arrivalTime)
+
+    def read(self) -> Tuple[memoryview, float]:
+        '''
+        Receive a datagram. Returns a view of it and its arrival time.
+        '''
+
+        return self._receive()
+
+    def readPacket(
+       self,
+       counters: Optional[DecodeCounters] = None,
+       into: Optional[RTP] = None) -> Tuple[DecodeStatus, Optional[RTP]]:
+        '''
+        Receive and decode a packet as :func:`tryDecode` does, setting its
+        ``arrivalTime``.
+        '''
+
+        datagram, arrivalTime = self._receive()
+        status, packet = tryDecode(datagram, counters, into)
+        if packet is not None:
+            packet.arrivalTime = arrivalTime
+        return (status, packet)
+
+    def readColumns(
+       self,
+       columns: PacketColumns,
+       maxPackets: int = 1024) -> int:
+        '''
+        Decode the datagrams already waiting on the socket, up to
+        ``maxPackets``, onto the end of ``columns`` with their arrival times.
+        Doesn't block. Returns the number of datagrams read.
+        '''
+
+        count = 0
+
+        def received() -> Iterator[Tuple[float, memoryview]]:
+            nonlocal count
+            while count < maxPackets:
+                try:
+                    datagram, arrivalTime = self._receive()
+                except BlockingIOError:
+                    return
+                count += 1
+                # Each view is decoded before the next receive overwrites it
+                yield (arrivalTime, datagram)
+
+        timeout = self.sock.gettimeout()
+        self.sock.settimeout(0.0)
+        try:
+            columns.extend(received())
+        finally:
+            self.sock.settimeout(timeout)
+        return count
@@ -0,0 +1,303 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+``rtp-analyze``: per-SSRC statistics for the RTP streams in pcap or rtpdump
+captures.
+'''
+
+import argparse
+import json
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+from ..capture import openCapture
+from ..columns import Buffer, decodeColumns
+
+# Extended sequence numbers remembered per stream to spot duplicates
+_DUPLICATE_WINDOW = 4096
+
+
+class StreamStats:
+    '''
+    Statistics for one RTP stream, updated a packet at a time in arrival
+    order.
+
+    Attributes:
+        ssrc (int): The stream's SSRC.
+        clockRate (int): The RTP clock rate used for jitter and timestamp
+            checks.
+        interval (float): The bitrate measurement interval in seconds.
+        maxJump (float): The largest disagreement, in seconds, between the
+            timestamp and arrival time steps of consecutive packets before a
+            timestamp discontinuity is counted.
+        packets (int): Packets received, including duplicates.
+        bytes (int): Bytes received.
+        duplicates (int): Packets received more than once.
+        reordered (int): Packets that arrived after a later one.
+        maxReorder (int): The furthest, in sequence numbers, a packet arrived
+            behind the highest received.
+        jitter (float): The RFC 3550 interarrival jitter, in seconds.
+        discontinuities (int): Timestamp discontinuities.
+        markers (int): Packets with the marker bit set.
+        payloadTypes (dict): Packet counts by payload type number.
+        payloadTypeChanges (int): Times the payload type changed.
+    '''
+
+    def __init__(
+       self,
+       ssrc: int,
+       clockRate: int = 90000,
+       interval: float = 1.0,
+       maxJump: float = 1.0) -> None:
+        self.ssrc = ssrc
+        self.clockRate = clockRate
+        self.interval = interval
+        self.maxJump = maxJump
+
+        self.packets = 0
+        self.bytes = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.maxReorder = 0
+        self.jitter = 0.0
+        self.discontinuities = 0
+        self.markers = 0
+        self.payloadTypes: Dict[int, int] = {}
+        self.payloadTypeChanges = 0
+
+        self._first: Optional[int] = None
+        self._highest = 0
+        self._seen = array('q', [-1] * _DUPLICATE_WINDOW)
+        self._firstArrival = 0.0
+        self._lastArrival = 0.0
+        self._lastTimestamp = 0
+        self._payloadType = -1
+        self._sinceMarker = 0
+        self._markerGaps: List[int] = []
+        self._bucketBytes: List[int] = []
+
+    @property
+    def expected(self) -> int:
+        '''
+        The number of packets expected from the range of sequence numbers.
+        '''
+
+        if self._first is None:
+            return 0
+        return self._highest - self._first + 1
+
+    @property
+    def lost(self) -> int:
+        return max(self.expected - (self.packets - self.duplicates), 0)
+
+    @property
+    def bitrate(self) -> List[float]:
+        '''
+        Bits per second in each ``interval`` from the first packet.
+        '''
+
+        return [(8 * b) / self.interval for b in self._bucketBytes]
+
+    def add(
+       self,
+       arrivalTime: float,
+       sequenceNumber: int,
+       timestamp: int,
+       payloadType: int,
+       marker: int,
+       length: int) -> None:
+        '''
+        Add a packet.
+        '''
+
+        self.packets += 1
+        self.bytes += length
+
+        if self._first is None:
+            self._first = sequenceNumber
+            self._highest = sequenceNumber
+            self._firstArrival = arrivalTime
+            self._lastArrival = arrivalTime
+            self._lastTimestamp = timestamp
+            extended = sequenceNumber
+        else:
+            delta = ((sequenceNumber - self._highest + 2**15) & 0xffff) - 2**15
+            extended = self._highest + delta
+
+        slot = extended % _DUPLICATE_WINDOW
+        if self._seen[slot] == extended:
+            self.duplicates += 1
+            return
+        self._seen[slot] = extended
+
+        if extended < self._highest:
+            self.reordered += 1
+            self.maxReorder = max(self.maxReorder, self._highest - extended)
+        elif extended > self._highest:
+            self._highest = extended
+
+        # RFC 3550 interarrival jitter, in timestamp units until reported
+        step = ((timestamp - self._lastTimestamp + 2**31) & 0xffffffff) - 2**31
+        arrivalStep = arrivalTime - self._lastArrival
+        difference = (arrivalStep * self.clockRate) - step
+        self.jitter += (abs(difference) - self.jitter) / 16
+        if abs(difference) > self.maxJump * self.clockRate:
+            self.discontinuities += 1
+        self._lastArrival = arrivalTime
+        self._lastTimestamp = timestamp
+
+        self.payloadTypes[payloadType] = (
+            self.payloadTypes.get(payloadType, 0) + 1)
+        if (self._payloadType >= 0) and (payloadType != self._payloadType):
+            self.payloadTypeChanges += 1
+        self._payloadType = payloadType
+
+        self._sinceMarker += 1
+        if marker:
+            self.markers += 1
+            self._markerGaps.append(self._sinceMarker)
+            self._sinceMarker = 0
+
+        bucket = int((arrivalTime - self._firstArrival) / self.interval)
+        buckets = self._bucketBytes
+        if bucket >= len(buckets):
+            buckets.extend([0] * (bucket + 1 - len(buckets)))
+        buckets[bucket] += length
+
+    def snapshot(self) -> dict:
+        gaps = self._markerGaps
+        return {
+            'ssrc': self.ssrc,
+            'packets': self.packets,
+            'bytes': self.bytes,
+            'expected': self.expected,
+            'lost': self.lost,
+            'duplicates': self.duplicates,
+            'reordered': self.reordered,
+            'maxReorder': self.maxReorder,
+            'jitter': self.jitter / self.clockRate,
+            'discontinuities': self.discontinuities,
+            'markers': self.markers,
+            'markerInterval': {
+                'min': min(gaps) if gaps else None,
+                'max': max(gaps) if gaps else None,
+                'mean': (sum(gaps) / len(gaps)) if gaps else None},
+            'payloadTypes': dict(self.payloadTypes),
+            'payloadTypeChanges': self.payloadTypeChanges,
+            'duration': self._lastArrival - self._firstArrival,
+            'bitrate': self.bitrate}
+
+
+def analyze(
+       packets: Iterable[Tuple[float, Buffer]],
+       clockRate: int = 90000,
+       interval: float = 1.0,
+       maxJump: float = 1.0,
+       streams: Optional[Dict[int, StreamStats]] = None
+       ) -> Tuple[Dict[int, StreamStats], int]:
+    '''
+    Gather :class:`StreamStats` per SSRC from ``(arrival time, datagram)``
+    pairs, decoded a batch at a time into columns. Returns the stats and the
+    number of packets that weren't valid RTP.
+    '''
+
+    if streams is None:
+        streams = {}
+    invalid = 0
+
+    for columns in decodeColumns(packets):
+        invalid += columns.invalid
+        for (ssrc, arrivalTime, sequenceNumber, timestamp, payloadType,
+                marker, length) in zip(
+                    columns.ssrc, columns.arrivalTime,
+                    columns.sequenceNumber, columns.timestamp,
+                    columns.payloadType, columns.marker, columns.length):
+            stream = streams.get(ssrc)
+            if stream is None:
+                stream = streams[ssrc] = StreamStats(
+                    ssrc, clockRate, interval, maxJump)
+            stream.add(
+                arrivalTime, sequenceNumber, timestamp, payloadType, marker,
+                length)
+
+    return (streams, invalid)
+
+
+def _printText(result: dict, out: TextIO) -> None:
+    print("{} invalid, {} non-UDP or RTCP records".format(
+        result['invalid'], result['skipped']), file=out)
+    for stream in result['streams']:
+        print("", file=out)
+        print("SSRC 0x{:08x}".format(stream['ssrc']), file=out)
+        for key, value in stream.items():
+            if key == 'ssrc':
+                continue
+            if key == 'bitrate':
+                value = ' '.join('{:.0f}'.format(b) for b in value)
+            print("  {}: {}".format(key, value), file=out)
+
+
+def parseArgs(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='rtp-analyze',
+        description="Per-SSRC statistics for RTP streams in pcap or rtpdump "
+                    "captures.")
+    parser.add_argument('captures', nargs='+', help="capture files")
+    parser.add_argument(
+        '--json', action='store_true', help="print the results as JSON")
+    parser.add_argument(
+        '--clock-rate', type=int, default=90000, help="RTP clock rate")
+    parser.add_argument(
+        '--interval', type=float, default=1.0,
+        help="bitrate measurement interval in seconds")
+    parser.add_argument(
+        '--max-jump', type=float, default=1.0,
+        help="timestamp discontinuity threshold in seconds")
+
+    return parser.parse_args(argv)
+
+
+def main(
+       argv: Optional[Sequence[str]] = None,
+       out: TextIO = sys.stdout) -> int:
+    args = parseArgs(argv)
+
+    streams: Dict[int, StreamStats] = {}
+    invalid = 0
+    skipped = 0
+    for path in args.captures:
+        with openCapture(path) as reader:
+            _, count = analyze(
+                reader, args.clock_rate, args.interval, args.max_jump,
+                streams)
+            invalid += count
+            skipped += reader.skipped
+
+    result = {
+        'invalid': invalid,
+        'skipped': skipped,
+        'streams': [streams[ssrc].snapshot() for ssrc in sorted(streams)]}
+
+    if args.json:
+        json.dump(result, out, indent=2)
+        print("", file=out)
+    else:
+        _printText(result, out)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
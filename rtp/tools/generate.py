@@ -0,0 +1,256 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+``rtp-generate``: emit synthetic RTP streams over UDP, or to a pcap or
+rtpdump file, at a target packet rate, and report the rate achieved.
+'''
+
+import argparse
+import socket
+import sys
+import time
+from heapq import heapreplace
+from random import randint
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+from ..capture import PcapWriter, RtpdumpWriter
+from ..payloadType import PayloadType
+from ..rtp import RTP
+
+T = TypeVar('T')
+
+
+class SyntheticStream:
+    '''
+    One synthetic RTP stream, encoded with :class:`RTP`.
+
+    Attributes:
+        packet (RTP): The packet encoded next.
+        interval (float): The time between packets in seconds.
+        markerEvery (int): Set the marker bit on every ``markerEvery``-th
+            packet, as on the last packet of each video frame.
+    '''
+
+    def __init__(
+       self,
+       ssrc: int,
+       payloadType: PayloadType,
+       size: int,
+       rate: float,
+       clockRate: int = 90000,
+       markerEvery: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError("Packet rate must be positive")
+        if markerEvery <= 0:
+            raise ValueError("Marker interval must be positive")
+
+        self.packet = RTP(
+            ssrc=ssrc, payloadType=payloadType, payload=bytearray(size))
+        self.interval = 1 / rate
+        self.markerEvery = markerEvery
+        self._ticks = clockRate / rate
+        self._timestamp = float(self.packet.timestamp)
+        self._count = 0
+
+    def next(self) -> bytearray:
+        '''
+        Encode the next packet.
+        '''
+
+        packet = self.packet
+        self._count += 1
+        packet.marker = (self._count % self.markerEvery) == 0
+        datagram = packet.toBytearray()
+
+        packet.sequenceNumber = (packet.sequenceNumber + 1) & 0xffff
+        self._timestamp += self._ticks
+        packet.timestamp = int(self._timestamp) & 0xffffffff
+
+        return datagram
+
+
+def generate(
+       streams: Sequence[SyntheticStream],
+       output: Callable[[bytearray, float], None],
+       count: Optional[int] = None,
+       duration: Optional[float] = None,
+       realtime: bool = True) -> dict:
+    '''
+    Interleave packets from ``streams`` in time order, passing each with its
+    send time to ``output``, until ``count`` packets or ``duration`` seconds
+    of packets have been generated. If ``realtime`` is set the loop is paced
+    to the streams' rates; otherwise it runs flat out with synthetic times.
+
+    Returns the packets and bytes sent, the elapsed and CPU time, and the
+    achieved rates.
+    '''
+
+    if (count is None) and (duration is None):
+        raise ValueError("Either a packet count or a duration is needed")
+
+    # (send time, stream index, packets sent on the stream). Send times are
+    # computed from the count rather than accumulated, so they don't drift
+    schedule: List[Tuple[float, int, int]] = [
+        (0.0, i, 0) for i in range(len(streams))]
+    sent = 0
+    sentBytes = 0
+
+    wallStart = time.time()
+    start = time.monotonic()
+    cpuStart = time.process_time()
+
+    while schedule:
+        due, i, n = schedule[0]
+        if (count is not None) and (sent >= count):
+            break
+        if (duration is not None) and (due >= duration):
+            break
+
+        if realtime:
+            ahead = (start + due) - time.monotonic()
+            if ahead > 0:
+                time.sleep(ahead)
+
+        datagram = streams[i].next()
+        output(datagram, wallStart + due)
+        sent += 1
+        sentBytes += len(datagram)
+        heapreplace(schedule, ((n + 1) * streams[i].interval, i, n + 1))
+
+    elapsed = time.monotonic() - start
+    cpu = time.process_time() - cpuStart
+    return {
+        'packets': sent,
+        'bytes': sentBytes,
+        'elapsed': elapsed,
+        'cpu': cpu,
+        'packetsPerSecond': sent / elapsed if elapsed else 0.0,
+        'bytesPerSecond': sentBytes / elapsed if elapsed else 0.0}
+
+
+def _list(convert: Callable[[str], T]) -> Callable[[str], List[T]]:
+    def parse(value: str) -> List[T]:
+        return [convert(item) for item in value.split(',')]
+    return parse
+
+
+def _address(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+
+def _pick(values: List[T], i: int) -> T:
+    return values[i % len(values)]
+
+
+def parseArgs(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='rtp-generate',
+        description="Generate synthetic RTP streams. Comma separated lists "
+                    "are applied to the streams in turn.")
+    parser.add_argument(
+        '-n', '--streams', type=int, default=1, help="number of streams")
+    parser.add_argument(
+        '--ssrc', type=lambda v: int(v, 0),
+        help="SSRC of the first stream; the rest follow on. Random if unset")
+    parser.add_argument(
+        '--payload-type', type=_list(int), default=[96],
+        help="payload type numbers")
+    parser.add_argument(
+        '--size', type=_list(int), default=[1200],
+        help="payload sizes in bytes")
+    parser.add_argument(
+        '--rate', type=_list(float), default=[1000.0],
+        help="packets per second per stream")
+    parser.add_argument(
+        '--marker-every', type=_list(int), default=[1],
+        help="set the marker bit on every Nth packet")
+    parser.add_argument(
+        '--clock-rate', type=int, default=90000, help="RTP clock rate")
+    parser.add_argument(
+        '-c', '--count', type=int, help="total packets to generate")
+    parser.add_argument(
+        '-d', '--duration', type=float,
+        help="seconds of packets to generate (default 10)")
+
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument(
+        '--dest', type=_address, help="send over UDP to HOST:PORT")
+    output.add_argument('--pcap', help="write to a pcap file")
+    output.add_argument('--rtpdump', help="write to an rtpdump file")
+
+    parser.add_argument(
+        '--no-pacing', action='store_true',
+        help="send as fast as possible instead of at the target rate")
+
+    args = parser.parse_args(argv)
+    if (args.count is None) and (args.duration is None):
+        args.duration = 10.0
+
+    return args
+
+
+def makeStreams(args: argparse.Namespace) -> List[SyntheticStream]:
+    firstSSRC = args.ssrc
+    if firstSSRC is None:
+        firstSSRC = randint(0, (2**32)-1)
+
+    return [
+        SyntheticStream(
+            (firstSSRC + i) & 0xffffffff,
+            PayloadType(_pick(args.payload_type, i)),
+            _pick(args.size, i),
+            _pick(args.rate, i),
+            args.clock_rate,
+            _pick(args.marker_every, i))
+        for i in range(args.streams)]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parseArgs(argv)
+    streams = makeStreams(args)
+
+    if args.dest is not None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        dest = args.dest
+
+        def send(datagram: bytearray, timestamp: float) -> None:
+            sock.sendto(datagram, dest)
+
+        try:
+            result = generate(
+                streams, send, args.count, args.duration,
+                realtime=not args.no_pacing)
+        finally:
+            sock.close()
+    else:
+        writer = (
+            PcapWriter(args.pcap) if args.pcap is not None
+            else RtpdumpWriter(args.rtpdump))
+        with writer:
+            # Files get synthetic send times, so never need pacing
+            result = generate(
+                streams, writer.write, args.count, args.duration,
+                realtime=False)
+
+    print(
+        "{packets} packets, {bytes} bytes in {elapsed:.3f}s: "
+        "{packetsPerSecond:.0f} packets/s, {bytesPerSecond:.0f} bytes/s, "
+        "{cpu:.3f}s CPU".format(**result))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Optional
+
+
+class Unwrapper:
+    '''
+    Extends a wrapping counter, such as the 16-bit RTP sequence number or
+    32-bit timestamp, to an unbounded integer. Each value is placed at
+    whichever wrap of the counter is closest to the previous value, so
+    reordering by less than half the counter range is handled. The first
+    value is returned unchanged; values reordered before it may be negative.
+
+    Attributes:
+        bits (int): The width of the counter.
+    '''
+
+    def __init__(self, bits: int = 16) -> None:
+        self.bits = bits
+        self._range = 1 << bits
+        self._half = 1 << (bits - 1)
+        self._mask = self._range - 1
+        self._last: Optional[int] = None
+
+    @property
+    def last(self) -> Optional[int]:
+        '''
+        The most recently returned extended value.
+        '''
+
+        return self._last
+
+    def unwrap(self, value: int) -> int:
+        '''
+        Get the extended value of ``value``.
+        '''
+
+        last = self._last
+        if last is None:
+            self._last = value
+            return value
+
+        delta = (value - last) & self._mask
+        if delta >= self._half:
+            delta -= self._range
+
+        self._last = last + delta
+        return self._last
+
+    def peek(self, value: int) -> int:
+        '''
+        Get the extended value of ``value`` without moving the reference
+        point, e.g. for a packet that may be discarded.
+        '''
+
+        last = self._last
+        if last is None:
+            return value
+
+        delta = (value - last) & self._mask
+        if delta >= self._half:
+            delta -= self._range
+
+        return last + delta
+
+    def reset(self) -> None:
+        self._last = None
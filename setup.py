@@ -70,6 +70,12 @@ setup(name=name,
       packages=package_names,
       package_dir=packages,
       scripts=[],
+      entry_points={
+          'console_scripts': [
+              'rtp-generate=rtp.tools.generate:main',
+              'rtp-analyze=rtp.tools.analyze:main',
+          ],
+      },
       package_data={name: ['py.typed'] for name in package_names},
       long_description=long_description,
       long_description_content_type="text/markdown")
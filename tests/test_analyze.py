@@ -0,0 +1,134 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from rtp import RTP, PayloadType, PcapWriter
+from rtp.tools.analyze import StreamStats, analyze, main
+
+
+def stream(ssrc, sequences, start=0.0, interval=0.01, markerEvery=3,
+           payloadType=PayloadType.DYNAMIC_96):
+    packets = []
+    for i, sequenceNumber in enumerate(sequences):
+        packet = RTP(
+            ssrc=ssrc, sequenceNumber=sequenceNumber & 0xffff,
+            timestamp=(sequenceNumber * 900) & 0xffffffff,
+            payloadType=payloadType,
+            marker=(sequenceNumber % markerEvery) == (markerEvery - 1),
+            payload=bytearray(88))
+        packets.append((start + (i * interval), packet.toBytes()))
+    return packets
+
+
+class TestStreamStats (TestCase):
+    def test_clean(self):
+        streams, invalid = analyze(stream(1, range(300)))
+        stats = streams[1].snapshot()
+
+        self.assertEqual(invalid, 0)
+        self.assertEqual(stats['packets'], 300)
+        self.assertEqual(stats['bytes'], 300 * 100)
+        self.assertEqual(stats['lost'], 0)
+        self.assertEqual(stats['duplicates'], 0)
+        self.assertEqual(stats['reordered'], 0)
+        self.assertEqual(stats['discontinuities'], 0)
+        self.assertAlmostEqual(stats['jitter'], 0)
+        self.assertEqual(stats['markers'], 100)
+        self.assertEqual(
+            stats['markerInterval'], {'min': 3, 'max': 3, 'mean': 3})
+        self.assertEqual(stats['payloadTypes'], {96: 300})
+        self.assertEqual(stats['bitrate'], [80000, 80000, 80000])
+
+    def test_loss_duplicates_reorder(self):
+        sequences = [0, 1, 2, 5, 4, 6, 6, 3, 7, 10]
+        streams, _ = analyze(stream(1, sequences, interval=0.0))
+        stats = streams[1]
+
+        self.assertEqual(stats.expected, 11)
+        self.assertEqual(stats.duplicates, 1)
+        self.assertEqual(stats.lost, 2)
+        self.assertEqual(stats.reordered, 2)
+        self.assertEqual(stats.maxReorder, 3)
+
+    def test_wrap(self):
+        streams, _ = analyze(stream(1, range(65530, 65550)))
+
+        self.assertEqual(streams[1].expected, 20)
+        self.assertEqual(streams[1].lost, 0)
+
+    def test_discontinuity_and_payload_type(self):
+        packets = stream(1, range(10))
+        jumped = RTP(
+            ssrc=1, sequenceNumber=10, timestamp=10 * 900 + 900000,
+            payloadType=PayloadType.DYNAMIC_97, payload=bytearray(88))
+        packets.append((0.1, jumped.toBytes()))
+        streams, _ = analyze(packets)
+
+        self.assertEqual(streams[1].discontinuities, 1)
+        self.assertEqual(streams[1].payloadTypeChanges, 1)
+        self.assertEqual(streams[1].payloadTypes, {96: 10, 97: 1})
+
+    def test_jitter(self):
+        stats = StreamStats(1, clockRate=90000)
+        for i in range(1000):
+            stats.add(i * 0.01 + (0.001 * (i % 2)), i, i * 900, 96, 0, 100)
+
+        # Arrivals alternately 1ms late give 1ms transit differences
+        self.assertAlmostEqual(stats.snapshot()['jitter'], 0.001, places=5)
+
+    def test_multiple_ssrcs(self):
+        packets = sorted(stream(1, range(10)) + stream(2, range(20)))
+        packets.append((1.0, bytes(4)))
+        streams, invalid = analyze(packets)
+
+        self.assertEqual(sorted(streams), [1, 2])
+        self.assertEqual(streams[2].packets, 20)
+        self.assertEqual(invalid, 1)
+
+
+class TestMain (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.pcap')
+        with PcapWriter(self.path) as writer:
+            for arrivalTime, datagram in stream(0x1234, range(50)):
+                writer.write(datagram, 1000 + arrivalTime)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_json(self):
+        out = io.StringIO()
+        self.assertEqual(main(['--json', self.path], out), 0)
+        result = json.loads(out.getvalue())
+
+        self.assertEqual(result['invalid'], 0)
+        self.assertEqual(result['skipped'], 0)
+        self.assertEqual(len(result['streams']), 1)
+        self.assertEqual(result['streams'][0]['ssrc'], 0x1234)
+        self.assertEqual(result['streams'][0]['packets'], 50)
+
+    def test_text(self):
+        out = io.StringIO()
+        self.assertEqual(main([self.path, self.path], out), 0)
+
+        self.assertIn("SSRC 0x00001234", out.getvalue())
+        self.assertIn("duplicates: 50", out.getvalue())
@@ -0,0 +1,265 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import struct
+import tempfile
+from unittest import TestCase
+
+from rtp import (
+    RTP, PcapWriter, RtpdumpWriter, PcapReader, RtpdumpReader, openCapture)
+
+
+def writePcap(path, frames, linkType=1, order='<', magic=0xa1b2c3d4):
+    with open(path, 'wb') as f:
+        f.write(struct.pack(order + 'IHHiIII', magic, 2, 4, 0, 0, 65535,
+                            linkType))
+        for seconds, fraction, frame in frames:
+            f.write(struct.pack(
+                order + 'IIII', seconds, fraction, len(frame), len(frame)))
+            f.write(frame)
+
+
+def udp(datagram):
+    return struct.pack('!HHHH', 5004, 5004, 8 + len(datagram), 0) + datagram
+
+
+def ipv4(payload, protocol=17, fragment=0x4000):
+    return struct.pack(
+        '!BBHHHBBH4s4s', 0x45, 0, 20 + len(payload), 0, fragment, 64,
+        protocol, 0, bytes(4), bytes(4)) + payload
+
+
+def ipv6(payload):
+    return struct.pack(
+        '!IHBB16s16s', 6 << 28, len(payload), 17, 64, bytes(16),
+        bytes(16)) + payload
+
+
+class TestPcapWriter (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.pcap')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_write(self):
+        datagram = RTP(payload=bytearray(b'abcd')).toBytes()
+        with PcapWriter(self.path, destination=('10.0.0.1', 6000)) as writer:
+            writer.write(datagram, 1000.25)
+            writer.write(datagram, 1001.5)
+        self.assertEqual(writer.packets, 2)
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        magic, major, minor, _, _, _, linkType = struct.unpack_from(
+            '<IHHiIII', data)
+        self.assertEqual(magic, 0xa1b2c3d4)
+        self.assertEqual((major, minor, linkType), (2, 4, 1))
+
+        seconds, micros, captured, original = struct.unpack_from(
+            '<IIII', data, 24)
+        self.assertEqual((seconds, micros), (1000, 250000))
+        self.assertEqual(captured, 14 + 20 + 8 + len(datagram))
+        self.assertEqual(captured, original)
+
+        frame = data[40:40 + captured]
+        self.assertEqual(frame[12:14], b'\x08\x00')
+        self.assertEqual(frame[14], 0x45)
+        self.assertEqual(frame[23], 17)
+        self.assertEqual(frame[30:34], bytes([10, 0, 0, 1]))
+        self.assertEqual(struct.unpack_from('!H', frame, 36)[0], 6000)
+        self.assertEqual(frame[42:], datagram)
+
+        # A valid IPv4 header checksums to zero
+        total = sum(struct.unpack_from('!10H', frame, 14))
+        while total >> 16:
+            total = (total & 0xffff) + (total >> 16)
+        self.assertEqual(total, 0xffff)
+
+
+class TestRtpdumpWriter (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.rtp')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_write(self):
+        datagram = RTP(payload=bytearray(b'abcd')).toBytes()
+        with RtpdumpWriter(self.path, source=('10.0.0.2', 5006)) as writer:
+            writer.write(datagram, 1000.0)
+            writer.write(datagram, 1000.02)
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        line, _, rest = data.partition(b'\n')
+        self.assertEqual(line, b'#!rtpplay1.0 10.0.0.2/5006')
+        start, _, source, port, _ = struct.unpack_from('!IIIHH', rest)
+        self.assertEqual((start, source, port), (1000, 0x0a000002, 5006))
+
+        offset = 16
+        offsets = []
+        while offset < len(rest):
+            length, packetLength, ms = struct.unpack_from('!HHI', rest, offset)
+            self.assertEqual(length, packetLength + 8)
+            self.assertEqual(
+                rest[offset + 8:offset + length], datagram)
+            offsets.append(ms)
+            offset += length
+
+        self.assertEqual(offsets, [0, 20])
+
+    def test_empty(self):
+        RtpdumpWriter(self.path).close()
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        self.assertTrue(data.startswith(b'#!rtpplay1.0 127.0.0.1/5004\n'))
+        self.assertEqual(len(data), 28 + 16)
+
+
+class TestPcapReader (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.pcap')
+        self.datagrams = [
+            RTP(sequenceNumber=i, payload=bytearray(i)).toBytes()
+            for i in range(5)]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read(self):
+        with openCapture(self.path) as reader:
+            self.assertIsInstance(reader, PcapReader)
+            packets = [(t, bytes(d)) for t, d in reader]
+            skipped = reader.skipped
+        return packets, skipped
+
+    def test_roundtrip(self):
+        with PcapWriter(self.path) as writer:
+            for i, datagram in enumerate(self.datagrams):
+                writer.write(datagram, 100 + (i * 0.5))
+
+        packets, skipped = self.read()
+        self.assertEqual(
+            [d for _, d in packets], self.datagrams)
+        for i, (t, _) in enumerate(packets):
+            self.assertAlmostEqual(t, 100 + (i * 0.5))
+        self.assertEqual(skipped, 0)
+
+    def test_big_endian_nanoseconds(self):
+        ethernet = bytes(12) + b'\x08\x00'
+        writePcap(
+            self.path,
+            [(1, 500000000, ethernet + ipv4(udp(self.datagrams[1])))],
+            order='>', magic=0xa1b23c4d)
+
+        packets, _ = self.read()
+        self.assertEqual(packets, [(1.5, self.datagrams[1])])
+
+    def test_link_types(self):
+        datagram = self.datagrams[2]
+        vlan = bytes(12) + b'\x81\x00\x00\x05\x08\x00'
+        cases = [
+            (1, vlan + ipv4(udp(datagram))),
+            (1, bytes(12) + b'\x86\xdd' + ipv6(udp(datagram))),
+            (101, ipv4(udp(datagram))),
+            (113, bytes(14) + b'\x08\x00' + ipv4(udp(datagram))),
+            (0, struct.pack('=I', 2) + ipv4(udp(datagram)))]
+
+        for linkType, frame in cases:
+            writePcap(self.path, [(0, 0, frame)], linkType)
+            packets, _ = self.read()
+            self.assertEqual(packets, [(0, datagram)])
+
+    def test_skipped(self):
+        ethernet = bytes(12) + b'\x08\x00'
+        writePcap(self.path, [
+            (0, 0, ethernet + ipv4(bytes(20), protocol=6)),
+            (0, 0, ethernet + ipv4(udp(self.datagrams[0]), fragment=0x2000)),
+            (0, 0, bytes(12) + b'\x08\x06' + bytes(28)),
+            (0, 0, ethernet + ipv4(udp(self.datagrams[3])))])
+
+        packets, skipped = self.read()
+        self.assertEqual(packets, [(0, self.datagrams[3])])
+        self.assertEqual(skipped, 3)
+
+    def test_bad_udp_length(self):
+        ethernet = bytes(12) + b'\x08\x00'
+        datagram = self.datagrams[4]
+        header = struct.pack('!HHHH', 5004, 5004, 4, 0)
+        long = struct.pack('!HHHH', 5004, 5004, 100 + len(datagram), 0)
+        writePcap(self.path, [
+            (0, 0, ethernet + ipv4(header + datagram)),
+            (0, 0, ethernet + ipv4(long + datagram)),
+            (0, 0, ethernet + ipv4(udp(datagram)))])
+
+        packets, skipped = self.read()
+        self.assertEqual(packets, [(0, datagram)])
+        self.assertEqual(skipped, 2)
+
+    def test_not_pcap(self):
+        with open(self.path, 'wb') as f:
+            f.write(bytes(100))
+        with self.assertRaises(ValueError):
+            PcapReader(self.path)
+
+        open(self.path, 'wb').close()
+        with self.assertRaises(ValueError):
+            PcapReader(self.path)
+
+
+class TestRtpdumpReader (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.rtp')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_roundtrip(self):
+        datagrams = [
+            RTP(sequenceNumber=i, payload=bytearray(i)).toBytes()
+            for i in range(5)]
+        with RtpdumpWriter(self.path, source=('10.0.0.2', 5006)) as writer:
+            for i, datagram in enumerate(datagrams):
+                writer.write(datagram, 100 + (i * 0.25))
+        with open(self.path, 'ab') as f:
+            # An RTCP record
+            f.write(struct.pack('!HHI', 16, 0, 2000) + bytes(8))
+
+        with openCapture(self.path) as reader:
+            self.assertIsInstance(reader, RtpdumpReader)
+            packets = [(t, bytes(d)) for t, d in reader]
+            self.assertEqual(reader.source, ('10.0.0.2', 5006))
+            self.assertEqual(reader.skipped, 1)
+
+        self.assertEqual([d for _, d in packets], datagrams)
+        for i, (t, _) in enumerate(packets):
+            self.assertAlmostEqual(t, 100 + (i * 0.25))
+
+    def test_not_rtpdump(self):
+        with open(self.path, 'wb') as f:
+            f.write(bytes(100))
+        with self.assertRaises(ValueError):
+            RtpdumpReader(self.path)
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, DriftEstimator, DriftTracker, estimateDrift
+
+
+def samples(start, drift, count, clockRate=90000, interval=0.02):
+    rate = clockRate * (1 + (drift / 1e6))
+    for i in range(count):
+        arrival = 1.6e9 + (i * interval)
+        yield (start + round(rate * i * interval)) % 2**32, arrival
+
+
+class TestDriftEstimator (TestCase):
+    def test_nominal(self):
+        estimator = DriftEstimator(90000)
+        self.assertEqual(estimator.rate, 90000)
+        self.assertEqual(estimator.drift, 0)
+
+    def test_invalid_forgetting(self):
+        with self.assertRaises(ValueError):
+            DriftEstimator(90000, forgetting=0)
+        with self.assertRaises(ValueError):
+            DriftEstimator(90000, forgetting=1.5)
+
+    @given(st.integers(min_value=0, max_value=(2**32)-1),
+           st.floats(min_value=-200, max_value=200))
+    def test_drift(self, start, drift):
+        estimator = DriftEstimator(90000)
+        for timestamp, arrival in samples(start, drift, 500):
+            estimator.update(timestamp, arrival)
+
+        self.assertEqual(estimator.samples, 500)
+        self.assertAlmostEqual(estimator.drift, drift, delta=1)
+        self.assertLess(estimator.jitter, 1e-4)
+
+    def test_wrap(self):
+        estimator = DriftEstimator(90000)
+        for timestamp, arrival in samples(2**32 - 10000, 50, 200):
+            estimator.update(timestamp, arrival)
+
+        self.assertAlmostEqual(estimator.drift, 50, delta=1)
+
+    def test_tracks_change(self):
+        estimator = DriftEstimator(90000, forgetting=0.98)
+        for timestamp, arrival in samples(0, 0, 500):
+            estimator.update(timestamp, arrival)
+        start = timestamp
+        for timestamp, arrival in samples(start, 100, 1000):
+            estimator.update(timestamp, arrival + 10)
+
+        self.assertAlmostEqual(estimator.drift, 100, delta=5)
+
+    def test_jitter(self):
+        estimator = DriftEstimator(90000)
+        for i, (timestamp, arrival) in enumerate(samples(0, 0, 1000)):
+            estimator.update(timestamp, arrival + (0.001 * (i % 2)))
+
+        self.assertAlmostEqual(estimator.jitter, 0.0005, delta=0.0001)
+        self.assertAlmostEqual(estimator.drift, 0, delta=1)
+
+    def test_predict(self):
+        estimator = DriftEstimator(90000)
+        for timestamp, arrival in samples(1000, 0, 100):
+            estimator.update(timestamp, arrival)
+
+        self.assertAlmostEqual(
+            estimator.predictTimestamp(1.6e9 + 1), 1000 + 90000, delta=1)
+        self.assertAlmostEqual(
+            estimator.predictArrival(1000 + 90000), 1.6e9 + 1, delta=1e-4)
+
+        estimate = estimator.estimate()
+        self.assertAlmostEqual(
+            estimate.intercept + (estimate.rate * (1.6e9 + 1)),
+            estimator.predictTimestamp(1.6e9 + 1), delta=100)
+
+
+class TestDriftTracker (TestCase):
+    def test_per_ssrc(self):
+        tracker = DriftTracker(90000)
+        for timestamp, arrival in samples(0, 100, 200):
+            tracker.update(1, timestamp, arrival)
+        for timestamp, arrival in samples(0, -100, 200):
+            tracker.update(2, timestamp, arrival)
+
+        self.assertAlmostEqual(tracker[1].drift, 100, delta=1)
+        self.assertAlmostEqual(tracker[2].drift, -100, delta=1)
+
+    def test_datagram(self):
+        tracker = DriftTracker(90000)
+        packet = RTP(ssrc=1234)
+        for timestamp, arrival in samples(0, 20, 200):
+            packet.timestamp = timestamp
+            tracker.updateDatagram(packet.toBytes(), arrival)
+
+        self.assertEqual(list(tracker.estimators), [1234])
+        self.assertAlmostEqual(tracker[1234].drift, 20, delta=1)
+
+
+class TestEstimateDrift (TestCase):
+    def test_batch(self):
+        timestamps, arrivals = zip(*samples(2**32 - 5000, -30, 1000))
+        estimate = estimateDrift(timestamps, arrivals, 90000)
+
+        self.assertAlmostEqual(estimate.drift, -30, delta=1)
+        self.assertAlmostEqual(estimate.rate, 90000 * (1 - 30e-6), delta=0.1)
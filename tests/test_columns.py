@@ -0,0 +1,89 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, PayloadType, PacketColumns, decodeColumns
+
+
+class TestPacketColumns (TestCase):
+    @given(st.lists(st.tuples(
+        st.floats(allow_nan=False, allow_infinity=False),
+        st.integers(min_value=0, max_value=(2**16)-1),
+        st.integers(min_value=0, max_value=(2**32)-1),
+        st.integers(min_value=0, max_value=(2**32)-1),
+        st.sampled_from(PayloadType),
+        st.booleans(),
+        st.binary(max_size=100))))
+    def test_extend(self, values):
+        columns = PacketColumns()
+        columns.extend(
+            (arrivalTime, RTP(
+                sequenceNumber=sequenceNumber, timestamp=timestamp,
+                ssrc=ssrc, payloadType=payloadType, marker=marker,
+                payload=bytearray(payload)).toBytes())
+            for (arrivalTime, sequenceNumber, timestamp, ssrc, payloadType,
+                 marker, payload) in values)
+
+        self.assertEqual(len(columns), len(values))
+        self.assertEqual(columns.invalid, 0)
+        self.assertEqual(list(columns.arrivalTime), [v[0] for v in values])
+        self.assertEqual(list(columns.sequenceNumber), [v[1] for v in values])
+        self.assertEqual(list(columns.timestamp), [v[2] for v in values])
+        self.assertEqual(list(columns.ssrc), [v[3] for v in values])
+        self.assertEqual(
+            list(columns.payloadType), [v[4].value for v in values])
+        self.assertEqual(list(columns.marker), [int(v[5]) for v in values])
+        self.assertEqual(
+            list(columns.length), [12 + len(v[6]) for v in values])
+
+    def test_invalid(self):
+        columns = PacketColumns()
+        columns.append(bytes(11))
+        columns.append(bytes(12))
+        columns.append(RTP().toBytes(), 1.5)
+
+        self.assertEqual(len(columns), 1)
+        self.assertEqual(columns.invalid, 2)
+        self.assertEqual(list(columns.arrivalTime), [1.5])
+
+    def test_clear(self):
+        columns = PacketColumns()
+        columns.append(RTP().toBytes())
+        columns.append(bytes(2))
+        columns.clear()
+
+        self.assertEqual(len(columns), 0)
+        self.assertEqual(columns.invalid, 0)
+        self.assertEqual(len(columns.arrivalTime), 0)
+
+
+class TestDecodeColumns (TestCase):
+    def test_batches(self):
+        packets = [(float(i), RTP(sequenceNumber=i).toBytes())
+                   for i in range(10)]
+        sequences = []
+        lengths = []
+        for columns in decodeColumns(packets, batchSize=4):
+            lengths.append(len(columns))
+            sequences.extend(columns.sequenceNumber)
+
+        self.assertEqual(lengths, [4, 4, 2])
+        self.assertEqual(sequences, list(range(10)))
+
+    def test_empty(self):
+        self.assertEqual(list(decodeColumns([])), [])
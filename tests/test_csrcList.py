@@ -14,6 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from copy import deepcopy
 from unittest import TestCase
 from hypothesis import given, strategies as st  # type: ignore
 
@@ -120,3 +121,120 @@ class TestCSRCList (TestCase):
     def test_csrcIsValid_tooSmall(self, value):
         with self.assertRaises(ValueError):
             self.thisCSRCList._csrcIsValid(value)
+
+    def test_csrc_extend_generator(self):
+        self.thisCSRCList.extend(x for x in range(5))
+        self.assertEqual(self.thisCSRCList, [0, 1, 2, 3, 4])
+
+    def test_csrc_extend_invalid(self):
+        with self.assertRaises(AttributeError):
+            self.thisCSRCList.extend([1, True])
+
+        with self.assertRaises(ValueError):
+            self.thisCSRCList.extend([1, 2**32])
+
+        self.assertEqual(self.thisCSRCList, [])
+
+    def test_csrc_setitem(self):
+        newCSRCList = CSRCList([0, 1, 2])
+        newCSRCList[1] = 5
+        self.assertEqual(newCSRCList, [0, 5, 2])
+
+        with self.assertRaises(ValueError):
+            newCSRCList[1] = -1
+
+        newCSRCList[1:2] = [6, 7]
+        self.assertEqual(newCSRCList, [0, 6, 7, 2])
+
+        with self.assertRaises(LengthError):
+            newCSRCList[0:1] = [0] * 13
+
+    @given(st.lists(st.integers(
+        min_value=0, max_value=(2**32)-1), max_size=7),
+        st.lists(st.integers(min_value=0, max_value=(2**32)-1), max_size=8))
+    def test_csrc_radd(self, a, b):
+        added = a + CSRCList(b)
+        self.assertIsInstance(added, CSRCList)
+        self.assertEqual(added, a + b)
+
+    def test_csrc_radd_invalid(self):
+        with self.assertRaises(LengthError):
+            [0] * 15 + CSRCList([1])
+        with self.assertRaises(ValueError):
+            [-1] + CSRCList([1])
+
+    @given(st.lists(st.integers(
+        min_value=0, max_value=(2**32)-1), max_size=5),
+        st.integers(min_value=0, max_value=3))
+    def test_csrc_mul(self, value, n):
+        newCSRCList = CSRCList(value)
+        self.assertIsInstance(newCSRCList * n, CSRCList)
+        self.assertEqual(newCSRCList * n, value * n)
+        self.assertEqual(n * newCSRCList, value * n)
+
+        newCSRCList *= n
+        self.assertEqual(newCSRCList, value * n)
+
+    def test_csrc_mul_invalid(self):
+        newCSRCList = CSRCList([1, 2, 3, 4])
+        with self.assertRaises(LengthError):
+            newCSRCList * 4
+        with self.assertRaises(LengthError):
+            newCSRCList *= 4
+        self.assertEqual(newCSRCList, [1, 2, 3, 4])
+
+    @given(st.lists(st.integers(
+        min_value=0, max_value=(2**32)-1), max_size=15),
+        st.lists(st.integers(min_value=0, max_value=(2**32)-1), max_size=15))
+    def test_csrc_ordering(self, a, b):
+        self.assertEqual(CSRCList(a) < CSRCList(b), a < b)
+        self.assertEqual(CSRCList(a) <= b, a <= b)
+        self.assertEqual(CSRCList(a) > CSRCList(b), a > b)
+        self.assertEqual(CSRCList(a) >= b, a >= b)
+        self.assertEqual(sorted([CSRCList(b), CSRCList(a)]), sorted([a, b]))
+
+    def test_csrc_sort_key(self):
+        newCSRCList = CSRCList([3, 10, 2])
+        newCSRCList.sort(key=lambda x: -x)
+        self.assertEqual(newCSRCList, [10, 3, 2])
+        newCSRCList.sort(key=lambda x: x % 5, reverse=True)
+        self.assertEqual(newCSRCList, [3, 2, 10])
+
+    def test_csrc_slice(self):
+        newCSRCList = CSRCList([0, 1, 2, 3])
+        self.assertIsInstance(newCSRCList[1:3], CSRCList)
+        self.assertEqual(newCSRCList[1:3], [1, 2])
+        del newCSRCList[0]
+        self.assertEqual(newCSRCList, [1, 2, 3])
+
+    def test_csrc_sort_clear_copy(self):
+        newCSRCList = CSRCList([3, 1, 2])
+        newCSRCList.sort()
+        self.assertEqual(newCSRCList, [1, 2, 3])
+
+        copied = newCSRCList.copy()
+        deepCopied = deepcopy(newCSRCList)
+        newCSRCList.clear()
+        self.assertEqual(newCSRCList, [])
+        self.assertEqual(copied, [1, 2, 3])
+        self.assertEqual(deepCopied, [1, 2, 3])
+
+    @given(st.lists(st.integers(
+        min_value=0, max_value=(2**32)-1), max_size=15))
+    def test_csrc_pack_unpack(self, value):
+        buffer = bytearray(12 + (4 * len(value)))
+        CSRCList(value).packInto(buffer)
+
+        expected = b''.join(x.to_bytes(4, byteorder='big') for x in value)
+        self.assertEqual(buffer[12:], expected)
+
+        self.thisCSRCList.extend([1, 2, 3])
+        self.thisCSRCList.unpackFrom(buffer, len(value))
+        self.assertEqual(self.thisCSRCList, value)
+
+    def test_csrc_unpack_invalid(self):
+        with self.assertRaises(LengthError):
+            self.thisCSRCList.unpackFrom(bytes(100), 16)
+
+        with self.assertRaises(LengthError):
+            self.thisCSRCList.unpackFrom(bytes(15), 1)
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, Extension, DecodeStatus, DecodeCounters, checkPacket, tryDecode,
+    decodeBatch)
+
+
+class TestDecoder (TestCase):
+    def setUp(self):
+        self.thisCounters = DecodeCounters()
+
+    def setup_example(self):
+        self.setUp()
+
+    def test_checkPacket_ok(self):
+        packet = RTP(
+            csrcList=[1, 2],
+            extension=Extension(headerExtension=bytearray(8)),
+            payload=bytearray(b'payload')).toBytearray()
+        self.assertEqual(checkPacket(packet), DecodeStatus.OK)
+
+    @given(st.binary(max_size=11))
+    def test_checkPacket_tooShort(self, value):
+        self.assertEqual(checkPacket(value), DecodeStatus.TOO_SHORT)
+
+    @given(st.integers(min_value=0, max_value=3).filter(lambda x: x != 2))
+    def test_checkPacket_badVersion(self, value):
+        packet = RTP().toBytearray()
+        packet[0] = (packet[0] & 0x3f) | (value << 6)
+        self.assertEqual(checkPacket(packet), DecodeStatus.BAD_VERSION)
+
+    def test_checkPacket_truncatedCSRC(self):
+        packet = RTP(csrcList=[1, 2, 3]).toBytearray()
+        self.assertEqual(
+            checkPacket(packet[:-1]), DecodeStatus.TRUNCATED_CSRC)
+
+    def test_checkPacket_truncatedExtension(self):
+        packet = RTP(
+            extension=Extension(headerExtension=bytearray(8))).toBytearray()
+        self.assertEqual(
+            checkPacket(packet[:14]), DecodeStatus.TRUNCATED_EXTENSION)
+        self.assertEqual(
+            checkPacket(packet[:-1]), DecodeStatus.TRUNCATED_EXTENSION)
+
+    @given(st.binary())
+    def test_checkPacket_fromBytearray(self, value):
+        # Whatever checkPacket passes, fromBytearray must decode
+        if checkPacket(value) == DecodeStatus.OK:
+            RTP().fromBytearray(bytearray(value))
+
+    def test_tryDecode(self):
+        expected = RTP(payload=bytearray(b'payload'))
+        status, decoded = tryDecode(expected.toBytearray(), self.thisCounters)
+        self.assertEqual(status, DecodeStatus.OK)
+        self.assertEqual(decoded, expected)
+
+        status, decoded = tryDecode(bytearray(4), self.thisCounters)
+        self.assertEqual(status, DecodeStatus.TOO_SHORT)
+        self.assertIsNone(decoded)
+
+        self.assertEqual(self.thisCounters[DecodeStatus.OK], 1)
+        self.assertEqual(self.thisCounters[DecodeStatus.TOO_SHORT], 1)
+        self.assertEqual(self.thisCounters.total, 2)
+        self.assertEqual(self.thisCounters.errors, 1)
+
+    def test_tryDecode_into(self):
+        into = RTP()
+        expected = RTP(payload=bytearray(b'payload'))
+        status, decoded = tryDecode(expected.toBytearray(), into=into)
+        self.assertIs(decoded, into)
+        self.assertEqual(decoded, expected)
+
+    def test_decodeBatch(self):
+        good = [RTP(sequenceNumber=x) for x in range(5)]
+        packets = [p.toBytearray() for p in good]
+        packets.insert(2, bytearray(3))
+        packets.insert(4, bytearray(12))
+
+        decoded = decodeBatch(packets, self.thisCounters)
+        self.assertEqual(decoded, good)
+        self.assertEqual(self.thisCounters.snapshot(), {
+            'OK': 5,
+            'TOO_SHORT': 1,
+            'BAD_VERSION': 1,
+            'TRUNCATED_CSRC': 0,
+            'TRUNCATED_EXTENSION': 0})
+
+        self.thisCounters.reset()
+        self.assertEqual(self.thisCounters.total, 0)
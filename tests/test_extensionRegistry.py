@@ -0,0 +1,215 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+from copy import copy, deepcopy
+from unittest import TestCase
+from hypothesis import given, strategies as st
+
+from rtp import (
+    RTP, AudioLevel, Extension, ExtensionCodec, ExtensionRegistry,
+    LengthError, VideoOrientation)
+from rtp.extension import parseElements
+
+elementData = st.dictionaries(
+    st.integers(min_value=1, max_value=255),
+    st.binary(min_size=1, max_size=255), max_size=8)
+
+
+class TestElements (TestCase):
+    def test_one_byte(self):
+        # ID 1 of 1 byte, padding, ID 2 of 3 bytes
+        ext = Extension(
+            bytearray(b'\xbe\xde'),
+            bytearray(b'\x10\xaa\x00\x22\x01\x02\x03\x00'))
+
+        self.assertEqual(
+            {i: bytes(d) for i, d in ext.elements().items()},
+            {1: b'\xaa', 2: b'\x01\x02\x03'})
+
+    def test_two_byte(self):
+        # ID 1 empty, padding, ID 32 of 2 bytes
+        ext = Extension(
+            bytearray(b'\x10\x00'),
+            bytearray(b'\x01\x00\x00\x20\x02\xab\xcd\x00'))
+
+        self.assertEqual(
+            {i: bytes(d) for i, d in ext.elements().items()},
+            {1: b'', 32: b'\xab\xcd'})
+
+    def test_other_profile(self):
+        self.assertEqual(Extension(headerExtension=bytearray(4)).elements(),
+                         {})
+
+    def test_truncated(self):
+        with self.assertRaises(LengthError):
+            parseElements(b'\xbe\xde', b'\x13\x00\x00\x00')
+
+    @given(elementData)
+    def test_fromElements(self, elements):
+        ext = Extension.fromElements(elements)
+
+        self.assertEqual(len(ext.headerExtension) % 4, 0)
+        self.assertEqual(
+            {i: bytes(d) for i, d in ext.elements().items()}, elements)
+        if all((i <= 14) and (len(d) <= 16) for i, d in elements.items()):
+            self.assertEqual(ext.startBits, b'\xbe\xde')
+
+    def test_cache(self):
+        ext = Extension.fromElements({1: b'\x01'})
+        elements = ext.elements()
+
+        self.assertIs(ext.elements(), elements)
+        ext.fromBytearray(
+            Extension.fromElements({1: b'\x02'}).toBytearray(),
+            reuseBuffers=True)
+        self.assertEqual(bytes(ext.elements()[1]), b'\x02')
+
+    def test_fromElements_invalid(self):
+        with self.assertRaises(ValueError):
+            Extension.fromElements({0: b'\x01'})
+        with self.assertRaises(ValueError):
+            Extension.fromElements({256: b'\x01'})
+        with self.assertRaises(LengthError):
+            Extension.fromElements({1: bytes(256)})
+
+
+class TestExtensionRegistry (TestCase):
+    def setUp(self):
+        self.registry = ExtensionRegistry({
+            1: 'abs-send-time',
+            2: 'http://www.ietf.org/id/'
+               'draft-holmer-rmcat-transport-wide-cc-extensions-01',
+            3: 'urn:ietf:params:rtp-hdrext:ssrc-audio-level',
+            4: 'video-orientation',
+            5: 'ptp-timestamp'})
+        self.values = {
+            'abs-send-time': 0x123456,
+            'transport-cc': 54321,
+            'audio-level': AudioLevel(True, 42),
+            'video-orientation': VideoOrientation(False, True, 270),
+            'ptp-timestamp': 1600000000123456789}
+
+    def test_round_trip(self):
+        packet = RTP(extension=self.registry.encode(self.values))
+
+        self.assertEqual(self.registry.decode(packet), self.values)
+        for name, value in self.values.items():
+            self.assertEqual(self.registry.get(packet, name), value)
+        self.assertEqual(self.registry.get(packet, 2), 54321)
+
+    def test_encoded_packet(self):
+        packet = RTP(extension=self.registry.encode(self.values))
+        decoded = RTP().fromBytes(packet.toBytes())
+
+        self.assertEqual(self.registry.decode(decoded), self.values)
+
+    def test_missing(self):
+        packet = RTP(extension=self.registry.encode({'audio-level': (
+            AudioLevel(False, 10))}))
+
+        self.assertIsNone(self.registry.get(packet, 'transport-cc'))
+        self.assertIsNone(self.registry.get(RTP(), 'transport-cc'))
+        self.assertEqual(self.registry.decode(RTP()), {})
+
+    def test_cached(self):
+        packet = RTP(extension=self.registry.encode(self.values))
+        first = self.registry.get(packet, 'audio-level')
+
+        self.assertIs(self.registry.get(packet, 'audio-level'), first)
+
+        packet.extension.headerExtension[:] = self.registry.encode(
+            dict(self.values, **{'audio-level': AudioLevel(False, 1)})
+            ).headerExtension
+        self.assertEqual(self.registry.get(packet, 'audio-level'),
+                         AudioLevel(False, 1))
+
+    def test_column(self):
+        packets = [
+            RTP(extension=self.registry.encode({'transport-cc': n}))
+            for n in range(5)]
+        packets.insert(2, RTP())
+        packets.append(RTP(extension=Extension(
+            bytearray(b'\xbe\xde'), bytearray(b'\x20\x01\x00\x00'))))
+
+        column = self.registry.column(packets, 'transport-cc')
+        self.assertEqual(list(column), [0, 1, -1, 2, 3, 4, -1])
+
+        levels = self.registry.column(
+            [RTP(extension=self.registry.encode(self.values))],
+            'audio-level')
+        self.assertEqual(list(levels), [42])
+
+    def test_malformed(self):
+        # transport-cc needs 2 bytes, but has 1
+        short = RTP(extension=Extension(
+            bytearray(b'\xbe\xde'),
+            bytearray(b'\x20\x01\x12\x00\x00\x05\x00\x00')))
+        # The audio-level element claims more bytes than there are
+        truncated = RTP(extension=Extension(
+            bytearray(b'\xbe\xde'), bytearray(b'\x30\x05\x13\x00')))
+
+        self.assertIsNone(self.registry.get(short, 'transport-cc'))
+        self.assertIsNone(self.registry.get(truncated, 'abs-send-time'))
+        self.assertIsNone(self.registry.get(truncated, 'audio-level'))
+        self.assertEqual(self.registry.decode(short), {
+            'abs-send-time': 5})
+        self.assertEqual(self.registry.decode(truncated), {})
+        self.assertEqual(
+            list(self.registry.column([short, truncated], 'transport-cc')),
+            [-1, -1])
+
+    def test_copy(self):
+        packet = RTP(extension=self.registry.encode(self.values))
+        self.assertEqual(self.registry.decode(packet), self.values)
+        self.registry.get(packet, 'transport-cc')
+
+        for copied in (copy(packet.extension), deepcopy(packet),
+                       pickle.loads(pickle.dumps(packet))):
+            if isinstance(copied, RTP):
+                self.assertEqual(copied, packet)
+                self.assertEqual(self.registry.decode(copied), self.values)
+            else:
+                self.assertEqual(copied, packet.extension)
+                self.assertEqual(
+                    self.registry.get(RTP(extension=copied), 'transport-cc'),
+                    54321)
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            ExtensionCodec()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.registry.register(0, 'abs-send-time')
+        with self.assertRaises(ValueError):
+            self.registry.register(6, 'urn:unknown')
+        with self.assertRaises(ValueError):
+            self.registry.get(RTP(), 'unregistered')
+        with self.assertRaises(ValueError):
+            self.registry.get(RTP(), 200)
+        with self.assertRaises(ValueError):
+            self.registry.encode({200: 5})
+        with self.assertRaises(ValueError):
+            self.registry.column([RTP()], 200)
+
+    def test_reregister(self):
+        self.registry.register(9, 'abs-send-time')
+        self.registry.unregister(1)
+
+        packet = RTP(extension=self.registry.encode({'abs-send-time': 7}))
+        self.assertEqual(list(packet.extension.elements()), [9])
+        self.assertEqual(self.registry.get(packet, 'abs-send-time'), 7)
@@ -0,0 +1,172 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st
+
+from rtp import RTP, FrameAssembler
+
+
+def makeFrames(count, packetsPerFrame, firstSequenceNumber=0, marker=True):
+    packets = []
+    sequenceNumber = firstSequenceNumber
+    for frame in range(count):
+        for x in range(packetsPerFrame):
+            packets.append(RTP(
+                ssrc=1, sequenceNumber=sequenceNumber & 0xffff,
+                timestamp=frame * 3000,
+                marker=marker and (x == packetsPerFrame - 1),
+                payload=bytearray([frame, x])))
+            sequenceNumber += 1
+    return packets
+
+
+def payloadBytes(frame):
+    return [bytes(p) for p in frame.payloads]
+
+
+class TestFrameAssembler (TestCase):
+    def setUp(self):
+        self.assembler = FrameAssembler()
+
+    def addAll(self, packets, now=0.0):
+        frames = []
+        for packet in packets:
+            frames.extend(self.assembler.add(packet, now))
+        return frames
+
+    def test_marker(self):
+        frames = self.addAll(makeFrames(3, 4))
+
+        self.assertEqual(len(frames), 3)
+        for n, frame in enumerate(frames):
+            self.assertEqual(frame.timestamp, n * 3000)
+            self.assertEqual(payloadBytes(frame),
+                             [bytes([n, x]) for x in range(4)])
+            self.assertTrue(frame.complete)
+            self.assertEqual(frame.missing, 0)
+        self.assertEqual(len(self.assembler), 0)
+
+    def test_zero_copy(self):
+        packets = makeFrames(1, 2)
+        frame, = self.addAll(packets)
+
+        packets[0].payload[0] = 0xff
+        self.assertEqual(frame.payloads[0][0], 0xff)
+
+    def test_timestamp_change(self):
+        frames = self.addAll(makeFrames(3, 2, marker=False))
+
+        self.assertEqual([f.timestamp for f in frames], [0, 3000])
+        self.assertTrue(all(f.complete for f in frames))
+
+        last, = self.assembler.flush()
+        self.assertEqual(last.timestamp, 6000)
+        self.assertFalse(last.complete)
+
+    @given(st.integers(min_value=0, max_value=2**16 - 1), st.randoms())
+    def test_reordered(self, firstSequenceNumber, rng):
+        self.setUp()
+        packets = makeFrames(4, 5, firstSequenceNumber)
+        # Shuffle within each frame, across the sequence number wrap. The
+        # first packet received is taken as the start of the stream.
+        for start in range(0, 20, 5):
+            chunk = packets[start + (start == 0):start + 5]
+            rng.shuffle(chunk)
+            packets[start + (start == 0):start + 5] = chunk
+
+        frames = self.addAll(packets)
+
+        self.assertEqual(len(frames), 4)
+        for n, frame in enumerate(frames):
+            self.assertTrue(frame.complete)
+            self.assertEqual(payloadBytes(frame),
+                             [bytes([n, x]) for x in range(5)])
+            self.assertEqual(
+                frame.firstSequenceNumber,
+                (firstSequenceNumber + (5 * n)) & 0xffff)
+
+    def test_loss_timeout(self):
+        packets = makeFrames(2, 4)
+        del packets[1]
+
+        self.assertEqual(self.addAll(packets[:3], now=0.0), [])
+        frames = self.assembler.expire(now=0.2)
+        self.assertEqual(len(frames), 1)
+        self.assertFalse(frames[0].complete)
+        self.assertEqual(frames[0].missing, 1)
+        self.assertEqual(len(frames[0].payloads), 3)
+
+        frames = self.addAll(packets[3:], now=0.2)
+        self.assertEqual(len(frames), 1)
+        self.assertTrue(frames[0].complete)
+        self.assertEqual(self.assembler.incompleteFrames, 1)
+        self.assertEqual(self.assembler.completeFrames, 1)
+
+    def test_lost_marker(self):
+        packets = makeFrames(2, 3)
+        del packets[2]
+
+        frames = self.addAll(packets)
+        self.assertEqual(frames, [])
+        self.assertEqual(len(self.assembler), 2)
+
+        frames = self.assembler.expire(now=1.0)
+        self.assertEqual([f.missing for f in frames], [1, 0])
+        self.assertEqual([f.complete for f in frames], [False, True])
+
+    def test_max_frames(self):
+        self.assembler = FrameAssembler(maxFrames=2, timeout=10)
+        packets = makeFrames(4, 2)
+        del packets[2]
+
+        frames = self.addAll(packets)
+
+        self.assertEqual([f.timestamp for f in frames], [0, 3000, 6000, 9000])
+        self.assertEqual([f.complete for f in frames],
+                         [True, False, True, True])
+
+    def test_late(self):
+        packets = makeFrames(2, 2)
+        late = packets.pop(0)
+        self.addAll(packets[:1])
+        self.assembler.expire(now=1.0)
+
+        self.assertEqual(self.assembler.add(late, 1.0), [])
+        self.assertEqual(self.assembler.late, 1)
+
+    def test_datagram(self):
+        packets = makeFrames(2, 3)
+        packets[1].padding = True
+        packets[1].payload += bytearray([0, 0, 3])
+        packets[1:3] = packets[2:0:-1]
+
+        frames = []
+        for packet in packets:
+            frames.extend(self.assembler.addDatagram(packet.toBytes(), 0.0))
+        self.assembler.addDatagram(b'\x00' * 4, 0.0)
+
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(payloadBytes(frames[0]),
+                         [bytes([0, x]) for x in range(3)])
+        self.assertEqual(self.assembler.invalid, 1)
+
+    def test_padding(self):
+        packet = RTP(
+            marker=True, padding=True, payload=bytearray(b'ab\x00\x02'))
+        frame, = self.assembler.add(packet)
+
+        self.assertEqual(payloadBytes(frame), [b'ab'])
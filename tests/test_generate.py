@@ -0,0 +1,125 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import socket
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from rtp import RTP, PayloadType
+from rtp.tools.generate import SyntheticStream, generate, main
+
+
+class TestSyntheticStream (TestCase):
+    def test_next(self):
+        stream = SyntheticStream(
+            1234, PayloadType.DYNAMIC_97, 100, 50, 90000, markerEvery=3)
+        first = stream.packet.sequenceNumber
+        packets = [RTP().fromBytearray(stream.next()) for _ in range(6)]
+
+        self.assertEqual(
+            [p.marker for p in packets],
+            [False, False, True, False, False, True])
+        self.assertEqual(
+            [p.sequenceNumber for p in packets],
+            [(first + i) & 0xffff for i in range(6)])
+        self.assertEqual(
+            [p.timestamp - packets[0].timestamp for p in packets],
+            [i * 1800 for i in range(6)])
+        for p in packets:
+            self.assertEqual(p.ssrc, 1234)
+            self.assertEqual(p.payloadType, PayloadType.DYNAMIC_97)
+            self.assertEqual(len(p.payload), 100)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SyntheticStream(1, PayloadType.DYNAMIC_96, 10, 0)
+        with self.assertRaises(ValueError):
+            SyntheticStream(1, PayloadType.DYNAMIC_96, 10, 1, markerEvery=0)
+
+
+class TestGenerate (TestCase):
+    def test_interleave(self):
+        streams = [
+            SyntheticStream(1, PayloadType.DYNAMIC_96, 10, 100),
+            SyntheticStream(2, PayloadType.DYNAMIC_96, 10, 200)]
+        sent = []
+        result = generate(
+            streams, lambda d, t: sent.append((t, RTP().fromBytearray(d))),
+            duration=0.1, realtime=False)
+
+        self.assertEqual(result['packets'], 30)
+        self.assertEqual(result['bytes'], 30 * 22)
+        self.assertEqual(
+            sum(1 for _, p in sent if p.ssrc == 2), 20)
+        times = [t for t, _ in sent]
+        self.assertEqual(times, sorted(times))
+
+    def test_needs_limit(self):
+        with self.assertRaises(ValueError):
+            generate([], lambda d, t: None)
+
+
+class TestMain (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_main(self, argv):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main(argv), 0)
+        return out.getvalue()
+
+    def test_pcap(self):
+        path = os.path.join(self.dir.name, 'out.pcap')
+        out = self.run_main([
+            '-n', '4', '--ssrc', '0x100', '--size', '100,200',
+            '--count', '40', '--pcap', path])
+
+        self.assertIn("40 packets", out)
+        # Header, then 40 records of pcap, Ethernet, IP and UDP headers
+        self.assertEqual(
+            os.path.getsize(path),
+            24 + (40 * (16 + 42 + 12)) + (20 * 100) + (20 * 200))
+
+    def test_rtpdump(self):
+        path = os.path.join(self.dir.name, 'out.rtp')
+        out = self.run_main([
+            '--rate', '100', '--duration', '1', '--rtpdump', path])
+
+        self.assertIn("100 packets", out)
+
+    def test_udp(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+        port = receiver.getsockname()[1]
+
+        try:
+            self.run_main([
+                '--count', '5', '--size', '10', '--rate', '1000',
+                '--dest', '127.0.0.1:{}'.format(port)])
+            packets = [
+                RTP().fromBytes(receiver.recv(2048)) for _ in range(5)]
+        finally:
+            receiver.close()
+
+        self.assertEqual(len({p.ssrc for p in packets}), 1)
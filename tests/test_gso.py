@@ -0,0 +1,152 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import socket
+from unittest import TestCase
+
+from rtp import RTP, Extension, GSOSender, encodeBatch
+
+
+def makePackets(sizes):
+    return [RTP(ssrc=1, sequenceNumber=x, payload=bytearray([x]) * size)
+            for x, size in enumerate(sizes)]
+
+
+class TestEncodeBatch (TestCase):
+    def test_encodeBatch(self):
+        packets = makePackets([10, 20])
+        buffer, lengths = encodeBatch(packets)
+
+        self.assertEqual(lengths, [22, 32])
+        self.assertEqual(
+            bytes(buffer), packets[0].toBytes() + packets[1].toBytes())
+
+    def test_reuse(self):
+        into = bytearray(b'stale')
+        buffer, lengths = encodeBatch(makePackets([4]), into)
+
+        self.assertIs(buffer, into)
+        self.assertEqual(len(buffer), 16)
+
+        buffer, lengths = encodeBatch(makePackets([1]), into)
+        self.assertIs(buffer, into)
+        self.assertEqual(len(buffer), 13)
+
+    def test_fields(self):
+        packets = makePackets([5, 0, 7])
+        packets[0].csrcList.extend([1, 2, 3])
+        packets[0].marker = True
+        packets[1].extension = Extension(
+            startBits=bytearray(b'\xbe\xde'),
+            headerExtension=bytearray(range(8)))
+        packets[2].padding = True
+        packets[2].csrcList.append(4)
+        packets[2].extension = Extension()
+
+        buffer, lengths = encodeBatch(packets, bytearray(1000))
+        self.assertEqual(bytes(buffer), b''.join(p.toBytes() for p in packets))
+        self.assertEqual(lengths, [len(p.toBytes()) for p in packets])
+
+
+class FailingSocket:
+    def __init__(self, error):
+        self.error = error
+        self.sent = []
+
+    def sendmsg(self, buffers, ancillary, flags=0, address=None):
+        raise OSError(self.error, "sendmsg failed")
+
+    def sendto(self, datagram, address):
+        self.sent.append(bytes(datagram))
+
+
+class TestGSOSender (TestCase):
+    def setUp(self):
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(('127.0.0.1', 0))
+        self.receiver.settimeout(5)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.receiver.close()
+        self.sock.close()
+
+    def check(self, sender, sizes):
+        packets = makePackets(sizes)
+        sender.send(packets, self.receiver.getsockname())
+
+        received = [self.receiver.recv(2048) for _ in sizes]
+        self.assertEqual(received, [p.toBytes() for p in packets])
+        self.assertEqual(sender.packets, len(sizes))
+
+    def test_equal(self):
+        sender = GSOSender(self.sock)
+        self.check(sender, [1200] * 10)
+
+        if sender.useGSO:
+            self.assertEqual(sender.sendCalls, 1)
+        else:
+            self.assertEqual(sender.sendCalls, 10)
+
+    def test_runs(self):
+        sender = GSOSender(self.sock)
+        self.check(sender, [100, 100, 100, 50, 100, 100, 200])
+
+        if sender.useGSO:
+            self.assertEqual(sender.sendCalls, 3)
+
+    def test_segment_limit(self):
+        sender = GSOSender(self.sock)
+        self.check(sender, [100] * 100)
+
+        if sender.useGSO:
+            self.assertEqual(sender.sendCalls, 2)
+
+    def test_fallback(self):
+        sender = GSOSender(self.sock, useGSO=False)
+        self.check(sender, [1200] * 4)
+
+        self.assertEqual(sender.sendCalls, 4)
+
+    def test_transient_error(self):
+        failing = FailingSocket(errno.ENOBUFS)
+        sender = GSOSender(failing, useGSO=True)
+        buffer, lengths = encodeBatch(makePackets([100] * 4))
+
+        with self.assertRaises(OSError):
+            sender.sendDatagrams(buffer, lengths, ('127.0.0.1', 9))
+        self.assertTrue(sender.useGSO)
+        self.assertEqual(failing.sent, [])
+
+    def test_unsupported_error(self):
+        failing = FailingSocket(errno.EIO)
+        sender = GSOSender(failing, useGSO=True)
+        buffer, lengths = encodeBatch(makePackets([100] * 4))
+
+        sender.sendDatagrams(buffer, lengths, ('127.0.0.1', 9))
+        self.assertFalse(sender.useGSO)
+        self.assertEqual(len(failing.sent), 4)
+        self.assertEqual(sender.packets, 4)
+
+    def test_connected(self):
+        self.sock.connect(self.receiver.getsockname())
+        sender = GSOSender(self.sock)
+        packets = makePackets([300] * 3)
+        sender.send(packets)
+
+        self.assertEqual([self.receiver.recv(2048) for _ in packets],
+                         [p.toBytes() for p in packets])
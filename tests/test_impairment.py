@@ -0,0 +1,190 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import time
+from random import Random
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, Impairment, GilbertElliott, ImpairmentRelay
+
+
+def datagrams(count):
+    return [RTP(sequenceNumber=i).toBytes() for i in range(count)]
+
+
+class TestGilbertElliott (TestCase):
+    def test_loss_rate(self):
+        model = GilbertElliott(0.01, 0.25)
+        rng = Random(1)
+        lost = sum(model.lost(rng) for _ in range(100000))
+
+        self.assertAlmostEqual(model.lossRate, 0.01 / 0.26)
+        self.assertAlmostEqual(lost / 100000, model.lossRate, delta=0.01)
+
+    def test_bursts(self):
+        model = GilbertElliott(0.01, 0.25)
+        rng = Random(2)
+        losses = [model.lost(rng) for _ in range(100000)]
+        bursts = sum(
+            1 for i in range(1, len(losses)) if losses[i] and not losses[i-1])
+
+        self.assertAlmostEqual(sum(losses) / bursts, 4, delta=0.5)
+
+
+class TestImpairment (TestCase):
+    def test_passthrough(self):
+        impairment = Impairment()
+        packets = datagrams(10)
+
+        self.assertEqual(impairment.apply(packets), packets)
+        self.assertEqual(impairment.pushed, 10)
+        self.assertEqual(impairment.delivered, 10)
+        self.assertEqual(len(impairment), 0)
+
+    def test_rtp_objects(self):
+        impairment = Impairment(rate=1e6)
+        packets = [RTP(sequenceNumber=i, payload=bytearray(100))
+                   for i in range(3)]
+        for packet in packets:
+            impairment.push(packet, now=0)
+
+        self.assertEqual(impairment.pop(now=1), packets)
+
+    @given(st.integers(), st.floats(min_value=0, max_value=1))
+    def test_deterministic(self, seed, loss):
+        packets = datagrams(50)
+
+        def run():
+            impairment = Impairment(
+                seed, loss=loss, duplicate=0.1, jitter=0.01, reorder=0.1)
+            for i, packet in enumerate(packets):
+                impairment.push(packet, now=i * 0.001)
+            return impairment.flush()
+
+        self.assertEqual(run(), run())
+
+    def test_loss(self):
+        impairment = Impairment(1, loss=0.1)
+        out = impairment.apply(datagrams(10000))
+
+        self.assertEqual(len(out) + impairment.dropped, 10000)
+        self.assertAlmostEqual(impairment.dropped, 1000, delta=150)
+
+    def test_loss_model(self):
+        impairment = Impairment(1, lossModel=GilbertElliott(0.5, 0.5))
+        impairment.apply(datagrams(1000))
+
+        self.assertAlmostEqual(impairment.dropped, 500, delta=100)
+
+    def test_duplicate(self):
+        impairment = Impairment(1, duplicate=1)
+        packets = datagrams(3)
+
+        self.assertEqual(
+            impairment.apply(packets),
+            [p for packet in packets for p in (packet, packet)])
+        self.assertEqual(impairment.duplicated, 3)
+
+    def test_delay(self):
+        impairment = Impairment(delay=0.1)
+        impairment.push(b'a' * 12, now=0)
+
+        self.assertEqual(impairment.pop(now=0.05), [])
+        self.assertEqual(impairment.nextDue(), 0.1)
+        self.assertEqual(impairment.pop(now=0.1), [b'a' * 12])
+        self.assertIsNone(impairment.nextDue())
+
+    def test_jitter_reorders(self):
+        impairment = Impairment(3, jitter=0.05)
+        packets = datagrams(100)
+        for i, packet in enumerate(packets):
+            impairment.push(packet, now=i * 0.001)
+        out = impairment.pop(now=1)
+
+        self.assertEqual(sorted(out), sorted(packets))
+        self.assertNotEqual(out, packets)
+
+    def test_reorder(self):
+        impairment = Impairment(1, reorder=1, reorderDelay=0.01)
+        impairment.push(b'a', now=0)
+        impairment.push(b'b', now=0.005)
+
+        self.assertEqual(impairment.pop(now=0.0099), [])
+        self.assertEqual(impairment.pop(now=1), [b'a', b'b'])
+        self.assertEqual(impairment.reordered, 2)
+
+    def test_rate(self):
+        impairment = Impairment(rate=8000, queueLimit=0.5)
+        for _ in range(10):
+            impairment.push(bytes(100), now=0)
+
+        # 100 bytes takes 0.1s, and only 0.5s may queue
+        self.assertEqual(impairment.overflowed, 4)
+        self.assertEqual(len(impairment.pop(now=0.35)), 3)
+        self.assertEqual(len(impairment.pop(now=1)), 3)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            Impairment(rate=0)
+
+
+class TestImpairmentRelay (TestCase):
+    def test_relay(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        try:
+            impairment = Impairment(delay=0.01)
+            with ImpairmentRelay(
+                    impairment, receiver.getsockname()) as relay:
+                packets = datagrams(5)
+                for packet in packets:
+                    sender.sendto(packet, relay.address)
+                received = [receiver.recv(2048) for _ in packets]
+        finally:
+            sender.close()
+            receiver.close()
+
+        self.assertEqual(received, packets)
+
+    def test_send_errors(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        try:
+            # Broadcasting without SO_BROADCAST fails every send
+            with ImpairmentRelay(
+                    Impairment(), ('255.255.255.255', 9)) as relay:
+                for packet in datagrams(3):
+                    sender.sendto(packet, relay.address)
+                deadline = time.monotonic() + 5
+                while (relay.sendErrors < 3) and (time.monotonic() < deadline):
+                    time.sleep(0.01)
+                self.assertEqual(relay.sendErrors, 3)
+
+                relay.destination = receiver.getsockname()
+                packet = datagrams(1)[0]
+                sender.sendto(packet, relay.address)
+                self.assertEqual(receiver.recv(2048), packet)
+        finally:
+            sender.close()
+            receiver.close()
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, Extension, Histogram, Registry, DecodeCounters, LengthError)
+from rtp import instrumentation
+
+
+class TestHistogram (TestCase):
+    def setUp(self):
+        self.thisHistogram = Histogram(numBuckets=8)
+
+    def setup_example(self):
+        self.setUp()
+
+    def test_empty(self):
+        self.assertEqual(self.thisHistogram.count, 0)
+        self.assertEqual(self.thisHistogram.percentile(50), 0)
+        self.assertEqual(self.thisHistogram.buckets(), [])
+
+    @given(st.lists(st.integers(min_value=0, max_value=1000), min_size=1))
+    def test_record(self, values):
+        for v in values:
+            self.thisHistogram.record(v)
+
+        self.assertEqual(self.thisHistogram.count, len(values))
+        self.assertEqual(self.thisHistogram.total, sum(values))
+        self.assertEqual(self.thisHistogram.min, min(values))
+        self.assertEqual(self.thisHistogram.max, max(values))
+        self.assertEqual(
+            sum(c for _, c in self.thisHistogram.buckets()), len(values))
+        self.assertLessEqual(self.thisHistogram.percentile(100), max(values))
+
+    def test_buckets(self):
+        for v in [0, 1, 2, 3, 4, 17, 1000]:
+            self.thisHistogram.record(v)
+
+        self.assertEqual(
+            self.thisHistogram.buckets(), [(1, 1), (2, 1), (3, 1), (4, 1),
+                                           (5, 1), (18, 1), (1024, 1)])
+        self.assertEqual(self.thisHistogram.percentile(50), 4)
+
+    @given(st.integers(min_value=1, max_value=2**30))
+    def test_bucket_error(self, value):
+        thisHistogram = Histogram(subBuckets=16)
+        thisHistogram.record(value)
+
+        (upperBound, _), = thisHistogram.buckets()
+        self.assertGreater(upperBound, value)
+        self.assertLessEqual(upperBound, value + (value // 16) + 1)
+
+    def test_clamp(self):
+        self.thisHistogram.record(3)
+        self.thisHistogram.record(2**40)
+        self.assertEqual(
+            self.thisHistogram.buckets(), [(4, 1), ((2**40) + 1, 1)])
+        self.assertEqual(self.thisHistogram.percentile(50), 4)
+        self.assertEqual(self.thisHistogram.percentile(100), 2**40)
+
+    def test_subBuckets(self):
+        with self.assertRaises(ValueError):
+            Histogram(subBuckets=3)
+
+    def test_reset(self):
+        self.thisHistogram.record(5)
+        self.thisHistogram.reset()
+        self.assertEqual(self.thisHistogram.snapshot(), {
+            'count': 0, 'total': 0, 'min': 0, 'max': 0, 'buckets': []})
+
+
+class TestInstrumentation (TestCase):
+    def setUp(self):
+        self.thisRegistry = Registry()
+
+    def tearDown(self):
+        instrumentation.disable()
+
+    def test_disabled(self):
+        original = RTP.__dict__['fromBytearray']
+        instrumentation.enable(self.thisRegistry)
+        self.assertTrue(instrumentation.isEnabled())
+        self.assertIsNot(RTP.__dict__['fromBytearray'], original)
+
+        instrumentation.disable()
+        self.assertFalse(instrumentation.isEnabled())
+        self.assertIs(RTP.__dict__['fromBytearray'], original)
+
+    def test_counts(self):
+        instrumentation.enable(self.thisRegistry)
+        packet = RTP(
+            extension=Extension(headerExtension=bytearray(4)),
+            payload=bytearray(100)).toBytearray()
+        RTP().fromBytearray(packet)
+
+        snap = self.thisRegistry.snapshot()
+        self.assertEqual(snap['RTP.toBytearray']['calls'], 1)
+        self.assertEqual(snap['RTP.toBytearray']['bytes'], len(packet))
+        self.assertEqual(snap['RTP.fromBytearray']['calls'], 1)
+        self.assertEqual(snap['RTP.fromBytearray']['bytes'], len(packet))
+        self.assertEqual(snap['Extension.fromBytearray']['calls'], 1)
+        self.assertEqual(
+            snap['RTP.fromBytearray']['latency']['count'], 1)
+
+    def test_keyword(self):
+        instrumentation.enable(self.thisRegistry)
+        packet = RTP(payload=bytearray(10)).toBytearray()
+        RTP().fromBytearray(packet=packet)
+        Extension().fromBytearray(inBytes=bytearray(4))
+
+        snap = self.thisRegistry.snapshot()
+        self.assertEqual(snap['RTP.fromBytearray']['bytes'], len(packet))
+        self.assertEqual(snap['Extension.fromBytearray']['bytes'], 4)
+
+    def test_errors(self):
+        instrumentation.enable(self.thisRegistry)
+        with self.assertRaises(LengthError):
+            Extension().fromBytearray(bytearray(5))
+
+        stats = self.thisRegistry.operation('Extension.fromBytearray')
+        self.assertEqual(stats.errors, {'LengthError': 1})
+        self.assertEqual(stats.calls, 0)
+
+    def test_sources_hooks(self):
+        counters = DecodeCounters()
+        self.thisRegistry.register('decode', counters)
+        collected = []
+        self.thisRegistry.addHook(collected.append)
+
+        snap = self.thisRegistry.collect()
+        self.assertEqual(collected, [snap])
+        self.assertEqual(snap['decode'], counters.snapshot())
+
+        self.thisRegistry.removeHook(collected.append)
+        self.thisRegistry.unregister('decode')
+        self.thisRegistry.collect()
+        self.assertEqual(len(collected), 1)
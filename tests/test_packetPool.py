@@ -0,0 +1,84 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, PacketPool
+
+
+class TestPacketPool (TestCase):
+    def setUp(self):
+        self.thisPool = PacketPool(maxSize=4)
+
+    def setup_example(self):
+        self.setUp()
+
+    def test_acquire_empty(self):
+        self.assertIsInstance(self.thisPool.acquire(), RTP)
+        self.assertEqual(self.thisPool.allocated, 1)
+        self.assertEqual(self.thisPool.reused, 0)
+
+    def test_release_reuse(self):
+        packet = self.thisPool.acquire()
+        self.thisPool.release(packet)
+        self.assertEqual(len(self.thisPool), 1)
+
+        self.assertIs(self.thisPool.acquire(), packet)
+        self.assertEqual(self.thisPool.allocated, 1)
+        self.assertEqual(self.thisPool.reused, 1)
+
+    def test_release_full(self):
+        for packet in [RTP() for _ in range(6)]:
+            self.thisPool.release(packet)
+
+        self.assertEqual(len(self.thisPool), 4)
+
+    def test_prefill(self):
+        self.thisPool.prefill(10)
+        self.assertEqual(len(self.thisPool), 4)
+        self.assertEqual(self.thisPool.allocated, 4)
+
+    def test_maxSize_invalid(self):
+        with self.assertRaises(ValueError):
+            PacketPool(maxSize=-1)
+
+    @given(st.lists(st.tuples(
+        st.integers(min_value=0, max_value=(2**16)-1),
+        st.lists(st.integers(min_value=0, max_value=(2**32)-1), max_size=15),
+        st.binary()), max_size=10))
+    def test_decode(self, packets):
+        for sequenceNumber, csrcList, payload in packets:
+            expected = RTP(
+                sequenceNumber=sequenceNumber,
+                csrcList=csrcList,
+                payload=bytearray(payload))
+
+            decoded = self.thisPool.decode(expected.toBytearray())
+            self.assertEqual(decoded, expected)
+            self.thisPool.release(decoded)
+
+        self.assertLessEqual(self.thisPool.allocated, 1)
+
+    def test_decode_malformed(self):
+        self.thisPool.prefill(2)
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.thisPool.decode(bytearray(4))
+
+        self.assertEqual(len(self.thisPool), 2)
+        self.assertEqual(self.thisPool.allocated, 2)
@@ -0,0 +1,121 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import socket
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import PacketRing, LengthError
+
+
+class TestPacketRing (TestCase):
+    def setUp(self):
+        self.thisRing = PacketRing(slotCount=8, slotSize=64)
+
+    def tearDown(self):
+        self.thisRing.close()
+        self.thisRing.unlink()
+
+    def test_empty(self):
+        self.assertEqual(len(self.thisRing), 0)
+        self.assertIsNone(self.thisRing.peek())
+        self.assertIsNone(self.thisRing.get())
+
+        with self.assertRaises(IndexError):
+            self.thisRing.release()
+
+    def test_geometry(self):
+        self.assertEqual(self.thisRing.slotCount, 8)
+        self.assertEqual(self.thisRing.slotSize, 64)
+
+    @given(st.lists(st.binary(max_size=64), max_size=30))
+    def test_put_get(self, datagrams):
+        for datagram in datagrams:
+            self.assertTrue(self.thisRing.put(datagram))
+            self.assertEqual(self.thisRing.get(), datagram)
+
+        self.assertEqual(len(self.thisRing), 0)
+
+    def test_full(self):
+        for x in range(8):
+            self.assertTrue(self.thisRing.put(bytes([x])))
+
+        self.assertEqual(len(self.thisRing), 8)
+        self.assertIsNone(self.thisRing.reserve())
+        self.assertFalse(self.thisRing.put(b'\x08'))
+
+        for x in range(8):
+            self.assertEqual(self.thisRing.get(), bytes([x]))
+
+    def test_put_too_big(self):
+        with self.assertRaises(LengthError):
+            self.thisRing.put(bytes(65))
+
+    def test_peek_release(self):
+        self.thisRing.put(b'abc')
+        view = self.thisRing.peek()
+        self.assertEqual(view, b'abc')
+        self.assertTrue(view.readonly)
+        view.release()
+        self.thisRing.release()
+        self.assertEqual(len(self.thisRing), 0)
+
+    def test_reserve_commit(self):
+        slot = self.thisRing.reserve()
+        self.assertEqual(len(slot), 64)
+        slot[0:4] = b'wxyz'
+        slot.release()
+        self.thisRing.commit(4)
+        self.assertEqual(self.thisRing.get(), b'wxyz')
+
+        with self.assertRaises(LengthError):
+            self.thisRing.commit(65)
+
+    def test_attach(self):
+        self.thisRing.put(b'shared')
+        other = PacketRing(name=self.thisRing.name)
+        self.assertEqual(other.slotCount, 8)
+        self.assertEqual(other.slotSize, 64)
+        self.assertEqual(other.get(), b'shared')
+        self.assertEqual(len(self.thisRing), 0)
+        other.close()
+
+    def test_pickle(self):
+        other = pickle.loads(pickle.dumps(self.thisRing))
+        self.assertEqual(other.name, self.thisRing.name)
+        other.put(b'pickled')
+        self.assertEqual(self.thisRing.get(), b'pickled')
+        other.close()
+
+    def test_recvInto(self):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            rx.bind(('127.0.0.1', 0))
+            tx.sendto(b'datagram', rx.getsockname())
+            self.assertEqual(self.thisRing.recvInto(rx), 8)
+            self.assertEqual(self.thisRing.get(), b'datagram')
+        finally:
+            rx.close()
+            tx.close()
+
+    def test_peek_writable(self):
+        self.thisRing.put(b'abc')
+        view = self.thisRing.peek(writable=True)
+        view[0:1] = b'x'
+        view.release()
+        self.assertEqual(self.thisRing.get(), b'xbc')
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, PayloadType, Extension, peekHeader, peekMarker, peekPayloadType,
+    peekSequenceNumber, peekTimestamp, peekSSRC, peekPayloadOffset)
+
+packets = st.builds(
+    RTP,
+    padding=st.booleans(),
+    marker=st.booleans(),
+    payloadType=st.sampled_from(PayloadType),
+    sequenceNumber=st.integers(min_value=0, max_value=(2**16)-1),
+    timestamp=st.integers(min_value=0, max_value=(2**32)-1),
+    ssrc=st.integers(min_value=0, max_value=(2**32)-1),
+    extension=st.one_of(st.none(), st.builds(
+        Extension,
+        headerExtension=st.binary(max_size=64).map(
+            lambda x: bytearray(x[:len(x) - (len(x) % 4)])))),
+    csrcList=st.lists(
+        st.integers(min_value=0, max_value=(2**32)-1), max_size=15),
+    payload=st.binary().map(bytearray))
+
+
+class TestPeek (TestCase):
+    @given(packets)
+    def test_peekHeader(self, packet):
+        header = peekHeader(packet.toBytes())
+        self.assertEqual(header.version, 2)
+        self.assertEqual(header.padding, packet.padding)
+        self.assertEqual(header.hasExtension, packet.extension is not None)
+        self.assertEqual(header.csrcCount, len(packet.csrcList))
+        self.assertEqual(header.marker, packet.marker)
+        self.assertEqual(header.payloadType, packet.payloadType)
+        self.assertEqual(header.sequenceNumber, packet.sequenceNumber)
+        self.assertEqual(header.timestamp, packet.timestamp)
+        self.assertEqual(header.ssrc, packet.ssrc)
+
+    @given(packets)
+    def test_peekFields(self, packet):
+        encoded = packet.toBytearray()
+        self.assertEqual(peekMarker(encoded), packet.marker)
+        self.assertEqual(peekPayloadType(encoded), packet.payloadType)
+        self.assertEqual(
+            peekSequenceNumber(encoded), packet.sequenceNumber)
+        self.assertEqual(peekTimestamp(encoded), packet.timestamp)
+        self.assertEqual(peekSSRC(encoded), packet.ssrc)
+
+    @given(packets)
+    def test_peekPayloadOffset(self, packet):
+        encoded = memoryview(packet.toBytearray())
+        offset = peekPayloadOffset(encoded)
+        self.assertEqual(encoded[offset:], packet.payload)
+
+    def test_peek_tooShort(self):
+        with self.assertRaises(struct.error):
+            peekHeader(bytes(11))
+
+        with self.assertRaises(struct.error):
+            peekSSRC(bytes(11))
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import socket
+import tempfile
+import threading
+from unittest import TestCase
+
+from rtp import RTP, PcapWriter, Pipeline, Stage
+from rtp.pipeline import (
+    captureSource, decode, demux, depacketize, fileSink, reorder,
+    socketSink, socketSource)
+
+
+def stream(ssrc, frames, packetsPerFrame=3):
+    packets = []
+    for n in range(frames * packetsPerFrame):
+        frame, x = divmod(n, packetsPerFrame)
+        packets.append(RTP(
+            ssrc=ssrc, sequenceNumber=n, timestamp=frame * 3000,
+            marker=(x == packetsPerFrame - 1),
+            payload=bytearray([frame, x])))
+    return packets
+
+
+def datagramBatches(packets, batchSize=4):
+    pairs = [(float(n), p.toBytes()) for n, p in enumerate(packets)]
+    return [pairs[i:i + batchSize] for i in range(0, len(pairs), batchSize)]
+
+
+class TestStages (TestCase):
+    def test_decode(self):
+        batches = datagramBatches(stream(1, 2)) + [[(9.0, b'\x00')]]
+        pipeline = Pipeline(batches, [decode()])
+        out = [p for batch in pipeline for p in batch]
+
+        self.assertEqual(out, stream(1, 2))
+        self.assertEqual([p.arrivalTime for p in out], list(range(6)))
+
+    def test_demux(self):
+        a = stream(1, 2)
+        b = stream(2, 2)
+        mixed = [p for pair in zip(a, b) for p in pair]
+        pipeline = Pipeline([mixed[:6], mixed[6:]], [demux([2])])
+
+        self.assertEqual(list(pipeline), [b[:3], b[3:]])
+
+    def test_reorder(self):
+        packets = stream(1, 4)
+        shuffled = [packets[i] for i in
+                    [1, 0, 2, 4, 3, 5, 8, 6, 7, 9, 11, 10]]
+        shuffled.insert(5, packets[3])
+        pipeline = Pipeline(
+            [shuffled[:5], shuffled[5:9], shuffled[9:]], [reorder(2)])
+
+        self.assertEqual(
+            [p for batch in pipeline for p in batch], packets)
+
+    def test_depacketize(self):
+        packets = stream(1, 3) + stream(2, 1)
+        del packets[1]
+        pipeline = Pipeline([packets], [depacketize()])
+        frames = [f for batch in pipeline for f in batch]
+
+        # SSRC 1's first frame holds back its later frames until the end
+        self.assertEqual([f.timestamp for f in frames], [0, 0, 3000, 6000])
+        self.assertEqual([f.complete for f in frames],
+                         [True, False, True, True])
+        self.assertEqual(frames[1].missing, 1)
+
+
+class TestPipeline (TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.pcap')
+        packets = [p for pair in zip(stream(1, 10), stream(2, 10))
+                   for p in pair]
+        # Reorder a packet of SSRC 1 by a few places
+        packets[4:9] = packets[6:9] + packets[4:6]
+        with PcapWriter(self.path) as writer:
+            for n, packet in enumerate(packets):
+                writer.write(packet.toBytes(), 1000 + n / 100)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_pipeline(self, threaded):
+        out = io.BytesIO()
+        pipeline = Pipeline(
+            captureSource(self.path, batchSize=7),
+            [decode(), demux([1]), reorder(), depacketize(), fileSink(out)],
+            queueSize=1)
+        pipeline.run(threaded)
+        return pipeline, out.getvalue()
+
+    def check(self, threaded):
+        pipeline, written = self.run_pipeline(threaded)
+
+        self.assertEqual(
+            written,
+            b''.join(bytes([f, x]) for f in range(10) for x in range(3)))
+        stats = pipeline.stats()
+        self.assertEqual(stats['source'].itemsOut, 60)
+        self.assertEqual(stats['decode'].itemsIn, 60)
+        self.assertEqual(stats['demux'].itemsOut, 30)
+        self.assertEqual(stats['fileSink'].itemsIn, 10)
+        self.assertTrue(all(s.busy > 0 for s in stats.values()))
+        self.assertEqual(list(pipeline.snapshot()), pipeline.names)
+
+    def test_run(self):
+        self.check(False)
+
+    def test_threaded(self):
+        self.check(True)
+
+    def test_error(self):
+        def fail(batches):
+            for batch in batches:
+                raise RuntimeError("stage failed")
+            yield []
+
+        for threaded in (False, True):
+            pipeline = Pipeline(captureSource(self.path), [decode(), fail])
+            with self.assertRaises(RuntimeError):
+                pipeline.run(threaded)
+
+    def test_duplicate_names(self):
+        with self.assertRaises(ValueError):
+            Pipeline([], [decode(), decode()])
+
+
+class TestSockets (TestCase):
+    def test_socket_round_trip(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(0.05)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        packets = stream(1, 4)
+
+        stop = threading.Event()
+        received = []
+
+        def collect(batches):
+            for batch in batches:
+                received.extend(batch)
+                if len(received) >= len(packets):
+                    stop.set()
+                yield batch
+
+        receive = Pipeline(
+            socketSource(receiver, stop=stop), [decode(), collect])
+        thread = threading.Thread(target=receive.run)
+        thread.start()
+
+        send = Pipeline([packets[:6], packets[6:]], [
+            Stage('send', socketSink(
+                sender, receiver.getsockname()).function)])
+        send.run()
+        thread.join(5)
+        receiver.close()
+        sender.close()
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(received, packets)
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import TestCase
+
+from rtp import RTP, Recorder, RecordingReader, LengthError
+
+
+class TestRecording (TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.tempDir.name, 'capture')
+        self.packets = [
+            RTP(sequenceNumber=(65500 + x) % 2**16,
+                timestamp=x * 90,
+                ssrc=1234,
+                payload=bytearray([x % 256] * 100))
+            for x in range(100)]
+
+        with Recorder(self.prefix, segmentSize=1000) as recorder:
+            for x, packet in enumerate(self.packets):
+                recorder.write(packet.toBytes(), arrivalTime=100.0 + x)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_segments(self):
+        segments = [
+            f for f in os.listdir(self.tempDir.name) if f.endswith('.rtpseg')]
+        self.assertGreater(len(segments), 1)
+
+    def test_read_all(self):
+        with RecordingReader(self.prefix) as reader:
+            self.assertEqual(len(reader), 100)
+            self.assertEqual(list(reader.packets()), self.packets)
+
+    def test_rerecord(self):
+        with Recorder(self.prefix, segmentSize=1000) as recorder:
+            for packet in self.packets[:5]:
+                recorder.write(packet.toBytes())
+
+        with RecordingReader(self.prefix) as reader:
+            self.assertEqual(list(reader.packets()), self.packets[:5])
+
+    def test_other_prefix(self):
+        other = self.prefix + '-1'
+        with Recorder(other) as recorder:
+            recorder.write(self.packets[0].toBytes())
+
+        with RecordingReader(self.prefix) as reader:
+            self.assertEqual(len(reader), 100)
+        with RecordingReader(other) as reader:
+            self.assertEqual(list(reader.packets()), self.packets[:1])
+
+        # Recording at the shorter prefix leaves the other recording alone
+        Recorder(self.prefix).close()
+        with RecordingReader(other) as reader:
+            self.assertEqual(len(reader), 1)
+
+    def test_records(self):
+        with RecordingReader(self.prefix) as reader:
+            for x, (record, datagram) in enumerate(reader.records()):
+                self.assertEqual(record.sequence, 65500 + x)
+                self.assertEqual(record.timestamp, x * 90)
+                self.assertEqual(record.arrivalTime, 100.0 + x)
+                self.assertEqual(datagram, self.packets[x].toBytes())
+                datagram.release()
+
+    def test_seekTime(self):
+        with RecordingReader(self.prefix) as reader:
+            self.assertEqual(reader.seekTime(0), 0)
+            self.assertEqual(reader.seekTime(142.5), 43)
+            self.assertEqual(reader.seekTime(150.0), 50)
+            self.assertEqual(reader.seekTime(1000), 100)
+
+    def test_seekSequence(self):
+        with RecordingReader(self.prefix) as reader:
+            position = reader.seekSequence(65536 + 10)
+            self.assertEqual(position, 46)
+            self.assertEqual(
+                next(reader.packets(position)), self.packets[46])
+
+    def test_range(self):
+        with RecordingReader(self.prefix) as reader:
+            self.assertEqual(
+                list(reader.packets(37, 61)), self.packets[37:61])
+            self.assertEqual(list(reader.packets(99, 1000)), self.packets[99:])
+
+            datagram = reader.datagram(12)
+            self.assertEqual(datagram, self.packets[12].toBytes())
+            datagram.release()
+
+            with self.assertRaises(IndexError):
+                reader.record(100)
+
+    def test_empty(self):
+        prefix = os.path.join(self.tempDir.name, 'empty')
+        Recorder(prefix).close()
+        with RecordingReader(prefix) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader.packets()), [])
+
+    def test_write_invalid(self):
+        recorder = Recorder(os.path.join(self.tempDir.name, 'invalid'))
+        with self.assertRaises(LengthError):
+            recorder.write(b'\x80\x60')
+
+        recorder.close()
+        with self.assertRaises(ValueError):
+            recorder.write(self.packets[0].toBytes())
@@ -0,0 +1,173 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, PayloadType, LengthError, REDEncoder, REDDecoder, REDBlock,
+    parseRED)
+
+
+def blocks(count, start=0):
+    return [(bytes([i]) * 10, (start + (i * 960)) & 0xffffffff)
+            for i in range(count)]
+
+
+class TestParseRED (TestCase):
+    def test_rfc_example(self):
+        # Primary PT 0 with one redundant PT 5 block, offset 160, length 4
+        payload = bytes([0x85, 0x02, 0x80, 0x04, 0x00]) + b'reds' + b'prim'
+        parsed = parseRED(payload)
+
+        self.assertEqual(
+            [(b.payloadType, b.timestampOffset, bytes(b.data))
+             for b in parsed],
+            [(5, 160, b'reds'), (0, 0, b'prim')])
+        self.assertIsInstance(parsed[0], REDBlock)
+        self.assertIsInstance(parsed[0].data, memoryview)
+
+    def test_truncated(self):
+        with self.assertRaises(LengthError):
+            parseRED(b'')
+        with self.assertRaises(LengthError):
+            parseRED(bytes([0x85, 0x02]))
+        with self.assertRaises(LengthError):
+            parseRED(bytes([0x85, 0x02, 0x80, 0x04, 0x00]) + b're')
+
+
+class TestREDEncoder (TestCase):
+    @given(st.integers(min_value=0, max_value=4),
+           st.integers(min_value=0, max_value=(2**32)-1))
+    def test_roundtrip(self, distance, start):
+        encoder = REDEncoder(PayloadType.DYNAMIC_111, distance)
+        history = []
+        for block, timestamp in blocks(8, start):
+            parsed = parseRED(encoder.encode(block, timestamp))
+            history.append(block)
+
+            self.assertEqual(
+                [bytes(b.data) for b in parsed],
+                history[-(distance + 1):])
+            self.assertEqual(
+                [b.timestampOffset for b in parsed],
+                [960 * i for i in range(len(parsed) - 1, -1, -1)])
+            self.assertTrue(all(b.payloadType == 111 for b in parsed))
+
+    def test_limits(self):
+        encoder = REDEncoder(PayloadType.DYNAMIC_111, 2)
+        encoder.encode(bytes(2000), 0)
+        encoder.encode(bytes(10), 100)
+        parsed = parseRED(encoder.encode(bytes(10), 20000))
+
+        # Too long, then too old
+        self.assertEqual(len(parsed), 1)
+
+    def test_rtp(self):
+        encoder = REDEncoder(PayloadType.DYNAMIC_111)
+        packet = RTP(timestamp=960, payload=bytearray(b'audio'))
+        encoder.encodeRTP(packet, PayloadType.DYNAMIC_127)
+
+        self.assertEqual(packet.payloadType, PayloadType.DYNAMIC_127)
+        self.assertEqual(packet.payload, bytearray(b'\x6faudio'))
+
+    def test_invalid(self):
+        with self.assertRaises(AttributeError):
+            REDEncoder(111)
+        with self.assertRaises(ValueError):
+            REDEncoder(PayloadType.DYNAMIC_111, -1)
+
+
+class TestREDDecoder (TestCase):
+    def setUp(self):
+        self.encoder = REDEncoder(PayloadType.DYNAMIC_111, 2)
+        self.decoder = REDDecoder()
+
+    def packets(self, count, start=0):
+        return [(self.encoder.encode(block, timestamp), timestamp)
+                for block, timestamp in blocks(count, start)]
+
+    def test_no_loss(self):
+        frames = []
+        for payload, timestamp in self.packets(10):
+            frames += self.decoder.decode(payload, timestamp)
+
+        self.assertEqual(
+            [(f.timestamp, bytes(f.data), f.recovered) for f in frames],
+            [(t, b, False) for b, t in blocks(10)])
+        self.assertEqual(self.decoder.recovered, 0)
+
+    @given(st.integers(min_value=0, max_value=(2**32)-1))
+    def test_recovery(self, start):
+        self.setUp()
+        packets = self.packets(10, start)
+        decoder = self.decoder
+        frames = []
+        for i, (payload, timestamp) in enumerate(packets):
+            if i in (3, 4, 7):
+                continue
+            frames += decoder.decode(payload, timestamp)
+
+        self.assertEqual(
+            [(f.timestamp, bytes(f.data)) for f in frames],
+            [(t, b) for b, t in blocks(10, start)])
+        self.assertEqual(
+            [i for i, f in enumerate(frames) if f.recovered], [3, 4, 7])
+        self.assertEqual(decoder.recovered, 3)
+        self.assertEqual(decoder.delivered, 10)
+
+    def test_unrecoverable(self):
+        frames = []
+        for i, (payload, timestamp) in enumerate(self.packets(10)):
+            if i in (3, 4, 5):
+                continue
+            frames += self.decoder.decode(payload, timestamp)
+
+        self.assertEqual(
+            [f.timestamp // 960 for f in frames], [0, 1, 2, 4, 5, 6, 7, 8, 9])
+
+    def test_late_primary(self):
+        packets = self.packets(7)
+        frames = []
+        for i in (0, 1, 2, 6, 3):
+            frames += self.decoder.decode(*packets[i])
+
+        # 4 and 5 were recovered from 6, so 3 arriving afterwards is too late
+        self.assertEqual(
+            [f.timestamp // 960 for f in frames], [0, 1, 2, 4, 5, 6])
+        self.assertEqual(self.decoder.late, 1)
+        self.assertEqual(self.decoder.duplicates, 0)
+
+    def test_duplicates_and_late(self):
+        packets = self.packets(5)
+        frames = []
+        for i in (0, 1, 3, 1, 2, 4):
+            frames += self.decoder.decode(*packets[i])
+
+        # Packet 2 was recovered from packet 3, so arrives only once
+        self.assertEqual(
+            [f.timestamp // 960 for f in frames], [0, 1, 2, 3, 4])
+        self.assertEqual(self.decoder.duplicates, 2)
+
+    def test_rtp(self):
+        packet = RTP(
+            timestamp=960,
+            payload=self.encoder.encode(b'audio', 960))
+        frames = self.decoder.decodeRTP(packet)
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].payloadType, 111)
+        self.assertEqual(bytes(frames[0].data), b'audio')
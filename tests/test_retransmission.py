@@ -0,0 +1,135 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, PayloadType, Extension, LengthError, RetransmissionCache,
+    RTXPacketizer, nackSequences)
+
+
+class TestNackSequences (TestCase):
+    def test_pid_only(self):
+        self.assertEqual(nackSequences(100, 0), [100])
+
+    def test_blp(self):
+        self.assertEqual(nackSequences(100, 0b1000000000000101),
+                         [100, 101, 103, 116])
+
+    def test_wrap(self):
+        self.assertEqual(nackSequences(65535, 0b11), [65535, 0, 1])
+
+
+class TestRetransmissionCache (TestCase):
+    def setUp(self):
+        self.thisCache = RetransmissionCache(size=16, maxPacketSize=200)
+        self.packets = [
+            RTP(sequenceNumber=(65530 + x) % 2**16,
+                payload=bytearray([x] * 10)).toBytes()
+            for x in range(20)]
+        for packet in self.packets:
+            self.thisCache.store(packet)
+
+    def test_size_invalid(self):
+        for size in [0, 3, 2**17]:
+            with self.assertRaises(ValueError):
+                RetransmissionCache(size=size)
+
+    def test_lookup(self):
+        for packet in self.packets[4:]:
+            sequenceNumber = RTP().fromBytes(packet).sequenceNumber
+            self.assertIn(sequenceNumber, self.thisCache)
+            self.assertEqual(self.thisCache.lookup(sequenceNumber), packet)
+
+    def test_lookup_evicted(self):
+        for packet in self.packets[:4]:
+            sequenceNumber = RTP().fromBytes(packet).sequenceNumber
+            self.assertNotIn(sequenceNumber, self.thisCache)
+            self.assertIsNone(self.thisCache.lookup(sequenceNumber))
+
+    def test_store_too_big(self):
+        with self.assertRaises(LengthError):
+            self.thisCache.store(RTP(payload=bytearray(200)).toBytes())
+
+    def test_resend(self):
+        self.assertEqual(
+            self.thisCache.resend([65530, 65535, 0, 13]),
+            [self.packets[5], self.packets[6], self.packets[19]])
+
+    def test_resendNack(self):
+        self.assertEqual(
+            self.thisCache.resendNack([(65535, 0b101)]),
+            [self.packets[5], self.packets[6], self.packets[8]])
+
+
+class TestRTXPacketizer (TestCase):
+    def setUp(self):
+        self.thisPacketizer = RTXPacketizer(
+            ssrc=0x12345678,
+            payloadType=PayloadType.DYNAMIC_97,
+            sequenceNumber=65535)
+
+    def test_invalid(self):
+        with self.assertRaises(AttributeError):
+            RTXPacketizer(ssrc=1, payloadType=97)
+        with self.assertRaises(ValueError):
+            RTXPacketizer(ssrc=2**32, payloadType=PayloadType.DYNAMIC_97)
+
+    @given(st.booleans(),
+           st.integers(min_value=0, max_value=(2**16)-1),
+           st.lists(st.integers(min_value=0, max_value=(2**32)-1),
+                    max_size=15),
+           st.booleans(),
+           st.binary())
+    def test_packetize(
+       self, marker, sequenceNumber, csrcList, hasExtension, payload):
+        extension = None
+        if hasExtension:
+            extension = Extension(headerExtension=bytearray(8))
+        original = RTP(
+            marker=marker,
+            sequenceNumber=sequenceNumber,
+            timestamp=1234,
+            csrcList=csrcList,
+            extension=extension,
+            payload=bytearray(payload))
+
+        startSequence = self.thisPacketizer.sequenceNumber
+        rtx = RTP().fromBytearray(
+            self.thisPacketizer.packetize(original.toBytes()))
+
+        self.assertEqual(rtx.ssrc, 0x12345678)
+        self.assertEqual(rtx.payloadType, PayloadType.DYNAMIC_97)
+        self.assertEqual(rtx.sequenceNumber, startSequence)
+        self.assertEqual(rtx.marker, marker)
+        self.assertEqual(rtx.timestamp, 1234)
+        self.assertEqual(rtx.csrcList, csrcList)
+        self.assertEqual(rtx.extension, extension)
+        self.assertEqual(
+            int.from_bytes(rtx.payload[:2], byteorder='big'), sequenceNumber)
+        self.assertEqual(rtx.payload[2:], payload)
+        self.assertEqual(
+            self.thisPacketizer.sequenceNumber, (startSequence + 1) % 2**16)
+
+    def test_resend_rtx(self):
+        cache = RetransmissionCache(size=16)
+        original = RTP(sequenceNumber=7, payload=bytearray(b'abc'))
+        cache.store(original.toBytes())
+
+        rtx = cache.resend([7], self.thisPacketizer)
+        self.assertEqual(len(rtx), 1)
+        self.assertEqual(RTP().fromBytearray(rtx[0]).payload, b'\x00\x07abc')
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import socket
+import struct
+import time
+from unittest import TestCase, skipUnless
+
+from rtp import (
+    RTP, ReusePortReceiver, openReusePortSocket, ssrcSteeringProgram)
+
+_results = None
+
+
+def _recordSSRC(packet):
+    _results.put((multiprocessing.current_process().name, packet.ssrc))
+
+
+class TestSsrcSteeringProgram (TestCase):
+    def test_program(self):
+        program = ssrcSteeringProgram(4)
+
+        self.assertEqual(
+            [struct.unpack_from('=HBBI', program, i)
+             for i in range(0, len(program), 8)],
+            [(0x20, 0, 0, 8), (0x94, 0, 0, 4), (0x16, 0, 0, 0)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            ssrcSteeringProgram(0)
+
+
+@skipUnless(hasattr(socket, 'SO_REUSEPORT'), "Needs SO_REUSEPORT")
+class TestReusePortReceiver (TestCase):
+    def test_shared_port(self):
+        first = openReusePortSocket(0, '127.0.0.1')
+        port = first.getsockname()[1]
+        second = openReusePortSocket(port, '127.0.0.1')
+        first.close()
+        second.close()
+
+    def test_receive(self):
+        global _results
+        context = multiprocessing.get_context('fork')
+        _results = context.Queue()
+
+        receiver = ReusePortReceiver(
+            _recordSSRC, 0, numWorkers=2, address='127.0.0.1', decode=True,
+            context=context)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        with receiver:
+            for x in range(20):
+                sender.sendto(
+                    RTP(ssrc=x % 4, sequenceNumber=x).toBytes(),
+                    ('127.0.0.1', receiver.port))
+            sender.sendto(b'\x00' * 4, ('127.0.0.1', receiver.port))
+            results = [_results.get(timeout=5) for _ in range(20)]
+
+            deadline = time.monotonic() + 5
+            while (receiver.totals()['packets'] < 21 and
+                   time.monotonic() < deadline):
+                time.sleep(0.01)
+            totals = receiver.totals()
+        sender.close()
+
+        self.assertEqual(totals['packets'], 21)
+        self.assertEqual(totals['handled'], 20)
+        self.assertEqual(totals['errors'], 1)
+        self.assertEqual(len(receiver.stats()), 2)
+        self.assertEqual(sorted(ssrc for _, ssrc in results),
+                         sorted(x % 4 for x in range(20)))
+
+        if receiver.steered:
+            workerForSSRC = {}
+            for worker, ssrc in results:
+                self.assertEqual(
+                    workerForSSRC.setdefault(ssrc, worker), worker)
+            self.assertEqual(len(set(workerForSSRC.values())), 2)
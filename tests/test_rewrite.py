@@ -0,0 +1,97 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, PayloadType, Extension, HeaderRewriter, rewriteHeader
+
+
+class TestHeaderRewriter (TestCase):
+    def setUp(self):
+        self.thisRTP = RTP(
+            marker=False,
+            payloadType=PayloadType.DYNAMIC_96,
+            sequenceNumber=65530,
+            timestamp=(2**32) - 10,
+            ssrc=1,
+            csrcList=[5, 6],
+            extension=Extension(headerExtension=bytearray(4)),
+            payload=bytearray(b'payload'))
+
+    def test_noop(self):
+        packet = self.thisRTP.toBytearray()
+        HeaderRewriter().rewrite(packet)
+        self.assertEqual(packet, self.thisRTP.toBytearray())
+
+    @given(st.one_of(st.none(), st.integers(min_value=0, max_value=(2**32)-1)),
+           st.integers(min_value=-(2**16), max_value=2**16),
+           st.integers(min_value=-(2**32), max_value=2**32),
+           st.one_of(st.none(), st.sampled_from(PayloadType)),
+           st.one_of(st.none(), st.booleans()))
+    def test_rewrite(
+       self, ssrc, sequenceOffset, timestampOffset, payloadType, marker):
+        packet = self.thisRTP.toBytearray()
+        rewriteHeader(
+            packet, ssrc, sequenceOffset, timestampOffset, payloadType,
+            marker)
+
+        expected = RTP().fromBytearray(self.thisRTP.toBytearray())
+        expected.sequenceNumber = (
+            (expected.sequenceNumber + sequenceOffset) % 2**16)
+        expected.timestamp = (expected.timestamp + timestampOffset) % 2**32
+        if ssrc is not None:
+            expected.ssrc = ssrc
+        if payloadType is not None:
+            expected.payloadType = payloadType
+        if marker is not None:
+            expected.marker = marker
+
+        self.assertEqual(RTP().fromBytearray(packet), expected)
+
+    def test_rewriteBatch(self):
+        packets = [
+            RTP(sequenceNumber=x, ssrc=1).toBytearray() for x in range(5)]
+        HeaderRewriter(ssrc=2, sequenceOffset=100).rewriteBatch(packets)
+
+        for x, packet in enumerate(packets):
+            decoded = RTP().fromBytearray(packet)
+            self.assertEqual(decoded.ssrc, 2)
+            self.assertEqual(decoded.sequenceNumber, 100 + x)
+
+    def test_rewriteStrided(self):
+        stride = 32
+        buffer = bytearray(stride * 4)
+        for x in range(4):
+            packet = RTP(sequenceNumber=x, payload=bytearray(4)).toBytearray()
+            buffer[x * stride:(x * stride) + len(packet)] = packet
+
+        HeaderRewriter(marker=True).rewriteStrided(
+            memoryview(buffer), count=3, stride=stride)
+
+        for x in range(4):
+            decoded = RTP().fromBytearray(
+                buffer[x * stride:(x * stride) + 16])
+            self.assertEqual(decoded.marker, x < 3)
+            self.assertEqual(decoded.sequenceNumber, x)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            HeaderRewriter(ssrc=2**32)
+        with self.assertRaises(AttributeError):
+            HeaderRewriter(payloadType=96)
+        with self.assertRaises(AttributeError):
+            HeaderRewriter(marker=1)
@@ -0,0 +1,289 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, PayloadType, LengthError, ROHCCompressor, ROHCDecompressor,
+    ROHCDecompressorState, ROHCPacketType)
+
+
+def audio(count, sequenceNumber=0, timestamp=0, stride=160, ssrc=1234):
+    return [RTP(
+        ssrc=ssrc, sequenceNumber=(sequenceNumber + i) & 0xffff,
+        timestamp=(timestamp + (i * stride)) & 0xffffffff,
+        payloadType=PayloadType.PCMU,
+        payload=bytearray([i & 0xff] * 20)).toBytes() for i in range(count)]
+
+
+def video(frames, packetsPerFrame, sequenceNumber=0, timestamp=0):
+    packets = []
+    for frame in range(frames):
+        for i in range(packetsPerFrame):
+            packets.append(RTP(
+                ssrc=5678,
+                sequenceNumber=(sequenceNumber + len(packets)) & 0xffff,
+                timestamp=(timestamp + (frame * 3000)) & 0xffffffff,
+                marker=(i == packetsPerFrame - 1),
+                payload=bytearray(100)).toBytes())
+    return packets
+
+
+def varied(rng, count):
+    # A stream with silences, stride changes, timestamp offset changes and
+    # payload type changes, in frames of one or more packets
+    sequenceNumber = rng.randrange(2**16)
+    timestamp = rng.randrange(2**32)
+    stride = rng.choice([1, 160, 960, 3000, 3003])
+    payloadType = PayloadType.PCMU
+    packetsPerFrame = rng.choice([1, 1, 3])
+    packets = []
+    while len(packets) < count:
+        change = rng.random()
+        if change < 0.01:
+            timestamp += stride * rng.randrange(2, 200)
+        elif change < 0.015:
+            stride = rng.choice([1, 160, 960, 3000, 3003])
+        elif change < 0.02:
+            timestamp += rng.randrange(1, 100)
+        elif change < 0.025:
+            payloadType = rng.choice([PayloadType.PCMU, PayloadType.PCMA])
+        for i in range(packetsPerFrame):
+            packets.append(RTP(
+                ssrc=4321, sequenceNumber=sequenceNumber & 0xffff,
+                timestamp=timestamp & 0xffffffff, payloadType=payloadType,
+                marker=(packetsPerFrame > 1) and (i == packetsPerFrame - 1),
+                payload=bytearray(4)).toBytes())
+            sequenceNumber += 1
+        timestamp += stride
+    return packets
+
+
+class TestROHC (TestCase):
+    def roundtrip(self, packets, compressor=None):
+        compressor = compressor or ROHCCompressor()
+        decompressor = ROHCDecompressor()
+        compressed = [compressor.compress(packet) for packet in packets]
+        self.assertEqual(
+            [bytes(decompressor.decompress(c)) for c in compressed], packets)
+        self.assertEqual(decompressor.crcFailures, 0)
+        return compressor, compressed
+
+    def test_audio(self):
+        compressor, compressed = self.roundtrip(audio(100))
+
+        # An IR, then IR-DYNs until the stride is established
+        self.assertEqual(compressor.counts[ROHCPacketType.IR], 1)
+        self.assertEqual(compressor.counts[ROHCPacketType.IR_DYN], 3)
+        self.assertEqual(compressor.counts[ROHCPacketType.UO_0], 96)
+        self.assertEqual(
+            [len(c) - 20 for c in compressed[-5:]], [1, 1, 1, 1, 1])
+
+    def test_video(self):
+        compressor, compressed = self.roundtrip(video(20, 4))
+
+        self.assertEqual(
+            compressor.counts[ROHCPacketType.IR] +
+            compressor.counts[ROHCPacketType.IR_DYN], 6)
+        self.assertLessEqual(max(len(c) - 100 for c in compressed[8:]), 2)
+
+    @given(st.integers(min_value=0, max_value=(2**16)-1),
+           st.integers(min_value=0, max_value=(2**32)-1),
+           st.integers(min_value=1, max_value=100000))
+    def test_wrap(self, sequenceNumber, timestamp, stride):
+        self.roundtrip(audio(40, sequenceNumber, timestamp, stride))
+
+    def test_refresh(self):
+        compressor, _ = self.roundtrip(
+            audio(100), ROHCCompressor(refreshInterval=30))
+
+        self.assertEqual(compressor.counts[ROHCPacketType.IR], 4)
+
+    def test_context_changes(self):
+        packets = audio(10)
+        packets += audio(10, 10, 1600, stride=320)
+        packets += audio(10, 40, 20000)
+        packets += audio(10, ssrc=99)
+        changed = RTP(
+            ssrc=99, sequenceNumber=10, timestamp=1600,
+            payloadType=PayloadType.PCMA, csrcList=[1, 2],
+            payload=bytearray(20)).toBytes()
+        packets += [changed]
+        self.roundtrip(packets)
+
+    def test_loss(self):
+        compressor = ROHCCompressor()
+        decompressor = ROHCDecompressor()
+        packets = audio(20) + video(10, 3, 20, 3200)
+        for i, packet in enumerate(packets):
+            compressed = compressor.compress(packet)
+            # Lose three in every seven of the UO packets, within the W-LSB
+            # window. Losing every repeat of an IR-DYN loses the context.
+            if ((i % 7) in (2, 3, 4)) and (compressed[0] < 0xf8):
+                continue
+            self.assertEqual(decompressor.decompress(compressed), packet)
+
+    def test_offset_change(self):
+        compressor = ROHCCompressor()
+        packets = audio(20) + audio(20, 20, 3205)
+        compressed = [compressor.compress(p) for p in packets]
+
+        # The new timestamp offset is repeated like any other context change
+        repeats = [i for i, c in enumerate(compressed) if c[0] == 0xf8]
+        self.assertGreaterEqual(
+            len([i for i in repeats if i >= 20]), compressor.optimism)
+
+        # So losing any one of the repeats doesn't lose the context
+        for lost in repeats:
+            decompressor = ROHCDecompressor()
+            decompressed = [
+                decompressor.decompress(c) for i, c in enumerate(compressed)
+                if i != lost]
+            self.assertEqual(
+                decompressed, [p for i, p in enumerate(packets) if i != lost])
+
+    def test_lossy(self):
+        rng = random.Random(3095)
+        wrong = 0
+        delivered = 0
+        for _ in range(20):
+            compressor = ROHCCompressor()
+            decompressor = ROHCDecompressor()
+            for packet in varied(rng, 1000):
+                compressed = compressor.compress(packet)
+                if rng.random() < 0.02:
+                    continue
+                decompressed = decompressor.decompress(compressed)
+                if decompressed is not None:
+                    delivered += 1
+                    wrong += decompressed != packet
+
+        self.assertEqual(wrong, 0)
+        self.assertGreater(delivered, 19000)
+
+    def test_damage(self):
+        compressor = ROHCCompressor()
+        decompressor = ROHCDecompressor()
+        packets = [compressor.compress(p) for p in audio(30)]
+        for packet in packets[:10]:
+            decompressor.decompress(packet)
+        self.assertEqual(
+            decompressor.state, ROHCDecompressorState.FULL_CONTEXT)
+
+        # Skipping far beyond the window fails the CRC, and after k2
+        # failures the context is assumed damaged
+        for packet in packets[27:30]:
+            self.assertIsNone(decompressor.decompress(packet))
+        self.assertEqual(decompressor.crcFailures, 3)
+        self.assertEqual(
+            decompressor.state, ROHCDecompressorState.STATIC_CONTEXT)
+
+        # Only packets with a stronger CRC are tried in the static context,
+        # and one succeeding restores the full context
+        self.assertIsNone(decompressor.decompress(packets[10]))
+        self.assertEqual(decompressor.noContext, 1)
+        uor2 = bytearray((0xc0, 0x0a, 0))
+        self.assertIsNone(decompressor.decompress(uor2))
+        self.assertEqual(decompressor.crcFailures, 4)
+        for _ in range(2):
+            decompressor.decompress(uor2)
+        self.assertEqual(decompressor.state, ROHCDecompressorState.NO_CONTEXT)
+
+        # With no context, an IR is needed
+        dynamic = ROHCCompressor(optimism=0)
+        dynamic.compress(audio(1)[0])
+        irDyn = dynamic.compress(audio(2, 1, 1000)[1])
+        self.assertEqual(irDyn[0], 0xf8)
+        self.assertIsNone(decompressor.decompress(irDyn))
+        self.assertEqual(decompressor.noContext, 2)
+
+        refresh = ROHCCompressor().compress(audio(1, 40, 6400)[0])
+        self.assertEqual(
+            decompressor.decompress(refresh), audio(1, 40, 6400)[0])
+        self.assertEqual(
+            decompressor.state, ROHCDecompressorState.FULL_CONTEXT)
+
+    def test_crc_failure(self):
+        compressor = ROHCCompressor()
+        decompressor = ROHCDecompressor()
+        packets = [compressor.compress(p) for p in audio(10)]
+        for packet in packets[:5]:
+            decompressor.decompress(packet)
+
+        # Losing more than the window means the sequence number decodes
+        # wrongly, which the CRC catches
+        late = ROHCCompressor()
+        for packet in audio(40):
+            compressed = late.compress(packet)
+        self.assertIsNone(decompressor.decompress(compressed))
+        self.assertEqual(decompressor.crcFailures, 1)
+
+        corrupt = bytearray(packets[0])
+        corrupt[5] ^= 1
+        self.assertIsNone(decompressor.decompress(corrupt))
+        self.assertEqual(decompressor.crcFailures, 2)
+
+    def test_no_context(self):
+        compressor = ROHCCompressor()
+        packets = [compressor.compress(p) for p in audio(10)]
+        decompressor = ROHCDecompressor()
+
+        self.assertIsNone(decompressor.decompress(packets[1]))
+        self.assertIsNone(decompressor.decompress(packets[-1]))
+        self.assertEqual(decompressor.noContext, 2)
+
+    def test_corruption(self):
+        rng = random.Random(1)
+        compressor = ROHCCompressor()
+        decompressor = ROHCDecompressor()
+        wrong = 0
+        corrupted = 0
+        for packet in varied(rng, 5000):
+            compressed = compressor.compress(packet)
+            if rng.random() < 0.05:
+                corrupted += 1
+                # Flip a bit, or cut the packet short
+                if rng.random() < 0.5:
+                    compressed[rng.randrange(len(compressed))] ^= (
+                        1 << rng.randrange(8))
+                else:
+                    del compressed[rng.randrange(len(compressed)):]
+            decompressed = decompressor.decompress(compressed)
+            if decompressed is not None:
+                wrong += decompressed[:12] != packet[:12]
+
+        # Corrupt packets are dropped rather than raising. A 3-bit CRC can
+        # only be expected to catch seven in eight.
+        self.assertGreater(decompressor.crcFailures, corrupted // 2)
+        self.assertGreater(decompressor.decompressed, 4500)
+        self.assertLessEqual(wrong, corrupted // 8)
+
+    def test_short(self):
+        with self.assertRaises(LengthError):
+            ROHCCompressor().compress(bytes(11))
+
+        compressor = ROHCCompressor()
+        decompressor = ROHCDecompressor()
+        packets = [compressor.compress(p) for p in audio(5)]
+        decompressor.decompress(packets[0])
+        for malformed in (b'', packets[1][:10], b'\xe0', b'\x80',
+                          b'\xc0\x00'):
+            self.assertIsNone(decompressor.decompress(malformed))
+        self.assertEqual(decompressor.crcFailures, 5)
+        self.assertEqual(
+            decompressor.state, ROHCDecompressorState.STATIC_CONTEXT)
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import (
+    RTP, NackGenerator, nackEntries, nackSequences, genericNack,
+    pictureLossIndication, fullIntraRequest, emptyReceiverReport)
+
+
+def parseCompound(packet):
+    packets = []
+    offset = 0
+    while offset < len(packet):
+        first, pt, length = struct.unpack_from('!BBH', packet, offset)
+        end = offset + ((length + 1) * 4)
+        packets.append((first & 0x1f, pt, packet[offset:end]))
+        offset = end
+    return packets
+
+
+def nackedSequences(packet):
+    sequences = []
+    for fmt, pt, body in parseCompound(packet):
+        if (pt, fmt) == (205, 1):
+            for offset in range(12, len(body), 4):
+                sequences += nackSequences(
+                    *struct.unpack_from('!HH', body, offset))
+    return sequences
+
+
+class TestFeedbackPackets (TestCase):
+    @given(st.sets(st.integers(min_value=0, max_value=200), max_size=50))
+    def test_nackEntries(self, lost):
+        entries = nackEntries(lost)
+        expanded = []
+        for pid, blp in entries:
+            expanded += nackSequences(pid, blp)
+        self.assertEqual(sorted(expanded), sorted(lost))
+
+    def test_nackEntries_compact(self):
+        self.assertEqual(nackEntries(range(100, 117)), [(100, 0xffff)])
+        self.assertEqual(
+            nackEntries([65535, 65536, 65538]), [(65535, 0b101)])
+
+    def test_genericNack(self):
+        packet = genericNack(1, 2, [(100, 0x8001), (300, 0)])
+        self.assertEqual(
+            packet,
+            b'\x81\xcd\x00\x04\x00\x00\x00\x01\x00\x00\x00\x02'
+            b'\x00\x64\x80\x01\x01\x2c\x00\x00')
+
+    def test_pictureLossIndication(self):
+        self.assertEqual(
+            pictureLossIndication(1, 2),
+            b'\x81\xce\x00\x02\x00\x00\x00\x01\x00\x00\x00\x02')
+
+    def test_fullIntraRequest(self):
+        self.assertEqual(
+            fullIntraRequest(1, 2, 257),
+            b'\x84\xce\x00\x04\x00\x00\x00\x01\x00\x00\x00\x00'
+            b'\x00\x00\x00\x02\x01\x00\x00\x00')
+
+    def test_emptyReceiverReport(self):
+        self.assertEqual(
+            emptyReceiverReport(1), b'\x80\xc9\x00\x01\x00\x00\x00\x01')
+
+
+class TestNackGenerator (TestCase):
+    def setUp(self):
+        self.thisGenerator = NackGenerator(
+            senderSSRC=1, mediaSSRC=2, rtt=0.1, maxRetries=2,
+            minInterval=0.01, maxMissing=50)
+
+    def test_no_loss(self):
+        for x in range(10):
+            self.thisGenerator.received(x)
+        self.assertIsNone(self.thisGenerator.poll(0))
+
+    def test_gap(self):
+        for x in [65530, 65531, 65534, 1, 2]:
+            self.thisGenerator.received(x)
+
+        self.assertEqual(
+            self.thisGenerator.missing, [65532, 65533, 65535, 65536])
+        packet = self.thisGenerator.poll(0)
+        self.assertEqual(
+            [(fmt, pt) for fmt, pt, _ in parseCompound(packet)],
+            [(0, 201), (1, 205)])
+        self.assertEqual(nackedSequences(packet), [65532, 65533, 65535, 0])
+        self.assertEqual(self.thisGenerator.nacked, 4)
+
+    def test_recovered(self):
+        for x in [0, 3, 1]:
+            self.thisGenerator.received(x)
+
+        self.assertEqual(self.thisGenerator.missing, [2])
+        self.assertEqual(self.thisGenerator.recovered, 1)
+
+    def test_retry_suppression(self):
+        for x in [0, 2]:
+            self.thisGenerator.received(x)
+
+        self.assertIsNotNone(self.thisGenerator.poll(0))
+        # Within the RTT nothing is resent
+        self.assertIsNone(self.thisGenerator.poll(0.05))
+        self.assertEqual(nackedSequences(self.thisGenerator.poll(0.11)), [1])
+        # Retries exhausted
+        self.assertIsNone(self.thisGenerator.poll(0.3))
+        self.assertEqual(self.thisGenerator.abandoned, 1)
+        self.assertEqual(self.thisGenerator.missing, [])
+
+    def test_rate_limit(self):
+        self.thisGenerator.received(0)
+        self.thisGenerator.received(2)
+        self.assertIsNotNone(self.thisGenerator.poll(0))
+
+        self.thisGenerator.received(4)
+        self.assertIsNone(self.thisGenerator.poll(0.005))
+        self.assertEqual(nackedSequences(self.thisGenerator.poll(0.01)), [3])
+
+    def test_burst_keyframe(self):
+        self.thisGenerator.received(0)
+        self.thisGenerator.received(100)
+
+        packet = self.thisGenerator.poll(0)
+        self.assertEqual(
+            [(fmt, pt) for fmt, pt, _ in parseCompound(packet)],
+            [(0, 201), (1, 206)])
+        self.assertEqual(self.thisGenerator.abandoned, 99)
+        self.assertEqual(self.thisGenerator.keyFramesRequested, 1)
+
+    def test_fir(self):
+        thisGenerator = NackGenerator(
+            senderSSRC=1, mediaSSRC=2, useFir=True, reducedSize=True)
+        thisGenerator.requestKeyFrame()
+        self.assertEqual(thisGenerator.poll(0), fullIntraRequest(1, 2, 0))
+        thisGenerator.requestKeyFrame()
+        self.assertEqual(thisGenerator.poll(1), fullIntraRequest(1, 2, 1))
+
+    def test_receivedDatagram(self):
+        thisGenerator = NackGenerator(senderSSRC=1, reducedSize=True)
+        for x in [10, 12]:
+            thisGenerator.receivedDatagram(
+                RTP(ssrc=99, sequenceNumber=x).toBytes())
+
+        self.assertEqual(thisGenerator.mediaSSRC, 99)
+        self.assertEqual(thisGenerator.poll(0), genericNack(1, 99, [(11, 0)]))
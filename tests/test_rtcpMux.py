@@ -0,0 +1,107 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st
+
+from rtp import (
+    RTP, MuxDemultiplexer, PacketClass, PacketRing, PayloadType, classify,
+    classifyBatch, emptyReceiverReport, isRTCP, pictureLossIndication)
+
+rtpPayloadTypes = st.sampled_from(
+    [p for p in PayloadType if not (64 <= p.value <= 95)])
+
+
+class TestClassify (TestCase):
+    @given(rtpPayloadTypes, st.booleans())
+    def test_rtp(self, payloadType, marker):
+        packet = RTP(payloadType=payloadType, marker=marker).toBytes()
+
+        self.assertEqual(classify(packet), PacketClass.RTP)
+        self.assertFalse(isRTCP(packet))
+
+    def test_rtcp(self):
+        for packet in (emptyReceiverReport(1), pictureLossIndication(1, 2)):
+            self.assertEqual(classify(packet), PacketClass.RTCP)
+            self.assertTrue(isRTCP(packet))
+
+    @given(st.integers(min_value=200, max_value=204))
+    def test_rtcp_types(self, packetType):
+        self.assertEqual(
+            classify(bytes([0x80, packetType]) + bytes(6)), PacketClass.RTCP)
+
+    def test_other(self):
+        for datagram in (b'', b'\x80\x60', b'\x00\x01' + bytes(18),
+                         b'\x16\xfe\xfd' + bytes(10)):
+            self.assertEqual(classify(datagram), PacketClass.OTHER)
+
+    def test_batch(self):
+        datagrams = [RTP().toBytes(), emptyReceiverReport(1), b'\x00' * 20]
+        into = bytearray(b'stale')
+
+        result = classifyBatch(datagrams, into)
+        self.assertIs(result, into)
+        self.assertEqual(
+            list(result),
+            [PacketClass.RTP, PacketClass.RTCP, PacketClass.OTHER])
+
+
+class TestMuxDemultiplexer (TestCase):
+    def setUp(self):
+        self.rtp = []
+        self.rtcp = []
+        self.demux = MuxDemultiplexer(
+            lambda d: self.rtp.append(bytes(d)),
+            lambda d: self.rtcp.append(bytes(d)))
+        self.datagrams = [
+            RTP(sequenceNumber=1).toBytes(), bytes(emptyReceiverReport(1)),
+            RTP(sequenceNumber=2).toBytes(), b'\x00' * 20]
+
+    def check(self):
+        self.assertEqual(self.rtp, [self.datagrams[0], self.datagrams[2]])
+        self.assertEqual(self.rtcp, [self.datagrams[1]])
+        self.assertEqual(self.demux.counts, [2, 1, 1])
+
+    def test_dispatch(self):
+        classes = [self.demux.dispatch(d) for d in self.datagrams]
+
+        self.assertEqual(classes, [
+            PacketClass.RTP, PacketClass.RTCP, PacketClass.RTP,
+            PacketClass.OTHER])
+        self.check()
+
+    def test_dispatchBatch(self):
+        self.assertEqual(self.demux.dispatchBatch(self.datagrams), 4)
+        self.check()
+
+    def test_drainRing(self):
+        with PacketRing(slotCount=8, slotSize=64) as ring:
+            for datagram in self.datagrams:
+                ring.put(datagram)
+
+            self.assertEqual(self.demux.drainRing(ring, 3), 3)
+            self.assertEqual(len(ring), 1)
+            self.assertEqual(self.demux.drainRing(ring), 1)
+            self.assertEqual(len(ring), 0)
+        self.check()
+
+    def test_other_handler(self):
+        other = []
+        demux = MuxDemultiplexer(
+            lambda d: None, lambda d: None, other.append)
+        demux.dispatchBatch(self.datagrams)
+
+        self.assertEqual(len(other), 1)
@@ -456,3 +456,47 @@ class TestRTP (TestCase):
         self.thisRTP.ssrc = 0
         expected = b'\x80\x60\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
         self.assertEqual(bytes(self.thisRTP), expected)
+
+    @given(st.lists(st.integers(min_value=0, max_value=(2**32)-1),
+                    max_size=15),
+           st.lists(st.integers(min_value=0, max_value=(2**32)-1),
+                    max_size=15))
+    def test_fromBytearray_reuse_csrcList(self, first, second):
+        firstBytes = RTP(csrcList=first).toBytearray()
+        secondRTP = RTP(csrcList=second)
+
+        self.thisRTP.fromBytearray(firstBytes)
+        self.thisRTP.fromBytearray(secondRTP.toBytearray())
+        self.assertEqual(self.thisRTP, secondRTP)
+
+    def test_fromBytearray_reuse_extension(self):
+        withExt = RTP(extension=Extension(headerExtension=bytearray(4)))
+        withoutExt = RTP()
+
+        self.thisRTP.fromBytearray(withExt.toBytearray())
+        self.thisRTP.fromBytearray(withoutExt.toBytearray())
+        self.assertEqual(self.thisRTP, withoutExt)
+
+    @given(st.binary(), st.binary())
+    def test_fromBytearray_reuseBuffers(self, firstPayload, secondPayload):
+        ext = Extension(headerExtension=bytearray(4))
+        first = RTP(extension=ext, payload=bytearray(firstPayload))
+        second = RTP(
+            extension=Extension(bytearray(b'\x01\x02'), bytearray(8)),
+            payload=bytearray(secondPayload))
+
+        self.thisRTP.fromBytearray(first.toBytearray())
+        payload = self.thisRTP.payload
+        extension = self.thisRTP.extension
+
+        self.thisRTP.fromBytearray(second.toBytearray(), reuseBuffers=True)
+        self.assertEqual(self.thisRTP, second)
+        self.assertIs(self.thisRTP.payload, payload)
+        self.assertIs(self.thisRTP.extension, extension)
+
+    def test_fromBytearray_memoryview(self):
+        self.thisRTP.extension = Extension(headerExtension=bytearray(4))
+        self.thisRTP.payload = bytearray(b'payload')
+        packet = memoryview(self.thisRTP.toBytearray()).toreadonly()
+
+        self.assertEqual(RTP().fromBytearray(packet), self.thisRTP)
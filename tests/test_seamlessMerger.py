@@ -0,0 +1,126 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, SeamlessMerger, LengthError
+
+
+def makePacket(sequenceNumber):
+    return RTP(
+        sequenceNumber=sequenceNumber % 2**16,
+        payload=bytearray(sequenceNumber.to_bytes(4, 'big'))).toBytes()
+
+
+def sequences(released):
+    return [RTP().fromBytearray(p).sequenceNumber for p in released]
+
+
+class TestSeamlessMerger (TestCase):
+    def setUp(self):
+        self.thisMerger = SeamlessMerger(numLegs=2, windowSize=64, maxDelay=8)
+
+    def setup_example(self):
+        self.setUp()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SeamlessMerger(windowSize=100)
+        with self.assertRaises(ValueError):
+            SeamlessMerger(windowSize=64, maxDelay=64)
+        with self.assertRaises(ValueError):
+            SeamlessMerger(numLegs=9)
+        with self.assertRaises(LengthError):
+            self.thisMerger.push(0, bytes(1501))
+
+    def test_identical_legs(self):
+        released = []
+        for x in range(65530, 65550):
+            released += self.thisMerger.push(0, makePacket(x), now=x)
+            released += self.thisMerger.push(1, makePacket(x), now=x + 0.5)
+
+        self.assertEqual(
+            sequences(released), [x % 2**16 for x in range(65530, 65550)])
+        self.assertEqual(self.thisMerger.legs[0].received, 20)
+        self.assertEqual(self.thisMerger.legs[1].duplicates, 20)
+        self.assertEqual(self.thisMerger.legs[1].maxSkew, 0.5)
+        self.assertGreater(self.thisMerger.legs[1].skew, 0)
+
+    def test_complementary_loss(self):
+        released = []
+        for x in range(40):
+            if x % 3 != 0:
+                released += self.thisMerger.push(0, makePacket(x))
+            if x % 3 != 1:
+                released += self.thisMerger.push(1, makePacket(x))
+
+        self.assertEqual(sequences(released), list(range(40)))
+        self.assertEqual(self.thisMerger.missing, 0)
+
+    def test_skewed_leg(self):
+        # Leg 1 runs 5 packets behind and fills leg 0's losses
+        released = []
+        for x in range(30):
+            if x not in (10, 11):
+                released += self.thisMerger.push(0, makePacket(x))
+            if x >= 5:
+                released += self.thisMerger.push(1, makePacket(x - 5))
+
+        self.assertEqual(sequences(released), list(range(30)))
+        self.assertEqual(self.thisMerger.missing, 0)
+        self.assertEqual(self.thisMerger.legs[0].received, 28)
+
+    def test_gap_skipped(self):
+        released = []
+        for x in list(range(5)) + list(range(6, 20)):
+            released += self.thisMerger.push(0, makePacket(x))
+
+        self.assertEqual(sequences(released), [x for x in range(20) if x != 5])
+        self.assertEqual(self.thisMerger.missing, 1)
+        self.assertEqual(self.thisMerger.legs[0].lost, 1)
+        self.assertEqual(self.thisMerger.legs[1].lost, 1)
+
+        # Arrives after its place has passed
+        self.thisMerger.push(1, makePacket(5))
+        self.assertEqual(self.thisMerger.legs[1].late, 1)
+
+    def test_jump_ahead(self):
+        released = self.thisMerger.push(0, makePacket(0))
+        released += self.thisMerger.push(0, makePacket(1000))
+        released += self.thisMerger.flush()
+        self.assertEqual(sequences(released), [0, 1000])
+
+    def test_jump_overwrites_slot(self):
+        merger = SeamlessMerger(
+            numLegs=2, windowSize=4, maxDelay=3, maxPacketSize=64)
+        packets = [makePacket(x) for x in [0, 2, 6]]
+        released = []
+        for packet in packets:
+            released += merger.push(0, packet)
+        released += merger.flush()
+
+        # Seq 2 was forced out of the slot seq 6 then took
+        self.assertEqual([bytes(p) for p in released], packets)
+
+    @given(st.permutations(list(range(32))))
+    def test_reorder_within_delay(self, order):
+        merger = SeamlessMerger(windowSize=64, maxDelay=63)
+        released = merger.push(0, makePacket(0))
+        for x in order:
+            released += merger.push(1, makePacket(x + 1))
+        released += merger.flush()
+        self.assertEqual(sequences(released), list(range(33)))
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import socket
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import RTP, ShardedReceiver, shardForSSRC
+
+_results = None
+
+
+def _recordSSRC(packet):
+    _results.put((multiprocessing.current_process().name, packet.ssrc))
+
+
+class TestShardedReceiver (TestCase):
+    @given(st.integers(min_value=0, max_value=(2**32)-1),
+           st.integers(min_value=1, max_value=16))
+    def test_shardForSSRC(self, ssrc, numShards):
+        packet = RTP(ssrc=ssrc).toBytes()
+        self.assertEqual(shardForSSRC(packet, numShards), ssrc % numShards)
+
+    def test_shardForSSRC_short(self):
+        self.assertEqual(shardForSSRC(b'\x80\x60', 4), 0)
+
+    def test_dispatch(self):
+        global _results
+        context = multiprocessing.get_context('fork')
+        _results = context.Queue()
+
+        receiver = ShardedReceiver(
+            _recordSSRC, numWorkers=2, slotCount=64, decode=True,
+            context=context)
+        with receiver:
+            dispatcher = receiver.dispatcher()
+            for x in range(20):
+                self.assertTrue(dispatcher.dispatch(
+                    RTP(ssrc=x % 4, sequenceNumber=x).toBytes()))
+
+        results = [_results.get(timeout=5) for _ in range(20)]
+        self.assertEqual(sum(receiver.handled()), 20)
+
+        workerForSSRC = {}
+        for worker, ssrc in results:
+            self.assertEqual(workerForSSRC.setdefault(ssrc, worker), worker)
+        self.assertEqual(sorted(workerForSSRC), [0, 1, 2, 3])
+        self.assertEqual(len(set(workerForSSRC.values())), 2)
+
+    def test_malformed(self):
+        global _results
+        context = multiprocessing.get_context('fork')
+        _results = context.Queue()
+
+        receiver = ShardedReceiver(
+            _recordSSRC, numWorkers=1, slotCount=64, decode=True,
+            context=context)
+        with receiver:
+            dispatcher = receiver.dispatcher()
+            dispatcher.dispatch(b'\x80\x60')
+            dispatcher.dispatch(bytes(12))
+            dispatcher.dispatch(RTP(ssrc=7).toBytes())
+
+        self.assertEqual(_results.get(timeout=5)[1], 7)
+        self.assertEqual(receiver.handled(), [1])
+        self.assertEqual(receiver.decodeErrors(), [2])
+
+    def test_oversized(self):
+        receiver = ShardedReceiver(
+            _recordSSRC, numWorkers=1, slotCount=4, slotSize=64)
+        dispatcher = receiver.dispatcher()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind(('127.0.0.1', 0))
+            sock.settimeout(5)
+            sender.sendto(bytes(65), sock.getsockname())
+            sender.sendto(bytes(64), sock.getsockname())
+
+            self.assertEqual(dispatcher.recvInto(sock), 65)
+            self.assertEqual(dispatcher.oversized, 1)
+            self.assertEqual(dispatcher.recvInto(sock), 64)
+            self.assertEqual(dispatcher.oversized, 1)
+        finally:
+            sender.close()
+            sock.close()
+            receiver.stop()
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+from unittest import TestCase
+from hypothesis import given, strategies as st
+
+from rtp import (
+    RTP, RFC4571Parser, InterleavedParser, InterleavedPacket, encodeRFC4571,
+    encodeInterleaved)
+from rtp.errors import LengthError
+
+
+def packetList(count):
+    return [RTP(sequenceNumber=n, payload=bytearray([n]) * n).toBytes()
+            for n in range(count)]
+
+
+def chunked(data, sizes):
+    chunks = []
+    offset = 0
+    for size in sizes:
+        chunks.append(data[offset:offset + size])
+        offset += size
+    chunks.append(data[offset:])
+    return chunks
+
+
+class TestRFC4571Parser (TestCase):
+    def test_encode(self):
+        self.assertEqual(encodeRFC4571(b'abc'), b'\x00\x03abc')
+
+        with self.assertRaises(LengthError):
+            encodeRFC4571(bytes(2**16))
+
+    @given(st.lists(st.integers(min_value=1, max_value=50)))
+    def test_chunks(self, sizes):
+        packets = packetList(20)
+        stream = b''.join(encodeRFC4571(p) for p in packets)
+        parser = RFC4571Parser(initialSize=16)
+
+        received = []
+        for chunk in chunked(stream, sizes):
+            parser.feed(chunk)
+            received.extend(bytes(p) for p in parser)
+
+        self.assertEqual(received, packets)
+        self.assertEqual(parser.packets, 20)
+        self.assertEqual(parser.bytes, len(stream))
+        self.assertEqual(len(parser), 0)
+
+    def test_partial(self):
+        parser = RFC4571Parser()
+        parser.feed(b'\x00\x05ab')
+
+        self.assertEqual(list(parser), [])
+        self.assertEqual(len(parser), 4)
+
+        parser.feed(b'cde\x00')
+        self.assertEqual([bytes(p) for p in parser], [b'abcde'])
+        self.assertEqual(len(parser), 1)
+
+    def test_decode_view(self):
+        packet = RTP(ssrc=7, payload=bytearray(b'payload'))
+        parser = RFC4571Parser()
+        parser.feed(encodeRFC4571(packet.toBytes()))
+
+        view, = list(parser)
+        self.assertEqual(RTP().fromBytearray(view), packet)
+
+    def test_recvInto(self):
+        a, b = socket.socketpair()
+        packets = packetList(10)
+        a.sendall(b''.join(encodeRFC4571(p) for p in packets))
+        a.close()
+
+        parser = RFC4571Parser(initialSize=64)
+        received = []
+        while parser.recvInto(b, 100):
+            received.extend(bytes(p) for p in parser)
+        b.close()
+
+        self.assertEqual(received, packets)
+
+
+class TestInterleavedParser (TestCase):
+    def test_encode(self):
+        self.assertEqual(encodeInterleaved(1, b'abc'), b'$\x01\x00\x03abc')
+
+        with self.assertRaises(ValueError):
+            encodeInterleaved(256, b'')
+
+    @given(st.lists(st.integers(min_value=1, max_value=50)))
+    def test_chunks(self, sizes):
+        packets = packetList(10)
+        response = (b'RTSP/1.0 200 OK\r\nCSeq: 3\r\n'
+                    b'Content-Length: 4\r\n\r\nbody')
+        stream = b''.join(encodeInterleaved(n % 2, p)
+                          for n, p in enumerate(packets[:5]))
+        stream += response
+        stream += b''.join(encodeInterleaved(n % 2, p)
+                           for n, p in enumerate(packets[5:]))
+        parser = InterleavedParser(initialSize=16)
+
+        received = []
+        for chunk in chunked(stream, sizes):
+            parser.feed(chunk)
+            received.extend(
+                InterleavedPacket(c, bytes(d)) for c, d in parser)
+
+        expected = [InterleavedPacket(n % 2, p)
+                    for n, p in enumerate(packets[:5])]
+        expected.append(InterleavedPacket(None, response))
+        expected.extend(InterleavedPacket(n % 2, p)
+                        for n, p in enumerate(packets[5:]))
+        self.assertEqual(received, expected)
+        self.assertEqual(parser.packets, 10)
+        self.assertEqual(parser.messages, 1)
+
+    def test_message_without_body(self):
+        parser = InterleavedParser()
+        parser.feed(b'GET_PARAMETER rtsp://x RTSP/1.0\r\nCSeq: 4\r\n\r\n$')
+
+        items = list(parser)
+        self.assertEqual(len(items), 1)
+        self.assertIsNone(items[0].channel)
+        self.assertEqual(len(parser), 1)
+
+    def test_message_too_long(self):
+        parser = InterleavedParser(maxMessageSize=16)
+        parser.feed(b'RTSP/1.0 200 OK\r\nCSeq: 3\r\n')
+
+        with self.assertRaises(LengthError):
+            list(parser)
@@ -0,0 +1,130 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import struct
+import time
+from unittest import TestCase
+
+from rtp import (
+    RTP, DecodeStatus, PacketColumns, PacketPool, TimestampedReader,
+    timestampFromAncillary)
+from rtp import timestamping
+from rtp.timestamping import SCM_TIMESTAMPNS
+
+
+class TestTimestampFromAncillary (TestCase):
+    def test_timestamp(self):
+        data = struct.pack('@ll', 1600000000, 250000000)
+
+        self.assertEqual(
+            timestampFromAncillary(
+                [(socket.SOL_SOCKET, SCM_TIMESTAMPNS, data)]),
+            1600000000.25)
+
+    def test_missing(self):
+        self.assertIsNone(timestampFromAncillary([]))
+        self.assertIsNone(timestampFromAncillary(
+            [(socket.IPPROTO_IP, SCM_TIMESTAMPNS, b'\x00' * 16)]))
+
+
+class TestTimestampedReader (TestCase):
+    def setUp(self):
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(('127.0.0.1', 0))
+        self.receiver.settimeout(5)
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.reader = TimestampedReader(self.receiver)
+
+    def tearDown(self):
+        self.receiver.close()
+        self.sender.close()
+
+    def send(self, datagram):
+        self.sender.sendto(datagram, self.receiver.getsockname())
+
+    def test_readPacket(self):
+        packet = RTP(ssrc=1234, sequenceNumber=5, payload=bytearray(10))
+        before = time.time()
+        self.send(packet.toBytes())
+        status, received = self.reader.readPacket()
+        after = time.time()
+
+        self.assertEqual(status, DecodeStatus.OK)
+        self.assertEqual(received, packet)
+        self.assertTrue(before <= received.arrivalTime <= after)
+        if self.reader.kernelTimestamps:
+            self.assertEqual(self.reader.fallbacks, 0)
+
+    def test_readPacket_invalid(self):
+        self.send(b'\x00' * 4)
+        status, received = self.reader.readPacket()
+
+        self.assertEqual(status, DecodeStatus.TOO_SHORT)
+        self.assertIsNone(received)
+
+    def test_readColumns(self):
+        for x in range(5):
+            self.send(RTP(sequenceNumber=x).toBytes())
+        self.send(b'\x00' * 4)
+
+        columns = PacketColumns()
+        deadline = time.monotonic() + 5
+        count = 0
+        while (count < 6) and (time.monotonic() < deadline):
+            count += self.reader.readColumns(columns)
+
+        self.assertEqual(count, 6)
+        self.assertEqual(list(columns.sequenceNumber), list(range(5)))
+        self.assertEqual(columns.invalid, 1)
+        self.assertEqual(sorted(columns.arrivalTime),
+                         list(columns.arrivalTime))
+        self.assertEqual(self.reader.readColumns(columns), 0)
+
+
+class TestArrivalTime (TestCase):
+    def test_not_compared(self):
+        packet = RTP(ssrc=1, sequenceNumber=1, arrivalTime=1.0)
+        other = RTP(ssrc=1, sequenceNumber=1, arrivalTime=2.0)
+
+        self.assertEqual(packet, other)
+        self.assertEqual(packet.toBytes(), other.toBytes())
+        self.assertIsNone(RTP().arrivalTime)
+
+    def test_reset_on_decode(self):
+        encoded = RTP(ssrc=1, sequenceNumber=1).toBytearray()
+        packet = RTP(arrivalTime=1.0)
+
+        self.assertIsNone(packet.fromBytearray(encoded).arrivalTime)
+
+        pool = PacketPool()
+        packet = pool.decode(encoded)
+        packet.arrivalTime = 1.0
+        pool.release(packet)
+        self.assertIsNone(pool.decode(encoded).arrivalTime)
+
+
+class TestUnsupported (TestCase):
+    def test_no_ancillary(self):
+        cmsgSpace = timestamping._cmsgSpace
+        timestamping._cmsgSpace = None
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            with self.assertRaises(OSError):
+                TimestampedReader(sock)
+        finally:
+            timestamping._cmsgSpace = cmsgSpace
+            sock.close()
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+#
+# James Sandford, copyright BBC 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from hypothesis import given, strategies as st  # type: ignore
+
+from rtp import Unwrapper
+
+
+class TestUnwrapper (TestCase):
+    def setUp(self):
+        self.thisUnwrapper = Unwrapper(16)
+
+    def setup_example(self):
+        self.setUp()
+
+    @given(st.integers(min_value=0, max_value=(2**16)-1))
+    def test_first(self, value):
+        self.assertIsNone(self.thisUnwrapper.last)
+        self.assertEqual(self.thisUnwrapper.unwrap(value), value)
+        self.assertEqual(self.thisUnwrapper.last, value)
+
+    @given(st.integers(min_value=0, max_value=(2**16)-1),
+           st.lists(st.integers(min_value=-(2**15)+1, max_value=(2**15)-1)))
+    def test_steps(self, start, steps):
+        extended = start
+        self.thisUnwrapper.unwrap(start)
+        for step in steps:
+            extended += step
+            self.assertEqual(
+                self.thisUnwrapper.unwrap(extended % 2**16), extended)
+
+    def test_wrap(self):
+        self.assertEqual(self.thisUnwrapper.unwrap(65534), 65534)
+        self.assertEqual(self.thisUnwrapper.unwrap(1), 65537)
+        self.assertEqual(self.thisUnwrapper.unwrap(65535), 65535)
+        self.assertEqual(self.thisUnwrapper.unwrap(0), 65536)
+
+    def test_peek(self):
+        self.assertEqual(self.thisUnwrapper.peek(5), 5)
+        self.thisUnwrapper.unwrap(65535)
+        self.assertEqual(self.thisUnwrapper.peek(0), 65536)
+        self.assertEqual(self.thisUnwrapper.last, 65535)
+
+    def test_reset(self):
+        self.thisUnwrapper.unwrap(10)
+        self.thisUnwrapper.reset()
+        self.assertIsNone(self.thisUnwrapper.last)
+
+    def test_timestamp(self):
+        thisUnwrapper = Unwrapper(32)
+        thisUnwrapper.unwrap((2**32) - 100)
+        self.assertEqual(thisUnwrapper.unwrap(100), (2**32) + 100)